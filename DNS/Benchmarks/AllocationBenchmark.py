@@ -0,0 +1,73 @@
+#! /usr/bin/env python3
+
+'''
+    Memory allocated per query by getResponse (bytes in, bytes out) and by writeResponse
+    (pooled memoryview in, preallocated output buffer, as DNSEngine.runZeroCopy), measured with tracemalloc.
+    Logging is disabled to measure the packet path only.
+    Run from the DNS folder: python Benchmarks/AllocationBenchmark.py [-n 10000]
+'''
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper.BufferPool import BufferPool
+from Helper.BufferPool import PrefixViews
+
+ADDR = ('127.0.0.1', 5353)
+QUERY = DNSCodec.buildQuery('8213_check_185.220.101.4.dnstestsuite.space', DNSCodec.TYPE_A, 0x1234)
+
+
+def noLogging(function, *args):
+    pass
+
+#
+def measure(function, number):
+    '''
+        Return (average bytes still allocated per query, average peak bytes per query).
+    '''
+
+    function()  # warm the response cache up
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    peak = 0
+    for i in range(number):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        function()
+        peak += tracemalloc.get_traced_memory()[1] - current
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+    return retained / number, peak / number
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Allocations per query on the response path')
+    parser.add_argument('-n', type=int, default=10000, help='Queries per run, default: 10000')
+    args = parser.parse_args()
+
+    DNSFunctions.loadRealZone()
+    pool = BufferPool(1)
+    view = pool.acquire()
+    queries = PrefixViews(view)
+    output = bytearray(DNSFunctions.OUTPUT_BUFFER_SIZE)
+
+    def bytesPath():
+        DNSFunctions.getResponse(QUERY, ADDR, scheduleLogging=noLogging)
+
+    def zeroCopyPath():
+        view[:len(QUERY)] = QUERY   # stands for recvfrom_into
+        DNSFunctions.writeResponse(queries[len(QUERY)], output, ADDR, scheduleLogging=noLogging)
+
+    print('%-14s %18s %18s' % ('Path', 'retained B/query', 'peak B/query'))
+    for name, function in (('getResponse', bytesPath), ('writeResponse', zeroCopyPath)):
+        retained, peak = measure(function, args.n)
+        print('%-14s %18.1f %18.1f' % (name, retained, peak))
+    print('Response cache: %s' % DNSFunctions.RESPONSE_CACHE.getStats())
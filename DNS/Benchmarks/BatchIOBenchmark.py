@@ -0,0 +1,103 @@
+#! /usr/bin/env python3
+
+'''
+    Packets/sec of the recvmmsg/sendmmsg backend against the plain socket backend (Helper/BatchIO.py).
+    A server process answers with a fixed response through the backend, a local client keeps
+    a window of queries in flight and counts the answers.
+    Run from the DNS folder: python Benchmarks/BatchIOBenchmark.py [-n 200000] [-w 256]
+'''
+
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import BatchIO
+from Helper import DNSCodec
+
+QUERY = DNSCodec.buildQuery('8213_check_185.220.101.4.dnstestsuite.space', DNSCodec.TYPE_A, 0x1234)
+ANSWER = DNSCodec.encodeRecord(DNSCodec.POINTER_TO_QUESTION, DNSCodec.TYPE_A, 400, DNSCodec.encodeAddress(DNSCodec.TYPE_A, '52.20.33.59'))
+RESPONSE = DNSCodec.packHeader(0, 0x8400, 1, 1) + QUERY[DNSCodec.HEADER_SIZE:] + ANSWER
+SOCKET_BUFFER = 1 << 22
+
+
+def serve(backend, port, ready):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    sock.bind(('127.0.0.1', port))
+    if backend == 'mmsg':
+        batchIO = BatchIO.getBatchIO(sock)
+    else:
+        batchIO = BatchIO.PlainUDPIO(sock)
+    for view in batchIO.sendViews:
+        view[:len(RESPONSE)] = RESPONSE
+    ready.set()
+    while 1:
+        entries = []
+        for view, addr in batchIO.receive():
+            batchIO.sendViews[len(entries)][0:2] = view[0:2]
+            entries.append((len(RESPONSE), addr))
+        batchIO.sendPrepared(entries)
+
+#
+def runClient(port, number, window):
+    '''
+        Return (answers, lost, seconds).
+    '''
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    sock.settimeout(0.2)
+    target = ('127.0.0.1', port)
+    buffer = bytearray(4096)
+    sent = answers = lost = 0
+    start = time.perf_counter()
+    while sent < number:
+        burst = min(window, number - sent)
+        for i in range(burst):
+            sock.sendto(QUERY, target)
+        sent += burst
+        for i in range(burst):
+            try:
+                sock.recv_into(buffer)
+                answers += 1
+            except socket.timeout:
+                lost += burst - i
+                break
+
+    return answers, lost, time.perf_counter() - start
+
+#
+def bench(backend, number, window, port):
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(backend, port, ready), daemon=True)
+    server.start()
+    ready.wait()
+    try:
+        return runClient(port, number, window)
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='recvmmsg/sendmmsg vs plain socket packets/sec')
+    parser.add_argument('-n', type=int, default=200000, help='Queries per backend, default: 200000')
+    parser.add_argument('-w', type=int, default=256, help='Queries in flight, default: 256')
+    parser.add_argument('-p', '--port', type=int, default=15354, help='Local port, default: 15354')
+    args = parser.parse_args()
+
+    backends = ['plain']
+    if BatchIO.isSupported():
+        backends.append('mmsg')
+    else:
+        print('recvmmsg/sendmmsg are not available on this platform')
+
+    print('%-8s %12s %10s %10s' % ('Backend', 'answers/s', 'answers', 'lost'))
+    for backend in backends:
+        answers, lost, seconds = bench(backend, args.n, args.w, args.port)
+        print('%-8s %12.0f %10d %10d' % (backend, answers / seconds, answers, lost))
@@ -0,0 +1,92 @@
+#! /usr/bin/env python3
+
+'''
+    Load time of N queries from the text log (parsed with split('|')/split(':') like
+    DNSInfoGraph.getInfoFormTextFiles) against the binary log (Helper/BinaryLog.py, memory-mapped
+    as a NumPy structured array), with the per-resolver counts computed from both.
+    Run from the DNS folder: python Benchmarks/BinaryLogBenchmark.py [-n 1000000]
+'''
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import BinaryLog
+
+TEXT_ROW = '11:31:36 2026-10-18 - %d: | RecordType: A | RequestId: %d | SrcIP: %s  |  SrcPort: %d  |  Domain: %s '
+
+
+def getQueries(number):
+    resolvers = ['10.0.%d.%d' % (i // 250, i % 250 + 1) for i in range(1000)]
+    for counter in range(1, number + 1):
+        yield (counter, random.randint(0, 65535), random.choice(resolvers), random.randint(1024, 65535),
+               '%d_check_%d.dnstestsuite.space' % (counter % 5000, counter % 7))
+
+#
+def writeLogs(folder, number):
+    textFile = os.path.join(folder, 'incoming_request.txt')
+    binaryLog = BinaryLog.BinaryLog(os.path.join(folder, 'queries'))
+    with open(textFile, 'w') as file:
+        for counter, requestId, srcIP, srcPort, domain in getQueries(number):
+            file.write(TEXT_ROW % (counter, requestId, srcIP, srcPort, domain) + '\n')
+            binaryLog.append('OKAY', 'A', requestId, srcIP, srcPort, domain, mode='check')
+    binaryLog.close()
+
+    return textFile, os.path.join(folder, 'queries_*.qlog')
+
+#
+def loadText(textFile):
+    counts = {}
+    with open(textFile) as file:
+        for line in file:
+            if 'RequestId' not in line:
+                continue
+            for item in line.split('|'):
+                if 'RequestId' in item:
+                    requestId = int(item.split(':')[1].strip())
+                elif 'SrcIP' in item:
+                    srcIP = item.split(':')[1].strip()
+                elif 'SrcPort' in item:
+                    srcPort = int(item.split(':')[1].strip())
+            counts[srcIP] = counts.get(srcIP, 0) + 1
+
+    return counts
+
+#
+def loadBinary(pattern):
+    records = BinaryLog.loadAll(pattern)
+    ips, counts = BinaryLog.numpy.unique(records['srcIP'], return_counts=True)
+
+    return dict((BinaryLog.ipToString(ip), int(count)) for ip, count in zip(ips, counts))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Text log vs binary log load time')
+    parser.add_argument('-n', type=int, default=1000000, help='Queries, default: 1000000')
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='dns-binarylog-')
+    try:
+        textFile, pattern = writeLogs(folder, args.n)
+        print('%d queries: text %.1f MB, binary %.1f MB' % (args.n, os.path.getsize(textFile) / 1e6,
+              sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder) if 'queries' in name) / 1e6))
+
+        start = time.perf_counter()
+        textCounts = loadText(textFile)
+        textSeconds = time.perf_counter() - start
+        start = time.perf_counter()
+        binaryCounts = loadBinary(pattern)
+        binarySeconds = time.perf_counter() - start
+
+        print('%-8s %12s' % ('Format', 'ms'))
+        print('%-8s %12.1f' % ('text', textSeconds * 1000))
+        print('%-8s %12.1f' % ('binary', binarySeconds * 1000))
+        print('Same per-resolver counts: %s' % (textCounts == binaryCounts))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,48 @@
+#! /usr/bin/env python3
+
+'''
+    Parse+encode cost per packet of Helper/DNSCodec.py.
+    Run from the DNS folder: python Benchmarks/CodecBenchmark.py [-n 100000]
+'''
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+
+# the sample query from DNSServer.main_test_local, it carries an EDNS0 OPT record
+QUERY_EDNS = b'\\$\x00\x10\x00\x01\x00\x00\x00\x00\x00\x01\x02ns\x0cdnStEstSuITE\x05SpACe\x00\x00\x1c\x00\x01\x00\x00)\x10\x00\x00\x00\x80\x00\x00\x00'
+QUERY_CHECK = DNSCodec.buildQuery('8213_check_185.220.101.4.dnstestsuite.space', DNSCodec.TYPE_A, 0x1234)
+RESPONSE = (DNSCodec.packHeader(0x1234, 0x8400, 1, 2) +
+            DNSCodec.encodeQuestion('www.dnstestsuite.space', DNSCodec.TYPE_A) +
+            DNSCodec.encodeRecord(DNSCodec.POINTER_TO_QUESTION, DNSCodec.TYPE_A, 400, DNSCodec.encodeAddress(DNSCodec.TYPE_A, '52.20.33.59')) +
+            DNSCodec.encodeRecord(DNSCodec.POINTER_TO_QUESTION, DNSCodec.TYPE_A, 400, DNSCodec.encodeAddress(DNSCodec.TYPE_A, '52.20.33.60')))
+
+PACKETS = [('query + OPT', QUERY_EDNS), ('0x20 check query', QUERY_CHECK), ('response, 2 answers', RESPONSE)]
+
+
+def parseAndEncode(packet):
+    return DNSCodec.encodeMessage(DNSCodec.parseMessage(packet))
+
+#
+def bench(function, packet, number):
+    seconds = min(timeit.repeat(lambda: function(packet), number=number, repeat=3))
+    return seconds / number * 1e9
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DNSCodec parse+encode benchmark')
+    parser.add_argument('-n', type=int, default=100000, help='Packets per run, default: 100000')
+    args = parser.parse_args()
+
+    print('%-22s %12s %12s %14s' % ('Packet', 'parse ns', 'encode ns', 'parse+enc ns'))
+    for name, packet in PACKETS:
+        message = DNSCodec.parseMessage(packet)
+        parseNs = bench(DNSCodec.parseMessage, packet, args.n)
+        encodeNs = bench(DNSCodec.encodeMessage, message, args.n)
+        bothNs = bench(parseAndEncode, packet, args.n)
+        print('%-22s %12.0f %12.0f %14.0f' % (name, parseNs, encodeNs, bothNs))
@@ -0,0 +1,91 @@
+#! /usr/bin/env python3
+
+'''
+    UDP answer size, TC=1 rate and ns/op of DNSFunctions.writeResponse for names with 1..N A records,
+    asked without EDNS0 and with an OPT record advertising 512, 1232 and 4096 bytes: the answers over
+    the limit cost a TC=1 stub here and a second query over TCP on the resolver side.
+    The zone is generated in a temporary folder. Run from the DNS folder:
+        python Benchmarks/EDNSBenchmark.py [-r 1,8,32,64,128] [-e 0,512,1232,4096] [--cap 1232]
+'''
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+
+ORIGIN = 'edns.bench.'
+ADDR = ('127.0.0.1', 5353)
+REPEAT = 5
+
+
+def noLogging(function, *args):
+    pass
+
+#
+def writeZone(folder, recordCounts):
+    '''
+        A zone where r<N>.edns.bench has N A records, one name per count.
+    '''
+
+    records = []
+    for count in recordCounts:
+        records += [{'name': 'r%d' % count, 'value': '10.%d.%d.%d' % (count & 0xff, index >> 8, index & 0xff)} for index in range(count)]
+    zone = {'$origin': ORIGIN, '$ttl': 300, 'soa': {'mname': 'ns.' + ORIGIN, 'rname': 'admin.' + ORIGIN, 'serial': 1, 'refresh': 3600,
+                                                   'retry': 600, 'expire': 86400, 'minimum': 300},
+            'ns': [{'host': 'ns.' + ORIGIN}], 'A': records}
+    with open(os.path.join(folder, 'bench.zone'), 'w') as zoneFile:
+        json.dump(zone, zoneFile)
+
+#
+def bench(query, output, number):
+    '''
+        (answer length, TC flag, ns/op) of one query.
+    '''
+
+    view = memoryview(query)
+    write = lambda: DNSFunctions.writeResponse(view, output, ADDR, scheduleLogging=noLogging)
+    length = write()[0]
+    seconds = min(timeit.repeat(write, number=number, repeat=REPEAT))
+
+    return length, bool(output[2] & 0x02), seconds / number * 1e9
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='UDP answer sizes and truncation with and without EDNS0')
+    parser.add_argument('-r', '--records', default='1,8,32,64,128', help='A records per name, comma separated, default: 1,8,32,64,128')
+    parser.add_argument('-e', '--edns', default='0,512,1232,4096',
+                        help='Advertised UDP payload sizes, comma separated, 0: no OPT record, default: 0,512,1232,4096')
+    parser.add_argument('--cap', type=int, default=DNSFunctions.EDNS_PAYLOAD_SIZE,
+                        help='Server side cap (-ep of the server), default: %d' % DNSFunctions.EDNS_PAYLOAD_SIZE)
+    parser.add_argument('-n', type=int, default=2000, help='Answers per run, default: 2000')
+    args = parser.parse_args()
+
+    recordCounts = [int(count) for count in args.records.split(',')]
+    payloadSizes = [int(size) for size in args.edns.split(',')]
+    folder = tempfile.mkdtemp(prefix='dns-edns-')
+    logging.getLogger().addHandler(logging.NullHandler())
+    try:
+        writeZone(folder, recordCounts)
+        DNSFunctions.setEdnsPayloadSize(args.cap)
+        DNSFunctions.loadRealZone([folder])
+        os.chdir(folder)    # a log file of the server goes to the temporary folder
+        output = bytearray(DNSFunctions.OUTPUT_BUFFER_SIZE)
+
+        print('server cap %d bytes, %d answers per run' % (args.cap, args.n))
+        print('%8s %8s %8s %4s %10s' % ('records', 'EDNS', 'bytes', 'TC', 'ns/op'))
+        for count in recordCounts:
+            for payloadSize in payloadSizes:
+                query = DNSCodec.buildQuery('r%d.%s' % (count, ORIGIN), DNSCodec.TYPE_A, 0x1234, payloadSize=payloadSize)
+                length, truncated, ns = bench(query, output, args.n)
+                print('%8d %8s %8d %4s %10.0f' % (count, payloadSize or '-', length, 'yes' if truncated else '', ns))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
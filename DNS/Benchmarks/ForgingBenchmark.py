@@ -0,0 +1,101 @@
+#! /usr/bin/env python3
+
+'''
+    Forged packets/sec of the old per-packet loop (int.to_bytes + concatenation + sendto) against
+    the template-patched Forger (Helper/Forger.py) on the plain socket path and with sendmmsg
+    batches, in both forging modes and under a packets/sec cap. The packets go to a local sink
+    socket that is never read, only the sending side is measured.
+    Run from the DNS folder: python Benchmarks/ForgingBenchmark.py [-n 200000] [--cap 50000]
+'''
+
+import argparse
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import BatchIO
+from Helper import DNSCodec
+from Helper import Forger
+
+SINK = '127.0.0.1'
+
+
+def getResponse():
+    '''
+        A forged A answer for dnstestsuite.space without its transaction ID.
+    '''
+
+    header = DNSCodec.packHeader(0, 0x8400, qdcount=1, ancount=1)
+    answer = DNSCodec.encodeRecord(DNSCodec.POINTER_TO_QUESTION, DNSCodec.TYPE_A, 400, DNSCodec.encodeAddress(DNSCodec.TYPE_A, '52.20.33.59'))
+
+    return header[2:] + DNSCodec.encodeQuestion('dnstestsuite.space', DNSCodec.TYPE_A) + answer
+
+#
+def legacyRequestId(response, sock, addr, candidates):
+    for requestId in candidates:
+        sock.sendto(requestId.to_bytes(2, byteorder='big') + response, addr)
+
+    return len(candidates)
+
+#
+def legacyPortNumber(response, sock, addr, candidates):
+    for portNumber in candidates:
+        lst = list(addr)
+        lst[1] = portNumber
+        addr = tuple(lst)
+        sock.sendto(response, addr)
+
+    return len(candidates)
+
+#
+def getCases(cap):
+    '''
+        [(label, function(response, sock, addr, candidates) -> packets sent)]
+    '''
+
+    def forger(mode, batched, rate=0):
+        def run(response, sock, addr, candidates):
+            if mode == Forger.MODE_PORT_NUMBER:
+                response = b'\x12\x34' + response
+            batchIO = BatchIO.getBatchIO(sock) if batched else None
+            return Forger.Forger(response, addr, sock, mode, rate=rate, batchIO=batchIO, progress=False).run(candidates)
+        return run
+
+    cases = [('rid legacy', legacyRequestId),
+             ('rid template', forger(Forger.MODE_REQUEST_ID, False)),
+             ('rid template+mmsg', forger(Forger.MODE_REQUEST_ID, True)),
+             ('rid capped', forger(Forger.MODE_REQUEST_ID, True, cap)),
+             ('rport legacy', legacyPortNumber),
+             ('rport template', forger(Forger.MODE_PORT_NUMBER, False)),
+             ('rport template+mmsg', forger(Forger.MODE_PORT_NUMBER, True))]
+
+    return cases
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Forged packets/sec of the old loop against the template-patched Forger')
+    parser.add_argument('-n', type=int, default=200000, help='Packets per case, default: 200000')
+    parser.add_argument('--cap', type=int, default=50000, help='packets/sec cap of the capped case, default: 50000')
+    args = parser.parse_args()
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind((SINK, 0))
+    addr = sink.getsockname()
+    response = getResponse()
+    requestIds = [random.randint(1, 65535) for i in range(args.n)]
+    portNumbers = [random.randint(1024, 65535) for i in range(args.n)]
+
+    print('%d packets per case, %d bytes each, sendmmsg: %s' % (args.n, len(response) + 2, BatchIO.isSupported()))
+    print('%-22s %12s %12s' % ('Case', 'packets/s', 'seconds'))
+    for label, function in getCases(args.cap):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        start = time.perf_counter()
+        sent = function(response, sock, addr, portNumbers if label.startswith('rport') else requestIds)
+        seconds = time.perf_counter() - start
+        sock.close()
+        print('%-22s %12.0f %12.3f' % (label, sent / seconds, seconds))
+    sink.close()
@@ -0,0 +1,238 @@
+#! /usr/bin/env python3
+
+'''
+    ns/op of the DNSFunctions hot path functions over a corpus of query packets (plain, 0x20 cased,
+    long subdomains, AAAA, ANY, EDNS0, malformed), compared with the stored baseline.
+    Every case is measured right after a fixed pure Python reference workload and kept as the ratio of
+    the two, the median over the rounds is compared: the speed of the machine and its load at that moment
+    cancel out, so the threshold can be tight. A case whose ratio grows by more than the threshold is a
+    regression (exit code 1), so is a case of the baseline that is gone; a new case is only reported.
+    The baseline is recorded (--save) in a commit of its own, never in the change it is meant to check.
+    The spread of the ratios between the rounds of a run is printed at its end (how noisy the machine was).
+    Run from the DNS folder:
+        python Benchmarks/HotPathBenchmark.py                 compare with Benchmarks/Baselines/HotPath.json
+        python Benchmarks/HotPathBenchmark.py --save          store the results as the new baseline
+        python Benchmarks/HotPathBenchmark.py -k getResponse  only the cases containing 'getResponse'
+'''
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+
+DNS_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(DNS_FOLDER, 'Benchmarks', 'Baselines', 'HotPath.json')
+THRESHOLD = 0.5         # a ratio to the reference 50% over the baseline's is a regression, reruns of an unchanged tree spread up to ~15%, ~30% under 1 us
+REPEAT = 5
+MIN_TIME = 0.02         # seconds per repeat
+ROUNDS = 5              # passes over all the cases, the median ratio is kept
+REFERENCE_DATA = {'id': 0x1234, 'name': 'www.dnstestsuite.space', 'labels': ['www', 'dnstestsuite', 'space'], 'ttl': 400}
+ADDR = ('127.0.0.1', 5353)
+
+LONG_NAME = '.'.join(['a' * 60, 'b' * 60, 'c' * 60, 'dnstestsuite', 'space'])
+# the sample query from DNSServer.main_test_local, it carries an EDNS0 OPT record
+QUERY_EDNS = b'\\$\x00\x10\x00\x01\x00\x00\x00\x00\x00\x01\x02ns\x0cdnStEstSuITE\x05SpACe\x00\x00\x1c\x00\x01\x00\x00)\x10\x00\x00\x00\x80\x00\x00\x00'
+CORPUS = [
+    ('plain', DNSCodec.buildQuery('dnstestsuite.space', DNSCodec.TYPE_A, 0x1234)),
+    ('0x20', DNSCodec.buildQuery('8213_check_185.220.101.4.dnStEsTsuiTE.SpaCE', DNSCodec.TYPE_A, 0x1234)),
+    ('long', DNSCodec.buildQuery(LONG_NAME, DNSCodec.TYPE_A, 0x1234)),
+    ('aaaa', DNSCodec.buildQuery('dnstestsuite.space', DNSCodec.TYPE_AAAA, 0x1234)),
+    ('any', DNSCodec.buildQuery('dnstestsuite.space', DNSCodec.TYPE_ANY, 0x1234)),
+    ('edns', QUERY_EDNS),
+    ('malformed', DNSCodec.buildQuery('dnstestsuite.space', DNSCodec.TYPE_A, 0x1234)[:20]),
+]
+
+
+def noLogging(function, *args):
+    pass
+
+#
+def reference():
+    '''
+        Fixed work without any code of the repository (dict, str, bytes and int operations like the hot path's),
+        the time of every case is divided by its time.
+    '''
+
+    data = REFERENCE_DATA
+    packet = b''
+    for label in data['labels']:
+        packet += bytes([len(label)]) + label.encode('latin-1')
+    name = '.'.join(data['name'].split('.')).lower()
+
+    return (data['id'].to_bytes(2, 'big') + packet + data['ttl'].to_bytes(4, 'big'), name, str(data['id']))
+
+#
+def rejecting(function):
+    '''
+        Malformed packets raise, the cost of the rejection is what is measured.
+    '''
+
+    def call():
+        try:
+            function()
+        except DNSCodec.DNSCodecError:
+            pass
+
+    return call
+
+#
+def getCases():
+    '''
+        [(name, function)], every function runs one operation.
+    '''
+
+    cases = []
+    zone = DNSFunctions.getZone(['dnstestsuite', 'space', ''])
+    for label, packet in CORPUS:
+        malformed = label == 'malformed'
+        question = packet[DNSCodec.HEADER_SIZE:]
+        getQuestionDomain = lambda question=question: DNSFunctions.getQuestionDomain(question)
+        getResponse = lambda packet=packet, label=label: DNSFunctions.getResponse(packet, ADDR, case_sensitive=label == '0x20',
+                                                                                  scheduleLogging=noLogging)
+        cases.append(('getQuestionDomain/%s' % label, rejecting(getQuestionDomain) if malformed else getQuestionDomain))
+        cases.append(('getResponse/%s' % label, rejecting(getResponse) if malformed else getResponse))
+        if malformed:
+            continue
+
+        labels, questionType = DNSFunctions.getQuestionDomain(question)
+        qname = question[:DNSCodec.skipName(question, 0)].lower()   # the zone index key, as writeResponse has it
+        cases.append(('getFlags/%s' % label, lambda packet=packet: DNSFunctions.getFlags(packet[2:4])))
+        cases.append(('getZone/%s' % label, lambda qname=qname: DNSFunctions.getZone(qname)))
+        cases.append(('getRecs/%s' % label, lambda labels=labels, questionType=questionType: DNSFunctions.getRecs(zone, labels, questionType)))
+        cases.append(('getLetterCaseSwapped/%s' % label, lambda labels=labels: DNSFunctions.getLetterCaseSwapped(labels)))
+        cases.append(('buildQuestion/%s' % label, lambda labels=labels: DNSFunctions.buildQuestion(labels, 'A')))
+
+    cases.append(('recordToBytes/A', lambda: DNSFunctions.recordToBytes('dnstestsuite.space', 'A', 400, '52.20.33.59')))
+    cases.append(('recordToBytes/AAAA', lambda: DNSFunctions.recordToBytes('dnstestsuite.space', 'AAAA', 400, '2001:db8::1')))
+    cases.append(('logDNSRequest/okay', lambda: DNSFunctions.logDNSRequest(1, 'OKAY', 'A', '4660', '127.0.0.1', 5353, 'dnstestsuite.space')))
+    cases.append(('logDNSRequest/0x20', lambda: DNSFunctions.logDNSRequest(1, 'OKAY', 'A', '4660', '127.0.0.1', 5353, '8213_check_x.dnstestsuite.space',
+                                                                            modifiedDomain='8213_check_x.DnSteStsuITE.sPaCe')))
+
+    return cases
+
+#
+def getNumber(function):
+    '''
+        Calls of function that take about MIN_TIME seconds, measured once per run.
+    '''
+
+    function()  # warm the caches up
+    number, seconds = timeit.Timer(function).autorange()
+
+    return max(1, int(number * MIN_TIME / max(seconds, 1e-9)))
+
+#
+def measure(function, number):
+    '''
+        Best ns/op of REPEAT runs of number calls.
+    '''
+
+    return min(timeit.Timer(function).repeat(repeat=REPEAT, number=number)) / number * 1e9
+
+#
+def loadBaseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+#
+def getSpread(ratios):
+    '''
+        (worst spread, case) of the ratios between the rounds of this run: largest / median - 1.
+    '''
+
+    return max((max(rounds) / statistics.median(rounds) - 1, name) for name, rounds in ratios.items())
+
+#
+def saveBaseline(path, results, threshold):
+    '''
+        results: [(name, ns/op, ratio to the reference)], the ratios are compared, ns/op is only shown.
+    '''
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {'machine': '%s, %s, Python %s, %d CPUs' % (platform.machine(), platform.processor() or platform.system(),
+                                                            platform.python_version(), os.cpu_count()),
+                'threshold': threshold,
+                'results': dict((name, round(ns, 1)) for name, ns, ratio in results),
+                'ratios': dict((name, round(ratio, 4)) for name, ns, ratio in results)}
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DNSFunctions hot path microbenchmarks with stored baselines')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline file, default: Benchmarks/Baselines/HotPath.json')
+    parser.add_argument('--save', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='Allowed slowdown over the baseline (1.0 = 100%%%%), default: the baseline threshold or %.2f' % THRESHOLD)
+    parser.add_argument('-k', default='', help='Only run the cases whose name contains this text')
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help='Passes over all the cases, default: %d' % ROUNDS)
+    args = parser.parse_args()
+
+    # the zone is loaded from the DNS folder, the text log of logDNSRequest goes to a temporary folder
+    DNSFunctions.loadRealZone()
+    folder = tempfile.mkdtemp(prefix='dns-hotpath-')
+    os.chdir(folder)
+    logging.getLogger().addHandler(logging.NullHandler())   # nothing logged on stderr during the timing
+    baseline = loadBaseline(args.baseline)
+    threshold = args.threshold if args.threshold is not None else baseline.get('threshold', THRESHOLD)
+    expected = baseline.get('ratios', {})   # a baseline of ns/op only (before the ratios) checks nothing
+
+    cases = [(name, function) for name, function in getCases() if args.k in name]
+    timings = dict((name, []) for name, function in cases)
+    ratios = dict((name, []) for name, function in cases)
+    try:
+        numbers = dict((name, getNumber(function)) for name, function in cases)
+        referenceNumber = getNumber(reference)
+        for round_ in range(args.rounds):
+            for name, function in cases:
+                referenceNs = measure(reference, referenceNumber)   # right before the case, under the same load
+                ns = measure(function, numbers[name])
+                timings[name].append(ns)
+                ratios[name].append(ns / referenceNs)
+    finally:
+        os.chdir(DNS_FOLDER)
+        shutil.rmtree(folder, ignore_errors=True)
+
+    results = [(name, statistics.median(timings[name]), statistics.median(ratios[name])) for name, function in cases]
+    regressions = 0
+    print('%-30s %12s %9s %9s %9s' % ('Case', 'ns/op', 'ratio', 'baseline', 'change'))
+    for name, ns, ratio in results:
+        line = '%-30s %12.0f %9.2f' % (name, ns, ratio)
+        if name in expected:
+            change = ratio / expected[name] - 1
+            line += ' %9.2f %+8.1f%%' % (expected[name], change * 100)
+            if change > threshold and not args.save:
+                line += '  REGRESSION'
+                regressions += 1
+        elif expected:
+            line += '   (new case, not in the baseline)'
+        print(line)
+
+    # a case of the baseline that is gone would silently stop being checked
+    missing = sorted(name for name in expected if args.k in name and name not in timings)
+    spread, spreadCase = getSpread(ratios)
+    print('Spread of the ratios between the %d rounds: up to %.0f%% (%s)' % (args.rounds, spread * 100, spreadCase))
+
+    if args.save:
+        saveBaseline(args.baseline, results, args.threshold if args.threshold is not None else THRESHOLD)
+        print('Baseline stored in %s' % args.baseline)
+    elif missing or regressions:
+        if missing:
+            print('Cases of the baseline not run: %s' % ', '.join(missing))
+        if regressions:
+            print('%d regression(s) over the %.0f%% threshold' % (regressions, threshold * 100))
+        sys.exit(1)
@@ -0,0 +1,134 @@
+#! /usr/bin/env python3
+
+'''
+    Serving QPS with the logging done by the logging thread of the serving process (default), by the
+    logger process draining the shared-memory rings (Helper/QueryRing.py, RunDns.py -lp) and without
+    logging at all (upper bound). The server runs in a temporary folder with the real zone, its
+    console output goes to /dev/null; a local client keeps a window of queries in flight.
+    Run from the DNS folder: python Benchmarks/LoggingBenchmark.py [-n 50000] [-w 64] [-e zerocopy]
+'''
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSEngine
+from Helper import DNSFunctions
+from Helper import DNSWorkers
+from Helper.QueryRing import RingLogger
+
+DNS_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERY = DNSCodec.buildQuery('dnstestsuite.space', DNSCodec.TYPE_A, 0x1234)
+MODES = ['none', 'thread', 'process']
+SOCKET_BUFFER = 1 << 22
+STOP_TIMEOUT = 5
+
+
+def noLogging(function, *args):
+    pass
+
+#
+def serve(mode, engine, port, folder, ready):
+    os.chdir(folder)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)     # the console printing still runs, in this process or in the logger process
+    DNSFunctions.makeDirectories()
+    DNSFunctions.loadRealZone()
+    sock = DNSWorkers.bindSocket('127.0.0.1', port)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    argv = argparse.Namespace(rcase=False, adversary=False, dont=False, engine=engine)
+
+    ringLogger = None
+    scheduleLogging = None
+    if mode == 'none':
+        scheduleLogging = noLogging
+    elif mode == 'process':
+        ringLogger = RingLogger()
+        ringLogger.start()
+        scheduleLogging = ringLogger.getScheduler()
+
+    ready.set()
+    try:
+        if engine == 'mmsg':
+            DNSEngine.runBatched(sock, argv, scheduleLogging=scheduleLogging)
+        elif engine == 'zerocopy':
+            DNSEngine.runZeroCopy(sock, argv, scheduleLogging=scheduleLogging)
+        else:
+            DNSEngine.run(sock, argv, scheduleLogging=scheduleLogging)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if ringLogger is not None:
+            ringLogger.process.terminate()     # skip the backlog, only the serving rate is measured
+            ringLogger.stop()
+
+#
+def runClient(port, number, window):
+    '''
+        Return (answers, lost, seconds).
+    '''
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    sock.settimeout(0.5)
+    target = ('127.0.0.1', port)
+    buffer = bytearray(4096)
+    sent = answers = lost = 0
+    start = time.perf_counter()
+    while sent < number:
+        burst = min(window, number - sent)
+        for i in range(burst):
+            sock.sendto(QUERY, target)
+        sent += burst
+        for i in range(burst):
+            try:
+                sock.recv_into(buffer)
+                answers += 1
+            except socket.timeout:
+                lost += burst - i
+                break
+
+    return answers, lost, time.perf_counter() - start
+
+#
+def bench(mode, engine, number, window, port):
+    folder = tempfile.mkdtemp(prefix='dns-logging-')
+    os.symlink(os.path.join(DNS_FOLDER, 'Zones'), os.path.join(folder, 'Zones'))
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(mode, engine, port, folder, ready))
+    server.start()
+    ready.wait()
+    try:
+        runClient(port, min(number // 10, 2000), window)   # warm up
+        return runClient(port, number, window)
+    finally:
+        os.kill(server.pid, signal.SIGINT)
+        server.join(STOP_TIMEOUT)
+        if server.is_alive():   # still writing the logging thread backlog
+            server.terminate()
+            server.join()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serving QPS with the logging thread, the logger process and no logging')
+    parser.add_argument('-n', type=int, default=50000, help='Queries per mode, default: 50000')
+    parser.add_argument('-w', type=int, default=64, help='Queries in flight, default: 64')
+    parser.add_argument('-e', '--engine', choices=['asyncio', 'zerocopy', 'mmsg'], default='zerocopy', help='Serving engine, default: zerocopy')
+    parser.add_argument('-p', '--port', type=int, default=15355, help='Local port, default: 15355')
+    args = parser.parse_args()
+
+    print('Engine: %s, %d CPUs' % (args.engine, os.cpu_count()))
+    print('%-8s %12s %10s %10s' % ('Logging', 'answers/s', 'answers', 'lost'))
+    for mode in MODES:
+        answers, lost, seconds = bench(mode, args.engine, args.n, args.w, args.port)
+        print('%-8s %12.0f %10d %10d' % (mode, answers / seconds, answers, lost))
@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+
+'''
+    QPS, loss and latency of DNSServer.main in each serving mode on localhost, measured with the
+    load generator (Tools/LoadGenerator.py) and a synthetic '<rand>_check_<ip>' mix.
+    Every mode runs in a temporary folder with the real zone, the server console goes to /dev/null.
+    Run from the DNS folder: python Benchmarks/ServerBenchmark.py [-n 50000] [-r 0,5000] [--workers 2]
+'''
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DNSServer
+from Tools import LoadGenerator
+
+DNS_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_TIME = 1.5      # seconds for the server to load the zone and bind
+STOP_TIMEOUT = 5
+
+
+def serve(argv, folder):
+    os.chdir(folder)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)     # errors are logged on stderr without Helper.initLogger
+    DNSServer.DNSFunctions.makeDirectories()
+    DNSServer.main(argv, '127.0.0.1')
+
+#
+def getModes(workers):
+    '''
+        [(label, RunDns.py options)] of the modes to compare.
+    '''
+
+    modes = []
+    for engine in DNSServer.ENGINES:
+        modes.append((engine, {'engine': engine}))
+    modes.append(('mmsg+lp', {'engine': DNSServer.ENGINE_BATCHED, 'loggerProcess': True}))
+    if workers > 1:
+        modes.append(('mmsg x%d' % workers, {'engine': DNSServer.ENGINE_BATCHED, 'workers': workers}))
+
+    return modes
+
+#
+def startServer(options, port):
+    '''
+        Run DNSServer.main with the RunDns.py options in a process and a temporary folder, return (process, folder).
+    '''
+
+    argv = argparse.Namespace(l=True, s=False, adversary=False, port=port, rcase=True, task='rport', dont=True, workers=1,
+                              engine=DNSServer.ENGINE_ASYNCIO, database=None, binaryLog=None, loggerProcess=False, metrics=None, rateLimit=None, rateLimitSlip=2, forgeRate=0, sweepWorkers=0, zoneWatch=0, tcp=False, ednsPayload=1232, consoleLines=20)
+    for name, value in options.items():
+        setattr(argv, name, value)
+    folder = tempfile.mkdtemp(prefix='dns-server-')
+    os.symlink(os.path.join(DNS_FOLDER, 'Zones'), os.path.join(folder, 'Zones'))
+    os.symlink(os.path.join(DNS_FOLDER, 'Logo'), os.path.join(folder, 'Logo'))
+    server = multiprocessing.Process(target=serve, args=(argv, folder))
+    server.start()
+    time.sleep(STARTUP_TIME)
+
+    return server, folder
+
+#
+def stopServer(server, folder):
+    os.kill(server.pid, signal.SIGINT)
+    server.join(STOP_TIMEOUT)
+    if server.is_alive():
+        server.terminate()
+        server.join()
+    shutil.rmtree(folder, ignore_errors=True)
+
+#
+def bench(options, port, queries, number, rate, window, clients):
+    server, folder = startServer(options, port)
+    try:
+        return LoadGenerator.runLoad(('127.0.0.1', port), queries, number, rate, window, clients=clients)
+    finally:
+        stopServer(server, folder)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='QPS, loss and latency of every server mode')
+    parser.add_argument('-n', type=int, default=50000, help='Queries per run, default: 50000')
+    parser.add_argument('-r', '--rate', default='0', help='Target rates in queries/sec, comma separated, 0: as fast as possible, default: 0')
+    parser.add_argument('-w', '--window', type=int, default=64, help='Queries in flight per client, default: 64')
+    parser.add_argument('-c', '--clients', type=int, default=1, help='Client processes, default: 1')
+    parser.add_argument('--workers', type=int, default=1, help='Also run the mmsg engine with this many workers when > 1')
+    parser.add_argument('-p', '--port', type=int, default=15356, help='Local port, default: 15356')
+    args = parser.parse_args()
+
+    queries = LoadGenerator.buildQueries(LoadGenerator.getSyntheticMix(10000))
+    print('%d CPUs, %d queries per run' % (os.cpu_count(), args.n))
+    print('%-12s' % 'Mode', end=' ')
+    LoadGenerator.printHeader()
+    for label, options in getModes(args.workers):
+        for rate in [float(rate) for rate in args.rate.split(',')]:
+            result = bench(options, args.port, queries, args.n, rate, args.window, args.clients)
+            print('%-12s' % label, end=' ')
+            LoadGenerator.printResult('%.0f/s' % rate if rate else 'max', result)
@@ -0,0 +1,85 @@
+#! /usr/bin/env python3
+
+'''
+    Port-space sweeps (Helper/PortSweep.py) with 1, 2, 4... worker processes against a local
+    stand-in resolver: a UDP socket waiting on a random port for the forged response, like a
+    resolver waiting for the answer of its query. Reports the sweep time, the coverage of the
+    1-65535 range, the packets/sec and the time until the stand-in got the forged packet.
+    Run from the DNS folder: python Benchmarks/SweepBenchmark.py [-w 1,2,4] [-r 3]
+'''
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import PortSweep
+
+TARGET = '127.0.0.1'
+SWEEP_TIMEOUT = 60
+
+
+def getResponse():
+    header = DNSCodec.packHeader(0x1234, 0x8400, qdcount=1, ancount=1)
+    answer = DNSCodec.encodeRecord(DNSCodec.POINTER_TO_QUESTION, DNSCodec.TYPE_A, 400, DNSCodec.encodeAddress(DNSCodec.TYPE_A, '52.20.33.59'))
+
+    return header + DNSCodec.encodeQuestion('dnstestsuite.space', DNSCodec.TYPE_A) + answer
+
+#
+def standIn(sock, hits):
+    '''
+        The stand-in resolver: record when the forged response arrives on its port.
+    '''
+
+    try:
+        sock.recv(4096)
+        hits.append(time.perf_counter())
+    except socket.timeout:
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Port-space sweeps against a local stand-in resolver')
+    parser.add_argument('-w', '--workers', default='1,2,4', help='Sweep worker counts, comma separated, default: 1,2,4')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Sweeps per worker count, default: 3')
+    args = parser.parse_args()
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)   # stands for the DNS server socket
+    server.bind((TARGET, 0))
+    response = getResponse()
+
+    print('%d CPUs, %d sweeps per worker count' % (os.cpu_count(), args.repeat))
+    print('%-8s %10s %10s %12s %10s %8s' % ('Workers', 'seconds', 'coverage', 'packets/s', 'hit ms', 'hits'))
+    for workers in [int(workers) for workers in args.workers.split(',')]:
+        sweeper = PortSweep.PortSweeper(workers, progress=False)
+        seconds = coverage = hitSeconds = 0.0
+        hitCount = 0
+        for i in range(args.repeat):
+            resolver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            resolver.bind((TARGET, 0))
+            resolver.settimeout(SWEEP_TIMEOUT)
+            hits = []
+            waiter = threading.Thread(target=standIn, args=(resolver, hits))
+            waiter.start()
+            started = time.perf_counter()
+            result = sweeper.waitSweep(sweeper.sweep(response, server, (TARGET, 0)), SWEEP_TIMEOUT)
+            resolver.settimeout(0.1)
+            waiter.join()
+            resolver.close()
+            if result is None:
+                sys.exit('Sweep timed out')
+            seconds += result['seconds']
+            coverage += result['coverage']
+            if hits:
+                hitCount += 1
+                hitSeconds += hits[0] - started
+        sweeper.stop()
+        print('%-8d %10.3f %9.1f%% %12.0f %10.1f %5d/%d' % (workers, seconds / args.repeat, coverage / args.repeat,
+                                                          PortSweep.LAST_PORT * args.repeat / seconds,
+                                                          hitSeconds / max(hitCount, 1) * 1000, hitCount, args.repeat))
+    server.close()
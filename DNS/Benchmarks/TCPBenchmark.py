@@ -0,0 +1,102 @@
+#! /usr/bin/env python3
+
+'''
+    DNS over TCP (Helper/DNSTCP.py) with many concurrent clients: queries/sec and latency with
+    persistent connections pipelining a window of queries each, and with one connection per query.
+    The server runs DNSServer.main in a process like Benchmarks/ServerBenchmark.py, the clients are
+    coroutines of one asyncio loop.
+    Run from the DNS folder: python Benchmarks/TCPBenchmark.py [-n 20000] [-c 1,16,128] [-w 1,16]
+'''
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Benchmarks import ServerBenchmark
+from Helper import DNSTCP
+from Tools import LoadGenerator
+
+TARGET = '127.0.0.1'
+TIMEOUT = 5.0
+
+
+#
+async def runConnection(port, queries, number, window, latencies, first=0):
+    '''
+        number queries over one connection, at most window of them waiting for their answer.
+    '''
+
+    reader, writer = await asyncio.open_connection(TARGET, port)
+    try:
+        sentAt = {}
+        sent = 0
+        while sent < number or sentAt:
+            while sent < number and len(sentAt) < window:
+                query = queries[(first + sent) % len(queries)]
+                requestId = sent & 0xffff
+                query[0:2] = requestId.to_bytes(2, byteorder='big')
+                writer.write(DNSTCP.LENGTH.pack(len(query)) + query)
+                sentAt[requestId] = time.perf_counter_ns()
+                sent += 1
+            await writer.drain()
+            length = DNSTCP.LENGTH.unpack(await asyncio.wait_for(reader.readexactly(DNSTCP.LENGTH.size), TIMEOUT))[0]
+            answer = await asyncio.wait_for(reader.readexactly(length), TIMEOUT)
+            requestId = (answer[0] << 8) | answer[1]
+            latencies.append(time.perf_counter_ns() - sentAt.pop(requestId))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+#
+async def runClients(port, queries, number, clients, window, perQuery):
+    '''
+        Return (answered, errors, seconds, sorted latencies in ns).
+    '''
+
+    latencies = []
+
+    async def client(index, share):
+        if perQuery:    # a new connection for every query
+            for i in range(share):
+                await runConnection(port, queries, 1, 1, latencies, first=index + i * clients)
+        else:
+            await runConnection(port, queries, share, window, latencies, first=index)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[client(index, number // clients + (1 if index < number % clients else 0)) for index in range(clients)],
+                                   return_exceptions=True)
+    seconds = time.perf_counter() - started
+    errors = sum(1 for result in results if isinstance(result, Exception))
+
+    return len(latencies), errors, seconds, sorted(latencies)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DNS over TCP with many concurrent clients')
+    parser.add_argument('-n', type=int, default=20000, help='Queries per run, default: 20000')
+    parser.add_argument('-c', '--clients', default='1,16,128', help='Concurrent clients, comma separated, default: 1,16,128')
+    parser.add_argument('-w', '--window', default='1,16', help='Pipelined queries per connection, comma separated, default: 1,16')
+    parser.add_argument('--engine', default='asyncio', help='UDP engine running next to the TCP listener, default: asyncio')
+    parser.add_argument('-p', '--port', type=int, default=15357, help='Local port, default: 15357')
+    args = parser.parse_args()
+
+    queries = LoadGenerator.buildQueries(LoadGenerator.getSyntheticMix(10000))
+    server, folder = ServerBenchmark.startServer({'engine': args.engine, 'tcp': True}, args.port)
+    try:
+        print('%d CPUs, %d queries per run' % (os.cpu_count(), args.n))
+        print('%-12s %8s %8s %10s %8s %10s %9s %9s' % ('Connections', 'clients', 'window', 'answered', 'errors', 'qps', 'p50 ms', 'p99 ms'))
+        runs = [('persistent', clients, window) for clients in args.clients.split(',') for window in args.window.split(',')]
+        runs += [('per query', clients, 1) for clients in args.clients.split(',')]
+        for label, clients, window in runs:
+            clients = int(clients)
+            window = int(window)
+            answered, errors, seconds, latencies = asyncio.run(runClients(args.port, queries, args.n, clients, window, label == 'per query'))
+            print('%-12s %8d %8d %10d %8d %10.0f %9.3f %9.3f' % (label, clients, window, answered, errors, answered / seconds,
+                                                               LoadGenerator.getPercentile(latencies, 50) / 1e6,
+                                                               LoadGenerator.getPercentile(latencies, 99) / 1e6))
+    finally:
+        ServerBenchmark.stopServer(server, folder)
@@ -14,6 +14,8 @@ from _socket import SOL_SOCKET
 from enum import Enum
 from stem.util import term
 
+from Helper import DNSCodec
+
 VERSION = '0.97 F b'
 DEBUG   = False
 PORT    = 53
@@ -216,95 +218,17 @@ def getFlags(flags):
 
 
 def getQuestionDomain(data):
-    state = 1
-    index = 0
-    first = True
-
-    domainParts = []
-    domainString = ''
-    domainTLD = ''
-
-    expectedLength = 0
-    TotalLength = 0
-    parts = 0
-    for byte in data:
-
-        if byte == 0:
-            break
-        if state == 1:  # 1 get the domain name
-            if first is True:  # first byte to get the length for the zone ~ 3 bytes
-                first = False
-                parts += 1
-                expectedLength = byte
-                continue
-            domainString += chr(byte)
-            index += 1
-            if index == expectedLength:
-                TotalLength += expectedLength
-                state = 2
-                index = 0
-                domainParts.append(domainString)
-                domainString = ''
-                first = True
-
-        elif state == 2:  # 2 get the domain zone
-            if first is True:  # first byte to get the length for the zone ~ 3 bytes
-                first = False
-                expectedLength = byte
-                parts += 1  # how many parts
-                continue
-            domainString += chr(byte)
-            index += 1
-            if index == expectedLength:
-                TotalLength += expectedLength
-                state = 1
-                index = 0
-                domainParts.append(domainString)
-                domainString = ''
-                first = True
-
-    # get question type
-    questionTypeStartingIndex = TotalLength + parts
-    questionType = data[questionTypeStartingIndex + 1: questionTypeStartingIndex + 3]
+    question, offset = DNSCodec.parseQuestion(data, 0)
+    questionType = data[offset - 4:offset - 2]
     if DEBUG is True:  # Debug mode only
         print('Question Type: ' + str(questionType))
-        print('Domain: ' + domainString + '.' + domainTLD)
+        print('Domain: ' + question.getName())
 
-    domainParts.append('')
+    domainParts = question.labels + ['']
     print(domainParts)
 
     return (domainParts, questionType)
 
-#
-def getQuestionDomain_temp(data):
-    state = 0
-    expectedlength = 0
-    domainstring = ''
-    domainparts = []
-    x = 0
-    y = 0
-    for byte in data:
-        if state == 1:
-            if byte != 0:
-                domainstring += chr(byte)
-            x += 1
-            if x == expectedlength:
-                domainparts.append(domainstring)
-                domainstring = ''
-                state = 0
-                x = 0
-            if byte == 0:
-                domainparts.append(domainstring)
-                break
-        else:
-            state = 1
-            expectedlength = byte  # get the lenght for the domain
-        y += 1
-
-    questiontype = data[y:y + 2]
-
-    return (domainparts, questiontype)
-
 
 def getLetterCaseSawped(dmoainParts):
     newParts = dmoainParts[:-3]  # save all the elements but  not the last 3  including ''
@@ -353,43 +277,15 @@ def getRecs(data):
 
 
 def buildQuestion(domainName, recordType):  # convert str into byte
-    questionBytes = b''
-
-    for part in domainName:
-        length = len(part)
-        questionBytes += bytes([length])
-
-        for char in part:
-            questionBytes += ord(char).to_bytes(1, byteorder='big')
-
-    if recordType == RECORD_TYPES.A.name or recordType == RECORD_TYPES.AAAA.name:
-        questionBytes += (1).to_bytes(2, byteorder='big')
-
-    questionBytes += (1).to_bytes(2, byteorder='big')
-    return questionBytes
+    return DNSCodec.encodeQuestion(domainName, DNSCodec.TYPE_CODES.get(recordType, DNSCodec.TYPE_A))
 
 
 def recordToBytes(domainName, recordType, recordTTL, recordValue):
     '''
-
+        The answer record, the name is a pointer to the question.
     '''
-    recordBytes = b'\xc0\x0c'  # Pointer to domain name
-    if recordType == RECORD_TYPES.A.name:
-        recordBytes = recordBytes + bytes([0]) + bytes([1])
-
-    # TODO: need to handle IP6-AAAA
-    elif recordType == RECORD_TYPES.AAAA.name:
-        recordBytes = recordBytes + bytes([0]) + bytes([1])
-
-    recordBytes = recordBytes + bytes([0]) + bytes([1])
-    recordBytes += int(recordTTL).to_bytes(4, byteorder='big')
-
-    if recordType == RECORD_TYPES.A.name or recordType == RECORD_TYPES.AAAA.name:
-        recordBytes = recordBytes + bytes([0]) + bytes([4])
-        for part in recordValue.split('.'):
-            recordBytes += bytes([int(part)])
-
-    return recordBytes
+    rtype = DNSCodec.TYPE_CODES.get(recordType, DNSCodec.TYPE_A)
+    return DNSCodec.encodeRecord(DNSCodec.POINTER_TO_QUESTION, rtype, int(recordTTL), DNSCodec.encodeAddress(rtype, recordValue))
 
 
 def BruteFouceTransactionID(currentTransactionID):
@@ -15,6 +15,15 @@ import time
 import argparse
 
 from Helper import DNSFunctions
+from Helper import DNSWorkers
+from Helper import DNSEngine
+from Helper import DNSTCP
+from Helper.QueryRing import RingLogger
+from Helper import Metrics
+from Helper import RateLimiter
+from Helper import PortSweep
+from Helper import CandidateSearch
+from Helper import ConsoleRenderer
 from Helper.Helper import Helper
 from Helper.Helper import MODE_TYPES
 from Helper.Helper import MSG_TYPES
@@ -33,6 +42,12 @@ RANDOMIZE_REQUEST_ID = False  # False  # try all the possible request ID
 RANDOMIZE_BOTH = False
 NUMBER_OF_TRIES = 10000 #   bruteforcing
 
+ENGINE_ASYNCIO = 'asyncio'      # asyncio DatagramProtocol, logging and forging off the socket path
+ENGINE_ZERO_COPY = 'zerocopy'   # blocking recvfrom_into loop with pooled buffers
+ENGINE_BATCHED = 'mmsg'         # recvmmsg/sendmmsg batches, plain socket path when not available
+ENGINES = [ENGINE_ASYNCIO, ENGINE_ZERO_COPY, ENGINE_BATCHED]
+RING_LOGGER = None  # shared-memory rings drained by the logger process (-lp)
+
 def printPortAndIP(ip,port):
     print("\n                                            Host: %s | Port: %s \n" % (ip, port))
 
@@ -64,13 +79,96 @@ def setAdversaryModetask(value):
         RANDOMIZE_BOTH = True
 
 
+def getAdversaryTask():
+    if RANDOMIZE_PORT is True:  ## try all the possible Port Number 1  to 65556
+        return ADVERSARY_TASK_MODE.RRANDOMIZE_PORT_NUMBER
+    elif RANDOMIZE_REQUEST_ID is True:  ## try all the possible request IDs 1  to 65556
+        return ADVERSARY_TASK_MODE.RRANDOMIZE_REQUEST_ID
+    elif RANDOMIZE_BOTH:
+        return ADVERSARY_TASK_MODE.RRANDOMIZE_BOTH  # joint request ID x port number search
+
+    return None
+
+def serve(sock, argv):
+    '''
+        Serve the socket with the selected engine, run by the single server process or by every worker.
+    '''
+
+    zoneWatcher = None
+    tcpServer = None
+    try:
+        adversaryTask = None
+        if argv.adversary: # attacking mode
+            setAdversaryModetask(argv.task)
+            adversaryTask = getAdversaryTask()
+
+        if argv.zoneWatch:   # this process's own watcher, the zones are swapped under its engine
+            zoneWatcher = DNSFunctions.startZoneWatcher(adversaryMode=argv.adversary, interval=argv.zoneWatch)
+        scheduleLogging = None
+        if RING_LOGGER is not None:     # the worker's own ring, the logger process does the logging
+            scheduleLogging = RING_LOGGER.getScheduler(DNSFunctions.WORKER_INDEX)
+
+        if argv.tcp and not argv.adversary:     # the forging modes only answer over UDP
+            ip, port = sock.getsockname()[:2]
+            tcpServer = DNSTCP.TCPServer(argv, scheduleLogging=scheduleLogging)    # the same ring as the UDP queries
+            tcpServer.start(DNSWorkers.bindTCPSocket(ip, port, reusePort=DNSWorkers.isReusePort(sock)))
+
+        if argv.engine == ENGINE_ZERO_COPY:
+            DNSEngine.runZeroCopy(sock, argv, adversaryTask=adversaryTask, numberOfTries=NUMBER_OF_TRIES, scheduleLogging=scheduleLogging)
+        elif argv.engine == ENGINE_BATCHED:
+            DNSEngine.runBatched(sock, argv, adversaryTask=adversaryTask, numberOfTries=NUMBER_OF_TRIES, scheduleLogging=scheduleLogging)
+        else:
+            DNSEngine.run(sock, argv, adversaryTask=adversaryTask, numberOfTries=NUMBER_OF_TRIES, scheduleLogging=scheduleLogging)
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as ex:
+        Helper.loggingError(str('ERROR: main ' + traceback.format_exc()))
+        Helper.printOnScreenAlways("\nERROR: Terminated!!! :" + str(ex),MSG_TYPES.ERROR)
+    finally:
+        if zoneWatcher is not None:
+            zoneWatcher.stop()
+        if tcpServer is not None:
+            tcpServer.stop()
+            stats = tcpServer.getStats()
+            Helper.printOnScreenAlways('TCP: %d connections (%d rejected, %d idle closed), %d queries' % (
+                stats['accepted'], stats['rejected'], stats['idleClosed'], stats['queries']), MSG_TYPES.YELLOW)
+        if DNSFunctions.PORT_SWEEPER is not None:
+            DNSFunctions.PORT_SWEEPER.stop()
+        if DNSFunctions.RATE_LIMITER is not None:
+            stats = DNSFunctions.RATE_LIMITER.getStats()
+            Helper.printOnScreenAlways('Rate limited: %d dropped, %d truncated (%d buckets)' % (stats['dropped'], stats['truncated'], stats['buckets']),
+                                       MSG_TYPES.YELLOW)
+
+def getSearchScheduler(argv):
+    '''
+        The joint request ID x port number search, ordered by the resolvers' ports/IDs in the enabled logs.
+    '''
+
+    searchScheduler = CandidateSearch.SearchScheduler()
+    try:
+        if argv.database and os.path.exists(argv.database):
+            searchScheduler.learnFromQueryStore(argv.database)
+        if argv.binaryLog:
+            searchScheduler.learnFromBinaryLog(argv.binaryLog + '_*.qlog')
+    except Exception as ex:    # e.g. numpy is missing, the search starts from uniform distributions
+        Helper.printOnScreenAlways('Joint search - the logs could not be learned: %s' % ex, MSG_TYPES.ERROR)
+    Helper.printOnScreenAlways(
+        '                          *****   JOINT ID x PORT SEARCH: %d resolvers learned from the logs  *****' %
+        len(searchScheduler.distributions), MSG_TYPES.YELLOW)
+
+    return searchScheduler
+
 def main(argv, IP):
 
     global  FORCE_NOT_RESPONSE_MEG
+    global  RING_LOGGER
     letterCaseRandomize = argv.rcase
     port = argv.port
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((IP, port))
+    workers = argv.workers
+    if workers > 1 and not DNSWorkers.isReusePortSupported():
+        Helper.printOnScreenAlways('SO_REUSEPORT is not supported on this platform, running one worker only', MSG_TYPES.ERROR)
+        workers = 1
 
     printPortAndIP(IP, port)
     if letterCaseRandomize:
@@ -80,43 +178,70 @@ def main(argv, IP):
     if FORCE_NOT_RESPONSE_MODE:
         Helper.printOnScreenAlways(
             '                                      *****   NO RESPONSE MODE  IS ACTIVATED  *****', MSG_TYPES.YELLOW)
+    if argv.database:
+        Helper.printOnScreenAlways(
+            '                                   *****   QUERY STORE: %s  *****' % argv.database, MSG_TYPES.YELLOW)
+        DNSFunctions.enableQueryStore(argv.database)
+    if argv.binaryLog:
+        Helper.printOnScreenAlways(
+            '                                   *****   BINARY LOG: %s  *****' % argv.binaryLog, MSG_TYPES.YELLOW)
+        DNSFunctions.enableBinaryLog(argv.binaryLog)
+    if argv.rateLimit:
+        Helper.printOnScreenAlways(
+            '                        *****   RATE LIMIT: %s queries/sec (ip,/24,qname), slip %d  *****' % (argv.rateLimit, argv.rateLimitSlip),
+            MSG_TYPES.YELLOW)
+        DNSFunctions.enableRateLimiter(RateLimiter.fromSpec(argv.rateLimit, argv.rateLimitSlip, workers))
+    if argv.ednsPayload != DNSFunctions.EDNS_PAYLOAD_SIZE:
+        Helper.printOnScreenAlways(
+            '                                   *****   EDNS0 UDP PAYLOAD: %s  *****' % (argv.ednsPayload or 'DISABLED'), MSG_TYPES.YELLOW)
+    DNSFunctions.setEdnsPayloadSize(argv.ednsPayload)
+    if argv.consoleLines >= 0:
+        DNSFunctions.enableConsoleRenderer(ConsoleRenderer.ConsoleRenderer(argv.consoleLines))
     DNSFunctions.loadRealZone()
-    try:
-        if not ADVERSARY_Mode:
-            # keep listening
-            #DNSFunctions.loadRealZone()
-
-            while 1:
-                data, addr = sock.recvfrom(512)
-                response, allowResponse = DNSFunctions.getResponse(data, addr, letterCaseRandomize, forceNotResponseMode=FORCE_NOT_RESPONSE_MODE )
-                if allowResponse:
-                    sock.sendto(response, addr)
-
-        elif ADVERSARY_Mode: # attacking mode
+    if ADVERSARY_Mode:
+        Helper.printOnScreenAlways(
+            '                                     *****   ADVERSARY MODE IS ACTIVATED  *****', MSG_TYPES.YELLOW)
+        DNSFunctions.loadFakeZone()
+        if argv.forgeRate:
             Helper.printOnScreenAlways(
-                '                                     *****   ADVERSARY MODE IS ACTIVATED  *****', MSG_TYPES.YELLOW)
-            DNSFunctions.loadFakeZone()
-            setAdversaryModetask(argv.task)
-            # keep listening
-            while 1:
-                data, addr = sock.recvfrom(512)
-                if RANDOMIZE_PORT is True:  ## try all the possible Port Number 1  to 65556
-                    response = DNSFunctions.getResponse(data, addr, case_sensitive=False,adversaryMode=ADVERSARY_Mode,withoutRequestId=False)  # we get the correct response.
-                    DNSFunctions.generateResponseWithPortNumber(response, sock, addr, NUMBER_OF_TRIES)  # brute force all the possible port number
-
-                elif RANDOMIZE_REQUEST_ID is True:  ## try all the possible request IDs 1  to 65556
-                    response = DNSFunctions.getResponse(data, addr, case_sensitive=False,adversaryMode=ADVERSARY_Mode,withoutRequestId=True)  # forge response without request ID, later we forge the ID and combine it with the whole response
-                    DNSFunctions.generateResponseWithRequestId(response, sock, addr, NUMBER_OF_TRIES)  # brute force # we get the response once without Tre_id
-
-                elif RANDOMIZE_BOTH:
-                    # response = DNSFunctions.getResponse(data, addr, case_sensitive=False, adversaryMode=ADVERSARY_Mode,
-                    # withoutRequestId=True)  # forge response without request ID, later we forge the ID and combine it with the whole response
-                    # DNSFunctions.generat
-                    pass
+                '                                  *****   FORGING RATE CAP: %d packets/sec  *****' % argv.forgeRate, MSG_TYPES.YELLOW)
+            DNSFunctions.setForgeRate(argv.forgeRate)
+        if argv.sweepWorkers and argv.task == ADVERSARY_TASK_MODE.RRANDOMIZE_PORT_NUMBER.value:
+            Helper.printOnScreenAlways(
+                '                                  *****   PORT SWEEP: %d WORKERS  *****' % argv.sweepWorkers, MSG_TYPES.YELLOW)
+            DNSFunctions.enablePortSweeper(PortSweep.PortSweeper(argv.sweepWorkers, rate=argv.forgeRate))
+        if argv.task == ADVERSARY_TASK_MODE.RRANDOMIZE_BOTH.value:
+            DNSFunctions.enableJointSearch(getSearchScheduler(argv))
+
+    metrics = None
+    if argv.metrics:
+        metrics = Metrics.Metrics(workers)
+        DNSFunctions.enableMetrics(metrics)
+    if argv.loggerProcess:
+        Helper.printOnScreenAlways(
+            '                                     *****   LOGGER PROCESS IS ACTIVATED  *****', MSG_TYPES.YELLOW)
+        RING_LOGGER = RingLogger(rings=workers)
+        RING_LOGGER.start()
+        if metrics is not None:
+            metrics.getRingStats = RING_LOGGER.getStats
+    if metrics is not None:
+        Helper.printOnScreenAlways(
+            '                                   *****   METRICS: %s/metrics  *****' % argv.metrics, MSG_TYPES.YELLOW)
+        Metrics.startServer(metrics, argv.metrics)
 
-    except Exception as ex:
-        Helper.loggingError(str('ERROR: main ' + traceback.format_exc()))
-        Helper.printOnScreenAlways("\nERROR: Terminated!!! :" + str(ex),MSG_TYPES.ERROR)
+    try:
+        if workers > 1:
+            Helper.printOnScreenAlways(
+                '                                       *****   %d WORKERS MODE IS ACTIVATED  *****' % workers, MSG_TYPES.YELLOW)
+            supervisor = DNSWorkers.WorkerSupervisor(workers, IP, port)
+            supervisor.run(serve, argv)
+        else:
+            sock = DNSWorkers.bindSocket(IP, port)
+            serve(sock, argv)
+    finally:
+        if RING_LOGGER is not None:
+            RING_LOGGER.stop()
+            RING_LOGGER = None
 
 def run(argv):
 
@@ -137,7 +262,7 @@ def run(argv):
 
 if __name__ == '__main__':
     try: # on the server
-            setArgs = argparse.Namespace(l=True, adversary=False, port=53, rcase=True, s=False, task='rport', dont=True)
+            setArgs = argparse.Namespace(l=True, adversary=False, port=53, rcase=True, s=False, task='rport', dont=True, workers=1, engine=ENGINE_ASYNCIO, database=None, binaryLog=None, loggerProcess=False, metrics=None, rateLimit=None, rateLimitSlip=2, forgeRate=0, sweepWorkers=0, zoneWatch=1.0, tcp=False, ednsPayload=1232, consoleLines=ConsoleRenderer.LINES_PER_SECOND)
             run(setArgs)
 
     except Exception as ex: # locally
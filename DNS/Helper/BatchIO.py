@@ -0,0 +1,241 @@
+#! /usr/bin/env python3
+
+'''
+    Batched UDP I/O: move up to BATCH_SIZE datagrams per syscall with the Linux recvmmsg/sendmmsg
+    (called through ctypes), with a plain recvfrom_into/sendto fallback using the same interface.
+'''
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import sys
+
+BATCH_SIZE = 64         # datagrams per syscall
+BUFFER_SIZE = 4096      # bytes per datagram slot
+MSG_WAITFORONE = 0x10000  # recvmmsg: block for the first datagram only, then take what is queued
+
+
+class iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class sockaddr_in(ctypes.Structure):
+    _fields_ = [('sin_family', ctypes.c_ushort), ('sin_port', ctypes.c_uint16),
+                ('sin_addr', ctypes.c_ubyte * 4), ('sin_zero', ctypes.c_ubyte * 8)]
+
+
+SOCKADDR_SIZE = ctypes.sizeof(sockaddr_in)
+PORT_OFFSET = sockaddr_in.sin_port.offset   # network order port inside a sockaddr_in
+
+
+class msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(iovec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', msghdr), ('msg_len', ctypes.c_uint)]
+
+
+LIBC = None
+if sys.platform.startswith('linux'):
+    try:
+        LIBC = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        if not (hasattr(LIBC, 'recvmmsg') and hasattr(LIBC, 'sendmmsg')):
+            LIBC = None
+    except OSError:
+        LIBC = None
+
+#
+def isSupported():
+    return LIBC is not None
+
+
+class MessageVector():
+    '''
+        BATCH_SIZE preallocated mmsghdr entries, each one with its own buffer slot and address.
+    '''
+
+    def __init__(self, batchSize, bufferSize):
+        self.batchSize = batchSize
+        self.buffers = (ctypes.c_ubyte * (batchSize * bufferSize))()
+        self.addresses = (sockaddr_in * batchSize)()
+        self.iovecs = (iovec * batchSize)()
+        self.messages = (mmsghdr * batchSize)()
+        self.lastAddresses = [None] * batchSize     # skip re-encoding the address when it did not change
+        bufferView = memoryview(self.buffers).cast('B')
+        self.views = [bufferView[i * bufferSize:(i + 1) * bufferSize] for i in range(batchSize)]
+        base = ctypes.addressof(self.buffers)
+        for i in range(batchSize):
+            self.iovecs[i].iov_base = base + i * bufferSize
+            self.iovecs[i].iov_len = bufferSize
+            header = self.messages[i].msg_hdr
+            header.msg_name = ctypes.addressof(self.addresses[i])
+            header.msg_namelen = SOCKADDR_SIZE
+            header.msg_iov = ctypes.pointer(self.iovecs[i])
+            header.msg_iovlen = 1
+
+    def getAddress(self, i):
+        address = self.addresses[i]
+        return (socket.inet_ntoa(bytes(address.sin_addr)), socket.ntohs(address.sin_port))
+
+    def setAddress(self, i, addr):
+        if self.lastAddresses[i] == addr:
+            return
+        self.lastAddresses[i] = addr
+        address = self.addresses[i]
+        address.sin_family = socket.AF_INET
+        address.sin_port = socket.htons(addr[1])
+        ctypes.memmove(address.sin_addr, socket.inet_aton(addr[0]), 4)
+
+    def getAddressView(self):
+        '''
+            Bytes of the slot addresses for patching the ports in place (PORT_OFFSET of slot i is at i * SOCKADDR_SIZE),
+            the cached addresses of setAddress are forgotten.
+        '''
+
+        self.lastAddresses = [None] * self.batchSize
+
+        return memoryview(self.addresses).cast('B')
+
+
+class MMsgUDPIO():
+    '''
+        recvmmsg/sendmmsg backend.
+    '''
+
+    batched = True
+
+    def __init__(self, sock, batchSize=BATCH_SIZE, bufferSize=BUFFER_SIZE):
+        self.sock = sock
+        self.fd = sock.fileno()
+        self.batchSize = batchSize
+        self.bufferSize = bufferSize
+        self.receiving = MessageVector(batchSize, bufferSize)
+        self.sending = MessageVector(batchSize, bufferSize)
+        self.sendViews = self.sending.views
+        self.received = batchSize     # slots filled by the last recvmmsg, their msg_namelen must be reset
+        self.syscalls = 0
+
+    def receive(self):
+        '''
+            Block until at least one datagram arrives, return [(memoryview, addr)], valid until the next receive.
+        '''
+
+        messages = self.receiving.messages
+        for i in range(self.received):
+            messages[i].msg_hdr.msg_namelen = SOCKADDR_SIZE
+        while 1:
+            count = LIBC.recvmmsg(self.fd, self.receiving.messages, self.batchSize, MSG_WAITFORONE, None)
+            self.syscalls += 1
+            if count >= 0:
+                break
+            error = ctypes.get_errno()
+            if error != errno.EINTR:
+                raise OSError(error, os.strerror(error))
+
+        self.received = count
+        views = self.receiving.views
+        getAddress = self.receiving.getAddress
+
+        return [(views[i][:messages[i].msg_len], getAddress(i)) for i in range(count)]
+
+    def sendPrepared(self, entries):
+        '''
+            Send the first len(entries) slots of sendViews, entries are (length, addr).
+        '''
+
+        for i, (length, addr) in enumerate(entries):
+            self.sending.iovecs[i].iov_len = length
+            self.sending.setAddress(i, addr)
+
+        return self.sendSlots(len(entries))
+
+    def sendSlots(self, count):
+        '''
+            Send the first count slots as they are, their payload, iov_len and address were set by the caller.
+        '''
+
+        sent = 0
+        while sent < count:
+            result = LIBC.sendmmsg(self.fd, ctypes.byref(self.sending.messages, sent * ctypes.sizeof(mmsghdr)), count - sent, 0)
+            self.syscalls += 1
+            if result < 0:
+                error = ctypes.get_errno()
+                if error == errno.EINTR:
+                    continue
+                raise OSError(error, os.strerror(error))
+            sent += result
+
+        return sent
+
+    def sendmany(self, packets):
+        '''
+            Send an iterable of (payload, addr), batchSize datagrams per syscall.
+        '''
+
+        entries = []
+        sent = 0
+        for payload, addr in packets:
+            slot = self.sendViews[len(entries)]
+            slot[:len(payload)] = payload
+            entries.append((len(payload), addr))
+            if len(entries) == self.batchSize:
+                sent += self.sendPrepared(entries)
+                entries = []
+        if entries:
+            sent += self.sendPrepared(entries)
+
+        return sent
+
+
+class PlainUDPIO():
+    '''
+        Fallback backend with the same interface, one syscall per datagram.
+    '''
+
+    batched = False
+
+    def __init__(self, sock, batchSize=BATCH_SIZE, bufferSize=BUFFER_SIZE):
+        self.sock = sock
+        self.batchSize = batchSize
+        self.receiveView = memoryview(bytearray(bufferSize))
+        self.sendViews = [memoryview(bytearray(bufferSize)) for i in range(batchSize)]
+        self.syscalls = 0
+
+    def receive(self):
+        nbytes, addr = self.sock.recvfrom_into(self.receiveView)
+        self.syscalls += 1
+
+        return [(self.receiveView[:nbytes], addr)]
+
+    def sendPrepared(self, entries):
+        for i, (length, addr) in enumerate(entries):
+            self.sock.sendto(self.sendViews[i][:length], addr)
+        self.syscalls += len(entries)
+
+        return len(entries)
+
+    def sendmany(self, packets):
+        sent = 0
+        for payload, addr in packets:
+            self.sock.sendto(payload, addr)
+            sent += 1
+        self.syscalls += sent
+
+        return sent
+
+#
+def getBatchIO(sock, batchSize=BATCH_SIZE, bufferSize=BUFFER_SIZE):
+    '''
+        recvmmsg/sendmmsg when available (Linux, IPv4 socket), the plain socket path otherwise.
+    '''
+
+    if isSupported() and sock.family == socket.AF_INET:
+        return MMsgUDPIO(sock, batchSize, bufferSize)
+
+    return PlainUDPIO(sock, batchSize, bufferSize)
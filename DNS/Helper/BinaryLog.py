@@ -0,0 +1,280 @@
+#! /usr/bin/env python3
+
+'''
+    Fixed-width binary query log. Every process appends RECORD_SIZE-byte records to
+    '<path>_<date>_<pid>.qlog' and the query names, NUL terminated and written once, to the
+    matching '.qnames' string table. The reader memory-maps both files and returns the records
+    as a NumPy structured array (numpy is only needed to read the log, not to write it).
+    Every record keeps the letter case of the query name and of the name sent back (LetterCase
+    bitmasks), so the 0x20 checks are compared in bulk instead of as strings.
+'''
+
+import atexit
+import datetime
+import glob
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+import logging
+import traceback
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from Helper import LetterCase
+
+MAGIC = b'DNSQLOG1'
+FILE_HEADER = struct.Struct('<8sHH4x')      # magic, version, record size
+HEADER_SIZE = FILE_HEADER.size
+VERSION = 2
+# timestamp (ns), source IPv4, source port, transaction ID, qtype, flags, offset of the qname in the string table,
+# letter case of the query name, letter case of the name in the answer (LetterCase.getCaseBits)
+RECORD = struct.Struct('<QIHHHHIQQ')
+RECORD_SIZE = RECORD.size
+RECORD_FIELDS = [('timestamp', '<u8'), ('srcIP', '<u4'), ('srcPort', '<u2'), ('requestId', '<u2'),
+                 ('qtype', '<u2'), ('flags', '<u2'), ('nameOffset', '<u4'), ('queryCase', '<u8'), ('answerCase', '<u8')]
+RECORD_FIELDS_V1 = RECORD_FIELDS[:7]    # version 1 logs, read with the letter cases set to 0
+RECORD_SIZE_V1 = struct.calcsize('<QIHHHHI')
+
+FLAG_ERROR = 0x1        # the name was not found in the zone
+FLAG_CHECK = 0x2        # a check_ (0x20 probing) request
+FLAG_MODIFIED = 0x4     # answered with the letter case swapped
+
+BUFFER_SIZE = 256 * 1024    # bytes of records kept before a write is forced
+FLUSH_INTERVAL = 1.0        # seconds
+NAME_CACHE_SIZE = 65536     # names remembered with their offset, written again once forgotten
+
+# the DNSCodec type codes, repeated so the reader can be imported from the analysis tools
+TYPE_CODES = {'A': 1, 'NS': 2, 'CNAME': 5, 'SOA': 6, 'MX': 15, 'TXT': 16, 'AAAA': 28, 'ANY': 255}
+
+
+class BinaryLog():
+
+    def __init__(self, path, bufferSize=BUFFER_SIZE, flushInterval=FLUSH_INTERVAL):
+        self.path = path
+        self.bufferSize = bufferSize
+        self.flushInterval = flushInterval
+        self.lock = threading.Lock()
+        self.pid = None
+        self.date = None
+        self.recordFile = None
+        self.nameFile = None
+        self.nameOffset = 0
+        self.names = {}
+        self.records = bytearray()
+        self.strings = bytearray()
+        self.written = 0
+        self.stopped = threading.Event()
+        atexit.register(self.close)
+
+    def start(self):
+        '''
+            Start the flushing thread, again in a forked worker, every process writes its own files.
+        '''
+
+        self.pid = os.getpid()
+        self.date = None
+        self.recordFile = self.nameFile = None
+        self.names = {}
+        self.records = bytearray()
+        self.strings = bytearray()
+        self.stopped = threading.Event()
+        threading.Thread(target=self.run, name='BinaryLog', daemon=True).start()
+
+    def append(self, status, recordType, requestId, srcIP, srcPort, domain, mode='none', modifiedDomain=''):
+        flags = 0
+        if status == 'ERROR':
+            flags |= FLAG_ERROR
+        if mode == 'check':
+            flags |= FLAG_CHECK
+        queryCase = answerCase = LetterCase.getCaseBits(domain)
+        if modifiedDomain:
+            flags |= FLAG_MODIFIED
+            answerCase = LetterCase.getCaseBits(modifiedDomain)
+        ip = struct.unpack('!I', socket.inet_aton(srcIP))[0]
+
+        with self.lock:
+            if self.pid != os.getpid():
+                self.start()
+            date = datetime.date.today().isoformat()
+            if date != self.date:
+                self.rotate(date)
+            offset = self.names.get(domain)
+            if offset is None:
+                if len(self.names) >= NAME_CACHE_SIZE:
+                    self.names.clear()
+                offset = self.nameOffset
+                name = domain.encode('latin-1') + b'\0'
+                self.strings += name
+                self.nameOffset += len(name)
+                self.names[domain] = offset
+            self.records += RECORD.pack(time.time_ns(), ip, int(srcPort), int(requestId),
+                                        TYPE_CODES.get(recordType, 0), flags, offset, queryCase, answerCase)
+            if len(self.records) >= self.bufferSize:
+                self.flushLocked()
+
+    def rotate(self, date):
+        '''
+            New day: flush the old files and open '<path>_<date>_<pid>.qlog/.qnames'.
+        '''
+
+        self.flushLocked()
+        for file in (self.recordFile, self.nameFile):
+            if file is not None:
+                file.close()
+        self.date = date
+        self.names = {}
+        base = '%s_%s_%d' % (self.path, date, self.pid)
+        directory = os.path.dirname(base)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.recordFile = open(base + '.qlog', 'ab')
+        if self.recordFile.tell() == 0:
+            self.recordFile.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+        self.nameFile = open(base + '.qnames', 'ab')
+        self.nameOffset = self.nameFile.tell()
+
+    def run(self):
+        while not self.stopped.wait(self.flushInterval):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                self.flushLocked()
+
+    def flushLocked(self):
+        if not self.records or self.recordFile is None:
+            return
+        try:
+            self.nameFile.write(self.strings)  # names first, a record never points past the table
+            self.nameFile.flush()
+            self.recordFile.write(self.records)
+            self.recordFile.flush()
+            self.written += len(self.records) // RECORD_SIZE
+        except Exception as ex:
+            logging.error('BinaryLog - flush: \n%s ' % traceback.format_exc())
+        self.records = bytearray()
+        self.strings = bytearray()
+
+    def close(self):
+        self.stopped.set()
+        self.flush()
+
+#<editor-fold desc="******************* Reader *******************">
+
+#
+def getDType():
+    if numpy is None:
+        raise ImportError('numpy is required to read the binary query log')
+
+    return numpy.dtype(RECORD_FIELDS)
+
+#
+def loadRecords(recordFile):
+    '''
+        Memory-map a .qlog file as a read-only NumPy structured array (no copy, no parsing).
+    '''
+
+    dtype = getDType()
+    with open(recordFile, 'rb') as file:
+        magic, version, recordSize = FILE_HEADER.unpack(file.read(HEADER_SIZE))
+    if magic == MAGIC and version == 1 and recordSize == RECORD_SIZE_V1:
+        return loadRecordsV1(recordFile)
+    if magic != MAGIC or recordSize != RECORD_SIZE:
+        raise ValueError('%s is not a version %d binary query log' % (recordFile, VERSION))
+    count = (os.path.getsize(recordFile) - HEADER_SIZE) // RECORD_SIZE   # ignore a half-written last record
+    if count == 0:
+        return numpy.zeros(0, dtype=dtype)
+
+    return numpy.memmap(recordFile, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+#
+def loadRecordsV1(recordFile):
+    '''
+        A version 1 .qlog file (no letter cases), copied into the current record layout.
+    '''
+
+    count = (os.path.getsize(recordFile) - HEADER_SIZE) // RECORD_SIZE_V1
+    records = numpy.zeros(count, dtype=getDType())
+    if count:
+        old = numpy.memmap(recordFile, dtype=numpy.dtype(RECORD_FIELDS_V1), mode='r', offset=HEADER_SIZE, shape=(count,))
+        for name, fieldType in RECORD_FIELDS_V1:
+            records[name] = old[name]
+
+    return records
+
+
+class NameTable():
+    '''
+        Memory-mapped .qnames string table.
+    '''
+
+    def __init__(self, nameFile):
+        self.file = open(nameFile, 'rb')
+        size = os.path.getsize(nameFile)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def getName(self, offset):
+        end = self.data.find(b'\0', offset)
+        return self.data[offset:end].decode('latin-1')
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+#
+def loadLog(recordFile):
+    '''
+        Return (records, NameTable) of one .qlog file.
+    '''
+
+    return loadRecords(recordFile), NameTable(recordFile[:-len('.qlog')] + '.qnames')
+
+#
+def loadAll(pattern):
+    '''
+        Concatenate the records of all the .qlog files matching pattern, e.g. 'Logs/queries_*.qlog'.
+        The nameOffset field is only meaningful with the NameTable of its own file.
+    '''
+
+    arrays = [loadRecords(recordFile) for recordFile in sorted(glob.glob(pattern))]
+    if not arrays:
+        return numpy.zeros(0, dtype=getDType())
+
+    return numpy.concatenate(arrays)
+
+#
+def getCaseMismatches(records):
+    '''
+        True where the name was sent back with another letter case than the query's (the 0x20 probes).
+    '''
+
+    return records['answerCase'] != records['queryCase']
+
+#
+def getCaseMatches(records, names):
+    '''
+        0x20 check in bulk: True where names[i], the name observed for records[i] (by the client or in a
+        later query of the resolver), has the letter case the server sent, compared as case bitmasks.
+    '''
+
+    observed = numpy.fromiter((LetterCase.getCaseBits(name) for name in names), dtype='<u8', count=len(names))
+
+    return observed == records['answerCase']
+
+#
+def ipToString(ip):
+    return socket.inet_ntoa(struct.pack('!I', int(ip)))
+
+#
+def ipToInt(ip):
+    return struct.unpack('!I', socket.inet_aton(ip))[0]
+
+# </editor-fold>
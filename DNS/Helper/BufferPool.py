@@ -0,0 +1,50 @@
+#! /usr/bin/env python3
+
+'''
+    Pool of preallocated receive buffers, so the serving loop does not allocate a new bytes per packet.
+'''
+
+import threading
+
+BUFFER_SIZE = 4096  # larger than any UDP query we accept
+POOL_SIZE = 64
+
+
+class BufferPool():
+    '''
+        Hands out memoryviews on preallocated bytearrays, ready for recvfrom_into/recvmmsg.
+    '''
+
+    def __init__(self, count=POOL_SIZE, size=BUFFER_SIZE):
+        self.size = size
+        self.free = [memoryview(bytearray(size)) for i in range(count)]
+        self.lock = threading.Lock()
+        self.allocated = count  # buffers created, grows only when the pool runs dry
+
+    def acquire(self):
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            self.allocated += 1
+
+        return memoryview(bytearray(self.size))
+
+    def release(self, view):
+        with self.lock:
+            self.free.append(view)
+
+
+class PrefixViews(dict):
+    '''
+        The views on the first n bytes of a buffer, by n, sliced once: a loop that handles one packet at a
+        time reads and writes them without a new memoryview per packet (at most the size of the buffer).
+    '''
+
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+
+    def __missing__(self, length):
+        prefix = self[length] = self.view[:length]
+
+        return prefix
@@ -0,0 +1,246 @@
+#! /usr/bin/env python3
+
+'''
+    Non-repeating candidate generators for the adversary mode.
+    A keyed Feistel network (a small format-preserving cipher) permutes [0, 2^bits), cycle walking
+    restricts it to any size, so the n-th candidate is computed from n and nothing is stored.
+    The joint transaction ID x port search splits the 2^32 space into BUCKETS x BUCKETS blocks,
+    visits the blocks in the order of the resolver's port/ID distribution learned from the logs
+    and the queries it sends us, and resumes where the previous trigger stopped.
+'''
+
+import random
+
+from collections import OrderedDict
+
+ROUNDS = 4
+BUCKET_BITS = 10                        # 1024 ports / IDs per bucket
+BUCKET_SIZE = 1 << BUCKET_BITS
+BUCKET_MASK = BUCKET_SIZE - 1
+BUCKETS = 65536 >> BUCKET_BITS          # 64 port buckets x 64 ID buckets
+BLOCK_SIZE = BUCKET_SIZE * BUCKET_SIZE  # candidates of one (port bucket, ID bucket) block
+SPACE_SIZE = 65535 * 65536              # ports 1-65535 x IDs 0-65535
+MAX_RESOLVERS = 4096                    # resolvers whose search/distribution is kept, least recently used first out
+
+
+class Permutation():
+    '''
+        Keyed bijection of [0, size): balanced Feistel network over the next even power of two, with cycle walking.
+    '''
+
+    def __init__(self, size, key=None, rounds=ROUNDS):
+        bits = max(2, (size - 1).bit_length())
+        bits += bits & 1
+        self.size = size
+        self.half = bits // 2
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(key)
+        self.keys = [rng.getrandbits(32) for i in range(rounds)]
+
+    def encrypt(self, value):
+        half = self.half
+        mask = self.mask
+        left = value >> half
+        right = value & mask
+        for key in self.keys:
+            mixed = ((right ^ key) * 0x9E3779B1) & 0xffffffff
+            left, right = right, left ^ ((mixed ^ (mixed >> 15)) & mask)
+
+        return (left << half) | right
+
+    def get(self, index):
+        '''
+            The index-th element of the permutation, index < size.
+        '''
+
+        value = self.encrypt(index)
+        while value >= self.size:   # at most 4x the size, a few steps on average
+            value = self.encrypt(value)
+
+        return value
+
+#
+def getDistinct(count, first=1, last=65535):
+    '''
+        count distinct random values of first..last (request IDs or port numbers), in a random order.
+    '''
+
+    permutation = Permutation(last - first + 1, random.getrandbits(64))
+    for index in range(min(count, last - first + 1)):
+        yield first + permutation.get(index)
+
+
+class Distribution():
+    '''
+        Source port and transaction ID histograms of one resolver (BUCKETS buckets each, add-one smoothing).
+    '''
+
+    def __init__(self):
+        self.ports = [1] * BUCKETS
+        self.ids = [1] * BUCKETS
+        self.samples = 0
+
+    def add(self, srcPort, requestId):
+        self.ports[srcPort >> BUCKET_BITS] += 1
+        self.ids[requestId >> BUCKET_BITS] += 1
+        self.samples += 1
+
+    def addCounts(self, portCounts, idCounts):
+        for bucket in range(BUCKETS):
+            self.ports[bucket] += int(portCounts[bucket])
+            self.ids[bucket] += int(idCounts[bucket])
+        self.samples += int(sum(portCounts))
+
+    def getProbability(self, block):
+        portBucket, idBucket = divmod(block, BUCKETS)
+        return self.ports[portBucket] * self.ids[idBucket] / (sum(self.ports) * sum(self.ids))
+
+
+class JointSearch():
+    '''
+        Resumable search of the ID x port space of one resolver, block by block in decreasing probability.
+        The candidates are (requestId << 16) | portNumber.
+    '''
+
+    def __init__(self, distribution, key=None):
+        self.distribution = distribution
+        self.permutation = Permutation(BLOCK_SIZE, random.getrandbits(64) if key is None else key)
+        self.done = bytearray(BUCKETS * BUCKETS)
+        self.block = None       # block in progress
+        self.position = 0       # candidates of the block already tried (or skipped, port 0)
+        self.tried = 0
+        self.doneMass = 0.0     # probability of the finished blocks
+
+    def getNextBlock(self):
+        '''
+            The most likely unfinished block, with the distribution as it is now.
+        '''
+
+        ports = self.distribution.ports
+        ids = self.distribution.ids
+        portOrder = sorted(range(BUCKETS), key=lambda bucket: -ports[bucket])
+        idOrder = sorted(range(BUCKETS), key=lambda bucket: -ids[bucket])
+        best = None
+        bestWeight = -1
+        for portBucket in portOrder:
+            if ports[portBucket] * ids[idOrder[0]] <= bestWeight:
+                break   # no later port bucket can beat it
+            for idBucket in idOrder:
+                weight = ports[portBucket] * ids[idBucket]
+                if weight <= bestWeight:
+                    break
+                if not self.done[portBucket * BUCKETS + idBucket]:
+                    best = portBucket * BUCKETS + idBucket
+                    bestWeight = weight
+                    break
+
+        return best
+
+    def getCandidates(self, count):
+        '''
+            The next count candidates, never one that was already returned, also when two runs interleave.
+        '''
+
+        get = self.permutation.get
+        while count > 0:
+            if self.block is None:
+                self.block = self.getNextBlock()
+                self.position = 0
+                if self.block is None:
+                    return      # the whole space was tried
+            block = self.block
+            portBucket, idBucket = divmod(block, BUCKETS)
+            portBase = portBucket << BUCKET_BITS
+            idBase = idBucket << BUCKET_BITS
+            while count > 0 and self.position < BLOCK_SIZE and self.block == block:
+                value = get(self.position)
+                self.position += 1
+                portNumber = portBase + (value >> BUCKET_BITS)
+                if portNumber == 0:
+                    continue
+                self.tried += 1
+                count -= 1
+                yield ((idBase + (value & BUCKET_MASK)) << 16) | portNumber
+            if self.block == block and self.position == BLOCK_SIZE:
+                self.done[block] = 1
+                self.doneMass += self.distribution.getProbability(block)
+                self.block = None
+
+    def getCoverage(self):
+        '''
+            (% of the ID x port space tried, % of the learned probability mass tried)
+        '''
+
+        mass = self.doneMass
+        if self.block is not None:
+            mass += self.distribution.getProbability(self.block) * self.position / BLOCK_SIZE
+
+        return 100.0 * self.tried / SPACE_SIZE, 100.0 * mass
+
+
+class SearchScheduler():
+    '''
+        One JointSearch per resolver IP, kept between the triggers, and the distributions they are ordered by.
+    '''
+
+    def __init__(self, maxResolvers=MAX_RESOLVERS):
+        self.maxResolvers = maxResolvers
+        self.distributions = OrderedDict()
+        self.searches = OrderedDict()
+
+    def getDistribution(self, srcIP):
+        distribution = self.distributions.get(srcIP)
+        if distribution is None:
+            distribution = self.distributions[srcIP] = Distribution()
+            if len(self.distributions) > self.maxResolvers:
+                self.distributions.popitem(last=False)
+        else:
+            self.distributions.move_to_end(srcIP)
+
+        return distribution
+
+    def observe(self, srcIP, srcPort, requestId):
+        '''
+            Learn from a query of the resolver: its source port and transaction ID.
+        '''
+
+        self.getDistribution(srcIP).add(srcPort, requestId)
+
+    def learnFromQueryStore(self, path):
+        '''
+            Learn from the requests of the SQLite query store (-db).
+        '''
+
+        from Helper import QueryStore
+        for srcIP, srcPort, requestId in QueryStore.getSamples(path):
+            self.observe(srcIP, srcPort, requestId)
+
+    def learnFromBinaryLog(self, pattern):
+        '''
+            Learn from the binary query logs matching pattern (-bl), e.g. 'Logs/queries_*.qlog'.
+        '''
+
+        from Helper import BinaryLog
+        records = BinaryLog.loadAll(pattern)
+        numpy = BinaryLog.numpy
+        ips, inverse = numpy.unique(records['srcIP'], return_inverse=True)
+        portCounts = numpy.zeros((len(ips), BUCKETS), dtype=numpy.int64)
+        idCounts = numpy.zeros((len(ips), BUCKETS), dtype=numpy.int64)
+        numpy.add.at(portCounts, (inverse, records['srcPort'] >> BUCKET_BITS), 1)
+        numpy.add.at(idCounts, (inverse, records['requestId'] >> BUCKET_BITS), 1)
+        for index, ip in enumerate(ips):
+            self.getDistribution(BinaryLog.ipToString(ip)).addCounts(portCounts[index], idCounts[index])
+
+    def getSearch(self, srcIP):
+        search = self.searches.get(srcIP)
+        if search is None:
+            search = self.searches[srcIP] = JointSearch(self.getDistribution(srcIP))
+            if len(self.searches) > self.maxResolvers:
+                self.searches.popitem(last=False)
+        else:
+            self.searches.move_to_end(srcIP)
+
+        return search
+
+    def getCandidates(self, srcIP, count):
+        return self.getSearch(srcIP).getCandidates(count)
@@ -0,0 +1,133 @@
+#! /usr/bin/env python3
+
+'''
+    Console output of the logged queries off the packet path: DNSFunctions.logRequest only counts the
+    query and, while the per-second line budget lasts, queues its row; a thread prints the queued rows
+    and a once-per-second summary (queries/sec, top resolvers, check / re_check probes).
+    A slow terminal only slows that thread down, the rows it can not keep up with are dropped and counted.
+    The counters, the resolvers and the budget are updated and swapped for new ones under one lock, the
+    serving threads (UDP, TCP) add while the printing thread renders.
+'''
+
+import atexit
+import os
+import sys
+import threading
+import time
+import logging
+import traceback
+
+from collections import Counter
+from collections import deque
+from stem.util import term
+
+from Helper.Helper import MSG_TYPES
+
+LINES_PER_SECOND = 20   # query rows printed per second at most, the others only show up in the summary
+MAX_PENDING = 1024      # rows queued for the printing thread, the oldest are dropped when it falls behind
+TOP_RESOLVERS = 3       # resolvers listed in the summary
+INTERVAL = 1.0          # seconds between two summaries
+
+
+class ConsoleRenderer():
+    '''
+        Every process that logs runs its own printing thread, started again after a fork.
+    '''
+
+    def __init__(self, linesPerSecond=LINES_PER_SECOND, interval=INTERVAL, maxPending=MAX_PENDING, stream=None):
+        self.linesPerSecond = linesPerSecond
+        self.interval = interval
+        self.stream = stream
+        self.pid = None
+        self.pending = deque(maxlen=maxPending)
+        self.budget = linesPerSecond
+        self.queries = 0
+        self.checks = 0
+        self.reChecks = 0
+        self.resolvers = Counter()
+        self.renderedAt = time.monotonic()
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self.resetLock)
+
+    def resetLock(self):
+        self.lock = threading.Lock()    # a thread of the parent may have held it when the process forked
+
+    def start(self):
+        '''
+            Start the printing thread, again in a forked worker (threads do not survive fork).
+        '''
+
+        self.pid = os.getpid()
+        self.pending.clear()    # the parent prints its own rows
+        self.resetCounters()
+        self.renderedAt = time.monotonic()
+        self.stopped = threading.Event()
+        threading.Thread(target=self.run, name='ConsoleRenderer', daemon=True).start()
+
+    def resetCounters(self):
+        self.budget = self.linesPerSecond
+        self.queries = 0
+        self.checks = 0
+        self.reChecks = 0
+        self.resolvers = Counter()
+
+    def add(self, printedRow, printStatus, srcIP, domain):
+        '''
+            Count one logged query and queue its row if the budget of this second allows, never waits.
+        '''
+
+        domain = domain.lower()
+        with self.lock:
+            if self.pid != os.getpid():
+                self.start()
+            self.queries += 1
+            self.resolvers[srcIP] += 1
+            if 're_check_' in domain:
+                self.reChecks += 1
+            elif 'check_' in domain:
+                self.checks += 1
+            if self.budget > 0:
+                self.budget -= 1
+                self.pending.append((printedRow, printStatus))
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.render()
+            except Exception as ex:
+                logging.error('ConsoleRenderer - run: \n%s ' % traceback.format_exc())
+
+    def render(self):
+        '''
+            Print the queued rows and the summary since the previous one, the counters start again from 0.
+        '''
+
+        with self.lock:     # printed outside the lock, a slow terminal never blocks add
+            now = time.monotonic()
+            seconds = now - self.renderedAt
+            self.renderedAt = now
+            queries, checks, reChecks, resolvers = self.queries, self.checks, self.reChecks, self.resolvers
+            shown = self.linesPerSecond - self.budget
+            self.resetCounters()
+            rows = list(self.pending)
+            self.pending.clear()
+        lines = [term.format(printedRow, printStatus.value) for printedRow, printStatus in rows]
+        if queries:
+            top = ', '.join('%s %d' % (ip, count) for ip, count in resolvers.most_common(TOP_RESOLVERS))
+            summary = ('%s - %.0f queries/sec | check: %d | re_check: %d | top resolvers: %s | %d row(s) not shown' %
+                       (time.strftime('%H:%M:%S'), queries / max(seconds, 1e-9), checks, reChecks, top, queries - shown))
+            lines.append(term.format(summary, MSG_TYPES.YELLOW.value))
+        if lines:
+            stream = self.stream or sys.stdout
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
+
+    def close(self):
+        self.stopped.set()
+        if self.pid == os.getpid():
+            try:
+                self.render()
+            except Exception as ex:
+                pass
@@ -0,0 +1,364 @@
+#! /usr/bin/env python3
+
+'''
+    DNS wire format codec (RFC 1035) shared by the DNS server, the forger and the attack tools.
+    Only depends on the standard library, so it can be imported as 'Helper.DNSCodec' from DNS/
+    or as 'DNS.Helper.DNSCodec' from the project root.
+'''
+
+import socket
+import struct
+
+HEADER = struct.Struct('!HHHHHH')   # ID, FLAGS, QDCOUNT, ANCOUNT, NSCOUNT, ARCOUNT
+QUESTION_TAIL = struct.Struct('!HH')    # QTYPE, QCLASS
+RECORD_TAIL = struct.Struct('!HHIH')    # TYPE, CLASS, TTL, RDLENGTH
+SOA_TAIL = struct.Struct('!IIIII')      # SERIAL, REFRESH, RETRY, EXPIRE, MINIMUM
+MX_PREFERENCE = struct.Struct('!H')
+HEADER_SIZE = HEADER.size
+
+POINTER_TO_QUESTION = b'\xc0\x0c'   # compression pointer to the first question name
+MAX_POINTERS = 64                   # compression pointers followed before giving up (loops)
+MAX_STRING = 255                    # bytes of one TXT character-string
+
+CLASS_IN = 1
+TYPE_A = 1
+TYPE_NS = 2
+TYPE_CNAME = 5
+TYPE_SOA = 6
+TYPE_MX = 15
+TYPE_TXT = 16
+TYPE_AAAA = 28
+TYPE_OPT = 41
+TYPE_ANY = 255
+
+RCODE_NXDOMAIN = 3      # the name does not exist
+RCODE_REFUSED = 5       # the name is in none of the zones of the server
+AA_FLAG = 0x04          # Authoritative Answer bit of the first flags byte
+
+EDNS_VERSION = 0        # the only EDNS version (RFC 6891)
+RCODE_BADVERS = 16      # extended RCODE of an unsupported EDNS version
+EDNS_DO = 0x8000        # DNSSEC OK flag of the OPT record
+
+TYPE_NAMES = {TYPE_A: 'A', TYPE_NS: 'NS', TYPE_CNAME: 'CNAME', TYPE_SOA: 'SOA', TYPE_MX: 'MX',
+              TYPE_TXT: 'TXT', TYPE_AAAA: 'AAAA', TYPE_OPT: 'OPT', TYPE_ANY: 'ANY'}
+TYPE_CODES = dict((name, code) for code, name in TYPE_NAMES.items())
+
+
+class DNSCodecError(Exception):
+    pass
+
+
+class DNSQuestion():
+
+    __slots__ = ('labels', 'qtype', 'qclass')
+
+    def __init__(self, labels, qtype, qclass=CLASS_IN):
+        self.labels = labels
+        self.qtype = qtype
+        self.qclass = qclass
+
+    def getName(self):
+        return '.'.join(self.labels)
+
+
+class DNSRecord():
+
+    __slots__ = ('labels', 'rtype', 'rclass', 'ttl', 'rdata')
+
+    def __init__(self, labels, rtype, rclass, ttl, rdata):
+        self.labels = labels
+        self.rtype = rtype
+        self.rclass = rclass
+        self.ttl = ttl
+        self.rdata = rdata
+
+    def getName(self):
+        return '.'.join(self.labels)
+
+
+class DNSMessage():
+
+    __slots__ = ('id', 'flags', 'questions', 'answers', 'authority', 'additional')
+
+    def __init__(self, id=0, flags=0, questions=None, answers=None, authority=None, additional=None):
+        self.id = id
+        self.flags = flags
+        self.questions = questions if questions is not None else []
+        self.answers = answers if answers is not None else []
+        self.authority = authority if authority is not None else []
+        self.additional = additional if additional is not None else []
+
+#<editor-fold desc="******************* Decoding *******************">
+
+#
+def parseHeader(data):
+    '''
+        Return (ID, FLAGS, QDCOUNT, ANCOUNT, NSCOUNT, ARCOUNT).
+    '''
+
+    if len(data) < HEADER_SIZE:
+        raise DNSCodecError('Truncated header: %d bytes' % len(data))
+
+    return HEADER.unpack_from(data, 0)
+
+#
+def parseName(data, offset):
+    '''
+        Read a (possibly compressed) name, return (labels, offset after the name).
+    '''
+
+    labels = []
+    end = -1        # where the name ends in the packet, set when the first pointer is followed
+    pointers = 0
+    length = len(data)
+    while 1:
+        if offset >= length:
+            raise DNSCodecError('Name runs past the end of the packet')
+        size = data[offset]
+        if size == 0:
+            offset += 1
+            break
+        if size & 0xc0 == 0xc0:     # compression pointer
+            if offset + 1 >= length:
+                raise DNSCodecError('Truncated compression pointer')
+            if end < 0:
+                end = offset + 2
+            pointers += 1
+            if pointers > MAX_POINTERS:
+                raise DNSCodecError('Compression pointer loop')
+            offset = ((size & 0x3f) << 8) | data[offset + 1]
+            continue
+        if size & 0xc0:
+            raise DNSCodecError('Unsupported label type: 0x%x' % size)
+        offset += 1
+        if offset + size > length:
+            raise DNSCodecError('Label runs past the end of the packet')
+        labels.append(bytes(data[offset:offset + size]).decode('latin-1'))
+        offset += size
+
+    return labels, (end if end >= 0 else offset)
+
+#
+def skipName(data, offset):
+    '''
+        Offset after the name, without decoding its labels.
+    '''
+
+    length = len(data)
+    while offset < length:
+        size = data[offset]
+        if size == 0:
+            return offset + 1
+        if size & 0xc0 == 0xc0:     # a pointer ends the name
+            return offset + 2
+        offset += size + 1
+
+    raise DNSCodecError('Name runs past the end of the packet')
+
+#
+def skipQuestion(data, offset):
+    end = skipName(data, offset) + QUESTION_TAIL.size
+    if end > len(data):
+        raise DNSCodecError('Truncated question')
+
+    return end
+
+#
+def parseQuestion(data, offset):
+    '''
+        Return (DNSQuestion, offset after the question).
+    '''
+
+    labels, offset = parseName(data, offset)
+    if offset + QUESTION_TAIL.size > len(data):
+        raise DNSCodecError('Truncated question')
+    qtype, qclass = QUESTION_TAIL.unpack_from(data, offset)
+
+    return DNSQuestion(labels, qtype, qclass), offset + QUESTION_TAIL.size
+
+#
+def parseRecord(data, offset):
+    '''
+        Return (DNSRecord, offset after the record), rdata is a memoryview on the packet.
+    '''
+
+    labels, offset = parseName(data, offset)
+    if offset + RECORD_TAIL.size > len(data):
+        raise DNSCodecError('Truncated resource record')
+    rtype, rclass, ttl, rdlength = RECORD_TAIL.unpack_from(data, offset)
+    offset += RECORD_TAIL.size
+    if offset + rdlength > len(data):
+        raise DNSCodecError('Truncated RDATA')
+
+    return DNSRecord(labels, rtype, rclass, ttl, memoryview(data)[offset:offset + rdlength]), offset + rdlength
+
+#
+def parseOpt(data, offset, count):
+    '''
+        Find the OPT pseudo-record among the count records at offset (after the question of a query),
+        return (UDP payload size, EDNS version, flags) or None when there is none.
+    '''
+
+    length = len(data)
+    for i in range(count):
+        offset = skipName(data, offset)
+        if offset + RECORD_TAIL.size > length:
+            raise DNSCodecError('Truncated resource record')
+        rtype, payloadSize, ttl, rdlength = RECORD_TAIL.unpack_from(data, offset)
+        offset += RECORD_TAIL.size + rdlength
+        if offset > length:
+            raise DNSCodecError('Truncated RDATA')
+        if rtype == TYPE_OPT:
+            return payloadSize, (ttl >> 16) & 0xff, ttl & 0xffff
+
+    return None
+
+#
+def parseMessage(data):
+    '''
+        Decode a whole packet.
+    '''
+
+    id, flags, qdcount, ancount, nscount, arcount = parseHeader(data)
+    message = DNSMessage(id, flags)
+    offset = HEADER_SIZE
+    for i in range(qdcount):
+        question, offset = parseQuestion(data, offset)
+        message.questions.append(question)
+    for section, count in ((message.answers, ancount), (message.authority, nscount), (message.additional, arcount)):
+        for i in range(count):
+            record, offset = parseRecord(data, offset)
+            section.append(record)
+
+    return message
+
+# </editor-fold>
+
+#<editor-fold desc="******************* Encoding *******************">
+
+#
+def packHeader(id, flags, qdcount=1, ancount=0, nscount=0, arcount=0):
+    return HEADER.pack(id, flags, qdcount, ancount, nscount, arcount)
+
+#
+def encodeName(name):
+    '''
+        Encode a name given as 'a.b.c', 'a.b.c.' or a list of labels (a trailing '' is the root).
+    '''
+
+    if isinstance(name, str):
+        labels = name.split('.')
+    else:
+        labels = name
+    encoded = bytearray()
+    for label in labels:
+        if label == '':
+            continue
+        raw = label.encode('latin-1')
+        if len(raw) > 63:
+            raise DNSCodecError('Label too long: %s' % label)
+        encoded.append(len(raw))
+        encoded += raw
+    encoded.append(0)
+
+    return bytes(encoded)
+
+#
+def encodeQuestion(name, qtype, qclass=CLASS_IN):
+    return encodeName(name) + QUESTION_TAIL.pack(qtype, qclass)
+
+#
+def encodeRecord(name, rtype, ttl, rdata, rclass=CLASS_IN):
+    '''
+        name can be a list of labels, a string or already encoded bytes (e.g. POINTER_TO_QUESTION).
+    '''
+
+    if not isinstance(name, (bytes, bytearray)):
+        name = encodeName(name)
+
+    return name + RECORD_TAIL.pack(rtype, rclass, ttl, len(rdata)) + rdata
+
+#
+def encodeAddress(rtype, value):
+    '''
+        RDATA of an A/AAAA record.
+    '''
+
+    if rtype == TYPE_AAAA:
+        return socket.inet_pton(socket.AF_INET6, value)
+
+    return socket.inet_aton(value)
+
+#
+def encodeRdata(rtype, value):
+    '''
+        RDATA of a zone record value: an address (A/AAAA), a name (NS/CNAME), 'preference name' (MX) or a text (TXT),
+        split into character-strings of MAX_STRING bytes. Raise DNSCodecError for the other types.
+    '''
+
+    if rtype == TYPE_A or rtype == TYPE_AAAA:
+        return encodeAddress(rtype, value)
+    if rtype == TYPE_NS or rtype == TYPE_CNAME:
+        return encodeName(value)
+    if rtype == TYPE_MX:
+        preference, exchange = value.split()
+        return MX_PREFERENCE.pack(int(preference)) + encodeName(exchange)
+    if rtype == TYPE_TXT:
+        text = value.encode('utf-8')
+        chunks = [text[start:start + MAX_STRING] for start in range(0, len(text), MAX_STRING)] or [b'']
+        return b''.join(bytes([len(chunk)]) + chunk for chunk in chunks)
+
+    raise DNSCodecError('No RDATA encoder for %s records' % TYPE_NAMES.get(rtype, rtype))
+
+#
+def encodeSoa(mname, rname, serial, refresh, retry, expire, minimum):
+    '''
+        RDATA of a SOA record, the names are not compressed.
+    '''
+
+    return encodeName(mname) + encodeName(rname) + SOA_TAIL.pack(serial, refresh, retry, expire, minimum)
+
+#
+def decodeAddress(rtype, rdata):
+    if rtype == TYPE_AAAA:
+        return socket.inet_ntop(socket.AF_INET6, bytes(rdata))
+
+    return socket.inet_ntoa(bytes(rdata))
+
+#
+def encodeMessage(message):
+    '''
+        Encode a DNSMessage, record names are not compressed unless given as bytes.
+    '''
+
+    parts = [packHeader(message.id, message.flags, len(message.questions), len(message.answers),
+                        len(message.authority), len(message.additional))]
+    for question in message.questions:
+        parts.append(encodeQuestion(question.labels, question.qtype, question.qclass))
+    for section in (message.answers, message.authority, message.additional):
+        for record in section:
+            parts.append(encodeRecord(record.labels, record.rtype, record.ttl, bytes(record.rdata), record.rclass))
+
+    return b''.join(parts)
+
+#
+def encodeOpt(payloadSize, extendedRcode=0, version=EDNS_VERSION, flags=0):
+    '''
+        OPT pseudo-record without options: root name, the UDP payload size in CLASS, extended RCODE/version/flags in TTL.
+    '''
+
+    return b'\x00' + RECORD_TAIL.pack(TYPE_OPT, payloadSize, ((extendedRcode >> 4) << 24) | (version << 16) | flags, 0)
+
+#
+def buildQuery(name, qtype=TYPE_A, id=0, recursionDesired=True, payloadSize=0):
+    '''
+        payloadSize: add an EDNS0 OPT record advertising this UDP payload size.
+    '''
+
+    flags = 0x0100 if recursionDesired else 0
+    if payloadSize:
+        return packHeader(id, flags, arcount=1) + encodeQuestion(name, qtype) + encodeOpt(payloadSize)
+
+    return packHeader(id, flags) + encodeQuestion(name, qtype)
+
+# </editor-fold>
@@ -0,0 +1,249 @@
+#! /usr/bin/env python3
+
+'''
+    asyncio DNS server engine: the socket is served by a DatagramProtocol, the logging runs
+    on a background thread and the forged-packet bursts run as tasks that yield to the loop.
+'''
+
+import asyncio
+import functools
+import logging
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from Helper import DNSFunctions
+from Helper import BatchIO
+from Helper import Forger
+from Helper.BufferPool import BufferPool
+from Helper.BufferPool import PrefixViews
+from Helper.Helper import Helper
+from Helper.Helper import MSG_TYPES
+from Helper.Helper import ADVERSARY_TASK_MODE
+
+FORGE_CHUNK = 256   # forged packets sent before giving the loop a chance to serve other queries
+
+
+#
+def loggingDone(future):
+    if future.exception() is not None:
+        logging.error('DNSEngine - logging: %s ' % future.exception())
+
+#
+def countMalformed():
+    if DNSFunctions.METRICS is not None:
+        DNSFunctions.METRICS.countMalformed()
+
+
+class DNSServerProtocol(asyncio.DatagramProtocol):
+    '''
+        Answer every datagram on the loop, hand the slow work to the executor/tasks.
+    '''
+
+    def __init__(self, argv, executor, adversaryTask=None, numberOfTries=0, scheduleLogging=None, sock=None):
+        self.letterCaseRandomize = argv.rcase
+        self.adversaryMode = argv.adversary
+        self.forceNotResponseMode = argv.dont
+        self.adversaryTask = adversaryTask
+        self.numberOfTries = numberOfTries
+        self.executor = executor
+        self.sock = sock        # the served socket, for the port sweep workers
+        self.transport = None
+        self.loop = None
+        self.bursts = set()     # keep a reference to the running bursts
+        if scheduleLogging is not None:     # e.g. the logger process ring (QueryRing)
+            self.scheduleLogging = scheduleLogging
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.loop = asyncio.get_running_loop()
+
+    def scheduleLogging(self, function, *args):
+        # one logging thread keeps the rows in the same order as the requests
+        future = self.loop.run_in_executor(self.executor, functools.partial(function, *args))
+        future.add_done_callback(loggingDone)
+
+    def datagram_received(self, data, addr):
+        try:
+            if not self.adversaryMode:
+                response, allowResponse = DNSFunctions.getResponse(data, addr, self.letterCaseRandomize,
+                                                                   forceNotResponseMode=self.forceNotResponseMode,
+                                                                   scheduleLogging=self.scheduleLogging)
+                if allowResponse:
+                    self.transport.sendto(response, addr)
+
+            elif self.adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_PORT_NUMBER:
+                response, _ = DNSFunctions.getResponse(data, addr, case_sensitive=False, adversaryMode=True,
+                                                       withoutRequestId=False, scheduleLogging=self.scheduleLogging)
+                if DNSFunctions.PORT_SWEEPER is not None:
+                    DNSFunctions.generateResponseWithPortNumber(response, self.sock, addr, self.numberOfTries)
+                else:
+                    self.startBurst(self.forgeWithPortNumber(response, addr))
+
+            elif self.adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_REQUEST_ID:
+                response, _ = DNSFunctions.getResponse(data, addr, case_sensitive=False, adversaryMode=True,
+                                                       withoutRequestId=True, scheduleLogging=self.scheduleLogging)
+                self.startBurst(self.forgeWithRequestId(response, addr))
+
+            elif self.adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_BOTH:
+                response, _ = DNSFunctions.getResponse(data, addr, case_sensitive=False, adversaryMode=True,
+                                                       withoutRequestId=True, scheduleLogging=self.scheduleLogging)
+                self.startBurst(self.forgeWithBoth(response, addr))
+
+        except DNSFunctions.DNSCodec.DNSCodecError as ex:
+            countMalformed()
+            logging.error('DNSEngine - datagram_received: malformed query: %s ' % ex)
+        except Exception as ex:
+            logging.error('DNSEngine - datagram_received: \n%s ' % traceback.format_exc())
+
+    def error_received(self, exc):
+        logging.error('DNSEngine - error_received: %s ' % exc)
+
+    def startBurst(self, coroutine):
+        task = self.loop.create_task(coroutine)
+        self.bursts.add(task)
+        task.add_done_callback(self.bursts.discard)
+
+    async def forge(self, response, addr, mode, candidates):
+        '''
+            Async version of DNSFunctions.generateResponseWith*, one batch of FORGE_CHUNK packets between two turns of the loop.
+        '''
+
+        try:
+            forger = Forger.Forger(response, addr, self.transport, mode, rate=DNSFunctions.FORGE_RATE, batchSize=FORGE_CHUNK,
+                                   countForged=DNSFunctions.countForged)
+            for batch in forger.getBatches(candidates):
+                forger.sendBatch(batch)
+                await asyncio.sleep(forger.getDelay())
+            forger.printProgress(done=True)
+
+        except Exception as ex:
+            logging.error('DNSEngine - forge:\n %s ' % traceback.format_exc())
+
+    async def forgeWithRequestId(self, response, addr):
+        Helper.printOnScreenAlways("Round: 1 - %d request IDs to %s:%d" % (self.numberOfTries, addr[0], addr[1]), MSG_TYPES.RESULT)
+        await self.forge(response, addr, Forger.MODE_REQUEST_ID, DNSFunctions.getRandomCandidates(self.numberOfTries))
+
+    async def forgeWithPortNumber(self, response, addr):
+        Helper.printOnScreenAlways("Round: 1 - %d port numbers to %s" % (self.numberOfTries, addr[0]), MSG_TYPES.RESULT)
+        await self.forge(response, addr, Forger.MODE_PORT_NUMBER, DNSFunctions.getRandomCandidates(self.numberOfTries))
+
+    async def forgeWithBoth(self, response, addr):
+        Helper.printOnScreenAlways("Round: 1 - %d request ID x port numbers to %s" % (self.numberOfTries, addr[0]), MSG_TYPES.RESULT)
+        await self.forge(response, addr, Forger.MODE_BOTH, DNSFunctions.getJointCandidates(addr, self.numberOfTries))
+        DNSFunctions.printJointCoverage(addr)
+
+#
+def run(sock, argv, adversaryTask=None, numberOfTries=0, scheduleLogging=None):
+    '''
+        Serve the bound socket with asyncio until interrupted, scheduleLogging replaces the logging thread.
+    '''
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='DNSLogging')
+    transport = None
+    try:
+        transport, protocol = loop.run_until_complete(loop.create_datagram_endpoint(
+            lambda: DNSServerProtocol(argv, executor, adversaryTask, numberOfTries, scheduleLogging, sock), sock=sock))
+        loop.run_forever()
+
+    finally:
+        if transport is not None:
+            transport.close()
+        executor.shutdown(wait=True)
+        loop.close()
+
+#
+def runZeroCopy(sock, argv, adversaryTask=None, numberOfTries=0, scheduleLogging=None):
+    '''
+        Blocking loop that receives into one pooled buffer and writes the responses into one output buffer,
+        the queries and the answers are read and sent through views sliced once per length.
+    '''
+
+    pool = BufferPool(1)
+    view = pool.acquire()   # one packet at a time
+    queries = PrefixViews(view)
+    output = bytearray(DNSFunctions.OUTPUT_BUFFER_SIZE)
+    answers = PrefixViews(memoryview(output))
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='DNSLogging')
+    if scheduleLogging is None:
+        scheduleLogging = lambda function, *args: executor.submit(function, *args).add_done_callback(loggingDone)
+    withoutRequestId = adversaryTask in (ADVERSARY_TASK_MODE.RRANDOMIZE_REQUEST_ID, ADVERSARY_TASK_MODE.RRANDOMIZE_BOTH)
+    try:
+        while 1:
+            try:
+                nbytes, addr = sock.recvfrom_into(view)
+                length, allowResponse = DNSFunctions.writeResponse(queries[nbytes], output, addr, case_sensitive=argv.rcase and not argv.adversary,
+                                                                   adversaryMode=argv.adversary, withoutRequestId=withoutRequestId,
+                                                                   forceNotResponseMode=argv.dont, scheduleLogging=scheduleLogging)
+                if not argv.adversary:
+                    if allowResponse:
+                        sock.sendto(answers[length], addr)
+                elif adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_PORT_NUMBER:
+                    DNSFunctions.generateResponseWithPortNumber(output[:length], sock, addr, numberOfTries)
+                elif adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_REQUEST_ID:
+                    DNSFunctions.generateResponseWithRequestId(output[:length], sock, addr, numberOfTries)
+                elif adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_BOTH:
+                    DNSFunctions.generateResponseWithBoth(output[:length], sock, addr, numberOfTries)
+
+            except DNSFunctions.DNSCodec.DNSCodecError as ex:
+                countMalformed()
+                logging.error('DNSEngine - runZeroCopy: malformed query: %s ' % ex)
+            except Exception as ex:     # one bad packet must not stop the serving loop
+                logging.error('DNSEngine - runZeroCopy: \n%s ' % traceback.format_exc())
+
+    finally:
+        pool.release(view)
+        executor.shutdown(wait=True)
+
+#
+def runBatched(sock, argv, adversaryTask=None, numberOfTries=0, scheduleLogging=None):
+    '''
+        Blocking loop that moves up to BatchIO.BATCH_SIZE datagrams per recvmmsg/sendmmsg syscall,
+        falls back to one datagram per syscall when recvmmsg is not available.
+    '''
+
+    batchIO = BatchIO.getBatchIO(sock)
+    if not batchIO.batched:
+        Helper.printOnScreenAlways('recvmmsg/sendmmsg are not available, using the plain socket path', MSG_TYPES.YELLOW)
+    forged = bytearray(DNSFunctions.OUTPUT_BUFFER_SIZE)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='DNSLogging')
+    if scheduleLogging is None:
+        scheduleLogging = lambda function, *args: executor.submit(function, *args).add_done_callback(loggingDone)
+    withoutRequestId = adversaryTask in (ADVERSARY_TASK_MODE.RRANDOMIZE_REQUEST_ID, ADVERSARY_TASK_MODE.RRANDOMIZE_BOTH)
+    try:
+        while 1:
+            entries = []
+            for view, addr in batchIO.receive():
+                try:
+                    if not argv.adversary:
+                        length, allowResponse = DNSFunctions.writeResponse(view, batchIO.sendViews[len(entries)], addr, case_sensitive=argv.rcase,
+                                                                           forceNotResponseMode=argv.dont, scheduleLogging=scheduleLogging)
+                        if allowResponse:
+                            entries.append((length, addr))
+                        continue
+
+                    length, allowResponse = DNSFunctions.writeResponse(view, forged, addr, adversaryMode=True, withoutRequestId=withoutRequestId,
+                                                                       scheduleLogging=scheduleLogging)
+                    if adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_PORT_NUMBER:
+                        DNSFunctions.generateResponseWithPortNumber(bytes(forged[:length]), sock, addr, numberOfTries, batchIO=batchIO)
+                    elif adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_REQUEST_ID:
+                        DNSFunctions.generateResponseWithRequestId(bytes(forged[:length]), sock, addr, numberOfTries, batchIO=batchIO)
+                    elif adversaryTask == ADVERSARY_TASK_MODE.RRANDOMIZE_BOTH:
+                        DNSFunctions.generateResponseWithBoth(bytes(forged[:length]), sock, addr, numberOfTries, batchIO=batchIO)
+
+                except DNSFunctions.DNSCodec.DNSCodecError as ex:
+                    countMalformed()
+                    logging.error('DNSEngine - runBatched: malformed query: %s ' % ex)
+                except Exception as ex:     # one bad datagram must not stop the serving loop
+                    logging.error('DNSEngine - runBatched: \n%s ' % traceback.format_exc())
+
+            if entries:
+                try:
+                    batchIO.sendPrepared(entries)
+                except Exception as ex:     # e.g. OSError of sendmmsg, the answers of this batch are lost
+                    logging.error('DNSEngine - runBatched: sendPrepared: \n%s ' % traceback.format_exc())
+
+    finally:
+        executor.shutdown(wait=True)
@@ -8,27 +8,75 @@ import datetime
 import os
 import json
 import glob
-import random
 import logging
 import logging.config
+import threading
 import traceback
 
+from time import perf_counter_ns
 from stem.util import term
 from enum import Enum
 
 from Helper.Helper import Helper
 from Helper.Helper import MSG_TYPES
-from Helper.Helper import LogData
+from Helper.Helper import getLogWriter
+from Helper.Helper import closeLogWriters
 from Helper.Helper import TIME_FORMAT
+from Helper import DNSCodec
+from Helper.RequestLog import RequestLog
+from Helper.QueryStore import QueryStore
+from Helper.BinaryLog import BinaryLog
+from Helper import Metrics
+from Helper import RateLimiter
+from Helper import Forger
+from Helper import CandidateSearch
+from Helper import ZoneIndex
+from Helper import ZoneWatcher
+from Helper import LetterCase
+from Helper.ResponseCache import ResponseCache
+from Helper.ResponseCache import CachedResponse
+from Helper.ResponseCache import NXDOMAIN
+from Helper.ResponseCache import NODATA
+from Helper.ResponseCache import REFUSED
 
 
 JSON_REQUESTS_PATH = 'JSON/NormalRequests/NormalDNSRequestNodes'
 JSON_REQUESTS_PATH_CHECK = 'JSON/CheckingRequests/CheckingDNSRequestNodes' # store all the sendRequests about checkoing if the dns supports 0x20 code
 ERRORS_LOG_PATH = 'Logs/Errors/'
+REAL_ZONE_PATHS = ['Zones/RealZone.zone', 'Zones/Real']    # zone files and directories of *.zone files
+FAKE_ZONE_PATHS = ['Zones/FakeZone.zone', 'Zones/Fake']
 FORCE_NOT_RESPONSE_MEG = 'tor_dont_response'    # if the sendRequests contains this in the sub-domain, DNS will not response to it
 
 DEBUG = False
 COUNTER = 0
+COUNTER_LOCK = threading.Lock()  # the UDP loop and the DNSTCP thread both number their queries
+SHARED_COUNTER = None   # multiprocessing.Value shared by all the workers (worker mode only)
+WORKER_COUNTERS = None  # per-worker counters, aggregated by the supervisor
+WORKER_INDEX = 0
+OUTPUT_BUFFER_SIZE = 4096  # size of the preallocated response buffers
+UDP_PAYLOAD_SIZE = 512  # largest UDP answer (RFC 1035), the longer ones are sent truncated (TC=1)
+EDNS_PAYLOAD_SIZE = 1232  # cap of the UDP payload size advertised by EDNS0 queries, 0: EDNS0 disabled, set with setEdnsPayloadSize
+OPT_RECORD = DNSCodec.encodeOpt(EDNS_PAYLOAD_SIZE)  # echoed to the EDNS0 queries
+OPT_BADVERS = DNSCodec.encodeOpt(EDNS_PAYLOAD_SIZE, DNSCodec.RCODE_BADVERS)
+ZONE_INDEX = ZoneIndex.ZoneIndex()  # compiled real zones, loaded with loadRealZone
+FAKE_ZONE_INDEX = ZoneIndex.ZoneIndex()  # compiled fake zones (adversary mode), loaded with loadFakeZone
+RESPONSE_CACHE = ResponseCache()  # pre-serialized answers, cleared when a zone is loaded
+REQUEST_LOG = RequestLog()  # JSON-Lines request log with a background writer
+INCOMING_REQUEST_LOG = getLogWriter('incoming_request')  # buffered Logs/incoming_request_<date>_counter+.txt
+QUERY_STORE = None  # SQLite query store, enabled with enableQueryStore
+BINARY_LOG = None  # fixed-width binary query log, enabled with enableBinaryLog
+METRICS = None  # Metrics.Metrics shared by the workers, enabled with enableMetrics
+CONSOLE_RENDERER = None  # ConsoleRenderer printing sampled rows and a summary, enabled with enableConsoleRenderer
+RATE_LIMITER = None  # RateLimiter.RateLimiter of this process, enabled with enableRateLimiter
+FORGE_RATE = 0  # packets/sec cap of the forging runs, 0: as fast as possible
+PORT_SWEEPER = None  # PortSweep.PortSweeper for the port number mode, enabled with enablePortSweeper
+SEARCH_SCHEDULER = None  # CandidateSearch.SearchScheduler for the request ID x port number mode, enabled with enableJointSearch
+TRUNCATED_HEADER_TAILS = (DNSCodec.HEADER.pack(0, 0x8600, 1, 0, 0, 0)[2:],    # QR, AA, TC + QDCOUNT, indexed by the RD bit
+                          DNSCodec.HEADER.pack(0, 0x8700, 1, 0, 0, 0)[2:])
+NEGATIVE_COUNTS = DNSCodec.HEADER.pack(0, 0, 0, 0, 1, 0)[6:]    # ANCOUNT, NSCOUNT (the SOA), ARCOUNT
+REFUSED_COUNTS = DNSCodec.HEADER.pack(0, 0, 0, 0, 0, 0)[6:]     # no record at all
+BADVERS_HEADER_TAILS = (DNSCodec.HEADER.pack(0, 0x8400, 1, 0, 0, 1)[2:],   # QR, AA + QDCOUNT, ARCOUNT (the OPT record)
+                        DNSCodec.HEADER.pack(0, 0x8500, 1, 0, 0, 1)[2:])
 
 
 #<editor-fold desc="******************* General Tools *******************">
@@ -54,10 +102,43 @@ def setAdversaryMode(adversary_mode):
 
     ADVERSARY_MODE = adversary_mode
 
+#
+def setSharedCounters(sharedCounter, workerCounters, workerIndex):
+    '''
+       Worker mode: count the requests in the shared counters instead of the local one.
+    '''
+
+    global SHARED_COUNTER
+    global WORKER_COUNTERS
+    global WORKER_INDEX
+    SHARED_COUNTER = sharedCounter
+    WORKER_COUNTERS = workerCounters
+    WORKER_INDEX = workerIndex
+    if METRICS is not None:
+        METRICS.setWorker(workerIndex)
+
+#
+def nextCounter():
+    '''
+       Increase the requests counter and return its new value.
+    '''
+
+    global COUNTER
+    if SHARED_COUNTER is None:
+        with COUNTER_LOCK:
+            COUNTER += 1
+            return COUNTER
+
+    with SHARED_COUNTER.get_lock():
+        SHARED_COUNTER.value += 1
+        counter = COUNTER = SHARED_COUNTER.value
+    WORKER_COUNTERS[WORKER_INDEX] += 1
+
+    return counter
+
 #
 def loggingData(value):
-    file = LogData(filename='incoming_request', mode='out')
-    file.wirteIntoFile(value)
+    INCOMING_REQUEST_LOG.write(value)
 
 # Log all the incoming DNS sendRequests and return the logged row as string
 def logDNSRequest(counter,status, recordType, requestId, srcIP, srcPort, domain, modifiedDomain='', mode='none'):
@@ -161,57 +242,144 @@ def bin_to_hex(value):
 
     return h.decode('hex')
 
-# TODO: need to implement a class
-def storeDNSRequestJSON(status, time, recordType, transactionID, srcIP, srcPort, domain, modifiedDomain='none', mode='none'):
-    """Help for the bar method of Foo classes"""
-    date = Helper.getTime(TIME_FORMAT.DATE)
-    pathDirt = ''
-    if mode == 'check':
-        path = JSON_REQUESTS_PATH_CHECK
+#
+def logRequest(counter, status, recordType, transactionID, srcIP, srcPort, domain, time, modifiedDomain=''):
+    '''
+       Log the request into the text file, the screen, the JSON file, the query store and the binary log (if enabled).
+    '''
+
+    printedRow, printStatus = logDNSRequest(counter=counter, status=status, recordType=recordType, requestId=transactionID,
+                                            srcIP=srcIP, srcPort=srcPort, domain=domain, modifiedDomain=modifiedDomain, mode='none')
+    if CONSOLE_RENDERER is not None:    # sampled rows and a summary, printed by its own thread
+        CONSOLE_RENDERER.add(printedRow, printStatus, srcIP, domain)
     else:
-        # TODO: need refactoring - make it more abstract
-        path = JSON_REQUESTS_PATH
+        Helper.printOnScreenAlways(printedRow, printStatus)
+
+    mode = 'check' if 'check_' in domain.lower() else 'none'
+    if modifiedDomain == '':
+        storeDNSRequestJSON(status='Okay', time=time, recordType=recordType, transactionID=transactionID, srcIP=srcIP,
+                            srcPort=str(srcPort), domain=domain, mode=mode)
+    else:
+        storeDNSRequestJSON(status='Okay', time=time, recordType=recordType, transactionID=transactionID, srcIP=srcIP,
+                            srcPort=str(srcPort), domain=domain, modifiedDomain=modifiedDomain, mode=mode)
 
-    pathFile = ('%s_%s.json' % (path,date))
+    if QUERY_STORE is not None:
+        QUERY_STORE.append(counter, recordType, transactionID, srcIP, srcPort, domain, modifiedDomain, mode)
+    if BINARY_LOG is not None:
+        BINARY_LOG.append(status, recordType, transactionID, srcIP, srcPort, domain, mode, modifiedDomain)
+    if METRICS is not None:
+        METRICS.countLogged()
 
-    jsons = {}
+#
+def enableConsoleRenderer(renderer):
+    '''
+        Print the logged requests through renderer (ConsoleRenderer) instead of one synchronous print per request.
+    '''
 
-    if (os.path.exists(pathFile)) != True:  # check if the file exist, if not create it.
-        with open(pathFile, 'w+') as jsonfile: # not exist
-            json.dump(' ', jsonfile)
-    else:
-        try:
-            with open(pathFile, 'r') as jsonfile:
-                jsons = json.load(jsonfile)
+    global CONSOLE_RENDERER
+    CONSOLE_RENDERER = renderer
+
+#
+def enableQueryStore(path):
+    '''
+        Also write every logged request into the SQLite database at path.
+    '''
+
+    global QUERY_STORE
+    QUERY_STORE = QueryStore(path)
+
+#
+def enableBinaryLog(path):
+    '''
+        Also write every logged request into the binary log '<path>_<date>_<pid>.qlog'.
+    '''
+
+    global BINARY_LOG
+    BINARY_LOG = BinaryLog(path)
 
-        except ValueError as er:
-            logging.error('DNSFunction - storeDNSRequestJSON - JSON invalid - file: %s : %s' % (path,str(er)))
-            os.rename(pathFile, ('%s_%s_error_%d.json' % (path,date,random.randint(1,50))))
+#
+def enableMetrics(metrics):
+    '''
+        Count every query in metrics (Metrics.Metrics), before the workers are started.
+    '''
+
+    global METRICS
+    METRICS = metrics
+    METRICS.getLogWriterDrops = getLogWriterDrops
+
+#
+def enableRateLimiter(rateLimiter):
+    '''
+        Check every query against rateLimiter (RateLimiter.RateLimiter) before it is answered or logged.
+    '''
 
-            with open(pathFile, 'a+') as jsonfile:
-                    json.dump(' ', jsonfile)
+    global RATE_LIMITER
+    RATE_LIMITER = rateLimiter
+
+#
+def setEdnsPayloadSize(payloadSize):
+    '''
+        Largest UDP answer sent to an EDNS0 query (the size it advertises, capped), 0 disables EDNS0.
+    '''
+
+    global EDNS_PAYLOAD_SIZE
+    global OPT_RECORD
+    global OPT_BADVERS
+    EDNS_PAYLOAD_SIZE = min(payloadSize, OUTPUT_BUFFER_SIZE)
+    if EDNS_PAYLOAD_SIZE:
+        EDNS_PAYLOAD_SIZE = max(EDNS_PAYLOAD_SIZE, UDP_PAYLOAD_SIZE)
+        OPT_RECORD = DNSCodec.encodeOpt(EDNS_PAYLOAD_SIZE)
+        OPT_BADVERS = DNSCodec.encodeOpt(EDNS_PAYLOAD_SIZE, DNSCodec.RCODE_BADVERS)
+
+#
+def closeWriters():
+    '''
+        Flush and close the writers of this process (request log, text logs, query store, binary log, console).
+        The worker and logger processes end with os._exit and never run atexit, they call it on their way out.
+    '''
+
+    REQUEST_LOG.stop()
+    if QUERY_STORE is not None:
+        QUERY_STORE.stop()
+    if BINARY_LOG is not None:
+        BINARY_LOG.close()
+    closeLogWriters()
+    if CONSOLE_RENDERER is not None:
+        CONSOLE_RENDERER.close()
+
+#
+def getLogWriterDrops():
+    drops = REQUEST_LOG.drops
+    if QUERY_STORE is not None:
+        drops += QUERY_STORE.drops
+
+    return drops
+
+#
+def storeDNSRequestJSON(status, time, recordType, transactionID, srcIP, srcPort, domain, modifiedDomain='none', mode='none'):
+    '''
+        Append the request to the day's JSON-Lines file, the background writer does the I/O.
+    '''
+
+    if mode == 'check':
+        path = JSON_REQUESTS_PATH_CHECK
+    else:
+        # TODO: need refactoring - make it more abstract
+        path = JSON_REQUESTS_PATH
 
     if domain[-1:] == '.':
         domain = domain[:-1]
 
-    with open(pathFile,'w') as jsonfile:
-        DNSRequestNodes = {
-            'Request': {
-                'ID': str(len(jsons) + 1),
-                'Time': time,
-                'Status': status,
-                'TransactionID':transactionID,
-                'RecordType':recordType,
-                'SrcIP': srcIP,
-                'SrcPort': srcPort,
-                'Domain': domain,
-                'modifiedDomain' : modifiedDomain,
-            }
-        }
-
-        jsons[ str(len(jsons)+1)] = DNSRequestNodes
-        # Write into Json file
-        json.dump(jsons, jsonfile)
+    REQUEST_LOG.append(path, {
+        'Time': time,
+        'Status': status,
+        'TransactionID': transactionID,
+        'RecordType': recordType,
+        'SrcIP': srcIP,
+        'SrcPort': srcPort,
+        'Domain': domain,
+        'modifiedDomain': modifiedDomain,
+    })
 
 # TODO: need to handle storing json in a better way
 def storeDNSRequestJSONText(status, time, recordType, transactionID, srcIP, srcPort, domain, modifiedDomain='none', mode='none'):
@@ -273,59 +441,99 @@ def storeDNSRequestJSONText(status, time, recordType, transactionID, srcIP, srcP
 #<editor-fold desc="******************* Zone File *******************">
 
 #
-def loadRealZone():
+def loadRealZone(paths=REAL_ZONE_PATHS):
     '''
-        load all zones that we have when the DNS server starts up, and put them into memory
+        load all zones that we have when the DNS server starts up, and compile them into the zone index
     '''
 
-    global ZONEDATA
-    jsonZone = {}   # dictionary
-    zFile = 'Zones/RealZone.zone'
-    printDebugMode(zFile) # Debug
-    with open(zFile) as zonedata:
-        data = json.load(zonedata)
-        zoneName = data['$origin']
-        jsonZone[zoneName] = data
-
-    ZONEDATA = jsonZone
+    global ZONE_INDEX
+    printDebugMode(paths) # Debug
+    ZONE_INDEX = ZoneIndex.loadZones(paths)
+    RESPONSE_CACHE.clear()
     Helper.printOnScreenAlways("\n                             =-----------------**Zone file has been loaded**------------------=\n",MSG_TYPES.RESULT)
+    Helper.printOnScreenAlways('                                    %(zones)d zone(s), %(names)d name(s) indexed' % ZONE_INDEX.getStats(), MSG_TYPES.RESULT)
+    printSkippedRecords(ZONE_INDEX)
 
-def loadFakeZone():
+def loadFakeZone(paths=FAKE_ZONE_PATHS):
     '''
-        load all the fake zones that we have when the DNS server starts up, and put them into memory.
+        load all the fake zones that we have when the DNS server starts up, and compile them into the fake zone index.
     '''
-    global FAKEZONEDATA
-    jsonZone = {}   # dictionary
-    zFile = 'Zones/FakeZone.zone'
-    printDebugMode(zFile) # Debug
-    with open(zFile) as zonedata:
-        data = json.load(zonedata)
-        zoneName = data['$origin']
-        jsonZone[zoneName] = data
-    FAKEZONEDATA = jsonZone
+    global FAKE_ZONE_INDEX
+    printDebugMode(paths) # Debug
+    FAKE_ZONE_INDEX = ZoneIndex.loadZones(paths)
+    RESPONSE_CACHE.clear()
     Helper.printOnScreenAlways("                              =--------------**Fake Zone file has been loaded**--------------=",MSG_TYPES.RESULT)
+    printSkippedRecords(FAKE_ZONE_INDEX)
 
 #
-def getZone(domain):
+def printSkippedRecords(index):
+    '''
+        The record types of the zone files that are not served (ZoneIndex.RECORD_TYPES), the rest of the zone is.
+    '''
+
+    for skipped in index.skipped:
+        Helper.printOnScreenAlways('Zone records not served: %s' % skipped, MSG_TYPES.YELLOW)
+
+#
+def reloadZones(adversaryMode=False):
     '''
-        get zone and domain name.
+        Compile the zone files again and swap them in, called by the zone watcher thread, off the packet path.
+        Every index is swapped with one reference update and the response cache is cleared after it: a query
+        keeps the index it already looked up alive until it is answered, and the answer it built from the old
+        zones is not cached (generation check). The old zones stay in use if the new ones are not valid.
     '''
-    global ZONEDATA
+
+    global ZONE_INDEX
+    global FAKE_ZONE_INDEX
     try:
-        zoneName = '.'.join(domain[-3:]).lower()
-        return ZONEDATA[zoneName]
-    except Exception as ex:
-        logging.error('DNSFunctions - getZone: \n%s ' % traceback.format_exc())
-        return ''
+        index = ZoneIndex.loadZones(REAL_ZONE_PATHS)
+        fakeIndex = ZoneIndex.loadZones(FAKE_ZONE_PATHS) if adversaryMode is True else None
+    except ZoneIndex.ZoneError as ex:
+        logging.error('DNSFunctions - reloadZones: %s' % ex)
+        Helper.printOnScreenAlways('Zones not reloaded, the running zones are kept: %s' % ex, MSG_TYPES.ERROR)
+        return False
+
+    ZONE_INDEX = index
+    if fakeIndex is not None:
+        FAKE_ZONE_INDEX = fakeIndex
+    RESPONSE_CACHE.clear()
+    Helper.printOnScreenAlways('Zones reloaded: %(zones)d zone(s), %(names)d name(s) indexed' % index.getStats(), MSG_TYPES.RESULT)
+    printSkippedRecords(index)
+
+    return True
+
+#
+def startZoneWatcher(adversaryMode=False, interval=ZoneWatcher.POLL_INTERVAL):
+    '''
+        Reload the zones of this serving process when their files change, return the started ZoneWatcher.
+    '''
+
+    paths = REAL_ZONE_PATHS + FAKE_ZONE_PATHS if adversaryMode is True else REAL_ZONE_PATHS
+    watcher = ZoneWatcher.ZoneWatcher(paths, lambda: reloadZones(adversaryMode), interval)
+    watcher.start()
+
+    return watcher
+
+#
+def lookupZone(index, domain):
+    '''
+        Longest-match lookup of domain (wire format key or list of labels), return (zone, node of its records),
+        node is None when the name does not exist in the zone, zone is None when no zone holds it.
+        Not logged: a miss is an ordinary query, counted as a zone miss / negative answer by the metrics.
+    '''
+
+    return index.lookup(domain if isinstance(domain, bytes) else ZoneIndex.getKey(domain))
+
+#
+def getZone(domain):
+    '''
+        get the zone node of the domain name.
+    '''
+
+    return lookupZone(ZONE_INDEX, domain)[1]
 
 def getFakeZone(domain):
-    global FAKEZONEDATA
-    try:
-        zoneName = '.'.join(domain[-3:]).lower()
-        return FAKEZONEDATA[zoneName]
-    except Exception as ex:
-        logging.error('DNSFunctions - getZone: \n%s ' % traceback.format_exc())
-        return ''
+    return lookupZone(FAKE_ZONE_INDEX, domain)[1]
 # </editor-fold>
 
 #<editor-fold desc="******************* DNS Tools/Rspoonse *******************">
@@ -374,103 +582,27 @@ def getFlags(flags):
 #
 def getQuestionDomain(data):
     '''
-        .
-    '''
-    state = 1
-    index = 0
-    first = True
-    domainParts  = []
-    domainString = ''
-    domainTLD    = ''
-
-    expectedLength = 0
-    TotalLength    = 0
-    parts = 0
-    for byte in data:
-        if byte == 0:
-            break
-        if state == 1:  # 1 get the domain name
-            if first is True:  # first byte to get the length for the zone ~ 3 bytes
-                first = False
-                parts += 1
-                expectedLength = byte
-                continue
-            domainString += chr(byte)
-            index += 1
-            if index == expectedLength:
-                TotalLength += expectedLength
-                state = 2
-                index = 0
-                domainParts.append(domainString)
-                domainString = ''
-                first = True
-
-        elif state == 2:  # 2 get the domain zone
-            if first is True:  # first byte to get the length for the zone ~ 3 bytes
-                first = False
-                expectedLength = byte
-                parts += 1 # how many parts
-                continue
-            domainString += chr(byte)
-            index += 1
-            if index == expectedLength:
-                TotalLength += expectedLength
-                state = 1
-                index = 0
-                domainParts.append(domainString)
-                domainString = ''
-                first = True
-
-    # get question type
-    questionTypeStartingIndex = TotalLength + parts
-    questionType = data[questionTypeStartingIndex+1: questionTypeStartingIndex+3]
+        Parse the question (data starts after the header), return (domain parts + [''], question type bytes).
+    '''
+
+    question, offset = DNSCodec.parseQuestion(data, 0)
+    questionType = data[offset - 4:offset - 2]
 
     if DEBUG is True: # Debug mode only
         print('Question Type: ' + str(questionType))
-        print('Domain: ' + domainString+'.'+domainTLD)
-
-    domainParts.append('')
-
-    return (domainParts, questionType)
-
-# TODO : Need to be deleted
-def getQuestionDomain_temp(data):
-    state = 0
-    expectedlength = 0
-    domainstring = ''
-    domainparts = []
-    x = 0
-    y = 0
-    for byte in data:
-        if state == 1:
-            if byte != 0:
-                domainstring += chr(byte)
-            x += 1
-            if x == expectedlength:
-                domainparts.append(domainstring)
-                domainstring = ''
-                state = 0
-                x = 0
-            if byte == 0:
-                domainparts.append(domainstring)
-                break
-        else:
-            state = 1
-            expectedlength = byte # get the lenght for the domain
-        y += 1
+        print('Domain: ' + question.getName())
 
-    questiontype = data[y:y + 2]
-    return (domainparts, questiontype)
+    return (question.labels + [''], questionType)
 
 #
 def getLetterCaseSwapped(dmoainParts):
-    newParts =  dmoainParts[:-3] # save all the elements but  not the last 3  including ''
-    dmoainParts = dmoainParts[-3:] # get only last 3 elemnets of the ExitNodelist exmaple.com.
-    # modify randomly only in the domain and zone name
-    for part in dmoainParts:
-        part = "".join(random.choice([k.swapcase(), k ]) for k in part )
-        newParts.append(part)
-    return newParts
+    '''
+        The domain parts with the letter case of the domain and zone name randomised, see LetterCase.
+    '''
+
+    name = '.'.join(dmoainParts).encode('latin-1')
+
+    return LetterCase.randomizeCase(name)[0].decode('latin-1').split('.')
 
 #
 def getRecs(zone,domain, questionType):
@@ -497,16 +629,24 @@ def getRecs(zone,domain, questionType):
         if DEBUG is True:  # Debug mode only
             print('-------------7')
             print('Question Type: ' + str(qt))
-            print('Zone: ' + str(zone[qt]))
+            print('Zone: ' + str(zone.records if zone is not None else None))
             print('-------------5')
             print('Question Type: ' + str(qt))
             print('-------------6')
 
-        return (zone[qt], qt, domain, 'OKAY')
+        if zone is None:
+            records = None
+        elif qt == 'ANY':       # every record of the name as (type, record), None when it has none (NODATA)
+            records = [(recordType, record) for recordType, typed in zone.records.items() for record in typed] or None
+        else:
+            records = zone.records.get(qt)
+        if records is None:     # the name does not exist, or has no record of this type: a negative answer
+            return ('', qt, domain, 'ERROR')
+
+        return (records, qt, domain, 'OKAY')
 
     except Exception as ex:
-        if str(ex) != str(KeyError('AAAA')): # IPv6- if it's IPv6, is it not important
-            logging.error('DNSFunctions - getRecs: \n%s ' % traceback.format_exc())
+        logging.error('DNSFunctions - getRecs: \n%s ' % traceback.format_exc())
 
         return ('', qt , domain, 'ERROR')
 
@@ -514,166 +654,223 @@ def getRecs(zone,domain, questionType):
 #
 def buildQuestion(domainName, recordType):  # convert str into byte
     '''
-        Build the record
+        Build the question
     '''
-    questionBytes = b''
-    for part in domainName:
-        length = len(part)
-        questionBytes += bytes([length])
-        for char in part:
-            questionBytes += ord(char).to_bytes(1, byteorder='big')
-
-    if recordType == RECORD_TYPES.A.name or recordType == RECORD_TYPES.AAAA.name:
-        questionBytes += (1).to_bytes(2, byteorder='big')
 
-    questionBytes += (1).to_bytes(2, byteorder='big')
-
-    return questionBytes
+    return DNSCodec.encodeQuestion(domainName, DNSCodec.TYPE_CODES.get(recordType, DNSCodec.TYPE_A))
 
 #
 def recordToBytes(domainName, recordType, recordTTL, recordValue):
     '''
-        .
+        Build the answer record, the name is a pointer to the question.
     '''
-    recordBytes = b'\xc0\x0c'  # Pointer to domain name
-    if recordType == RECORD_TYPES.A.name:
-        recordBytes = recordBytes + bytes([0]) + bytes([1])
-
-    # TODO: need to handle IPv6-AAAA
-    elif recordType == RECORD_TYPES.AAAA.name:
-        recordBytes = recordBytes + bytes([0]) + bytes([1])
 
-    recordBytes = recordBytes + bytes([0]) + bytes([1])
-    recordBytes += int(recordTTL).to_bytes(4, byteorder='big')
-    if recordType == RECORD_TYPES.A.name or recordType == RECORD_TYPES.AAAA.name:
-        recordBytes = recordBytes + bytes([0]) + bytes([4])
-        for part in recordValue.split('.'):
-            recordBytes += bytes([int(part)])
+    rtype = DNSCodec.TYPE_CODES.get(recordType, DNSCodec.TYPE_A)
 
-    return recordBytes
+    return DNSCodec.encodeRecord(DNSCodec.POINTER_TO_QUESTION, rtype, int(recordTTL), DNSCodec.encodeRdata(rtype, recordValue))
 
 #
-def getResponse(data, addr,case_sensitive = False,adversaryMode=False,withoutRequestId=False ,forceNotResponseMode= False ):
+def getResponse(data, addr,case_sensitive = False,adversaryMode=False,withoutRequestId=False ,forceNotResponseMode= False, scheduleLogging=None ):
     '''
-        Build the DNS Response
+        Build the DNS Response, scheduleLogging(function, *args) can be used to run the logging later.
     '''
 
-    # ********************************** DNS Header
-    # Transaction ID
-    TransactionID_Byte = data[:2]
-    TransactionID = ''
-    for byte in TransactionID_Byte:
-        TransactionID += hex(byte)[2:]
-    if DEBUG is True:  # Debug mode only
-        print('ID:')
-        print(TransactionID)
+    output = bytearray(OUTPUT_BUFFER_SIZE)
+    length, response = writeResponse(memoryview(data), output, addr, case_sensitive=case_sensitive, adversaryMode=adversaryMode,
+                                     withoutRequestId=withoutRequestId, forceNotResponseMode=forceNotResponseMode,
+                                     scheduleLogging=scheduleLogging)
 
-    # FLAGS
-    Flags = getFlags(data[2:4])
-    if DEBUG is True:  # Debug mode only
-        print(Flags)
+    return (bytes(output[:length]), response)
 
-    # Question Count, how many questions in the zone file
-    QDCOUNT = RECORD_TYPES.A.value #b'\x00\x01'  # dns has one question
-
-    domain, questionType = getQuestionDomain(data[12:])
-    if adversaryMode is True:   # load the fake zone
-        zone = getFakeZone(domain)
-    else: #load the real zone
-        zone = getZone(domain)
-
-    records, recordType, domainName, recStatus = getRecs(zone=zone,domain=domain, questionType=questionType)
+#
+def writeResponse(view, output, addr, case_sensitive=False, adversaryMode=False, withoutRequestId=False, forceNotResponseMode=False, scheduleLogging=None,
+                  tcp=False):
+    '''
+        Write the DNS Response of the query in view (memoryview) into the preallocated output buffer,
+        return (response length, allowResponse).
+        tcp: the query came over TCP, no response-rate limiting and no UDP size limit, a UDP answer
+        over UDP_PAYLOAD_SIZE (or the EDNS0 payload size of the query) is replaced by its TC=1 stub
+        so the resolver asks again over TCP.
+    '''
 
-    # Answer Count
-    #ANCOUNT = len(getRecs(data[12:])[0]).to_bytes(2, byteorder='big')  # 12 bytes to skip the header
-    ANCOUNT = len(records).to_bytes(2, byteorder='big')  # 12 bytes to skip the header
+    started = perf_counter_ns()
+    # ********************************** DNS Question
+    questionEnd = DNSCodec.skipQuestion(view, DNSCodec.HEADER_SIZE)
+    nameEnd = questionEnd - 4
+    questionType = view[nameEnd:nameEnd + 2]
+    if view[nameEnd - 1]:  # the name ends with a compression pointer: answer the query with the name uncompressed
+        name = DNSCodec.encodeName(DNSCodec.parseName(view, DNSCodec.HEADER_SIZE)[0] + [''])
+        view = memoryview(view[:DNSCodec.HEADER_SIZE].tobytes() + name + view[nameEnd:].tobytes())
+        nameEnd = DNSCodec.HEADER_SIZE + len(name)
+        questionEnd = nameEnd + 4
+    question = view[DNSCodec.HEADER_SIZE:questionEnd].tobytes()    # sent back as is, keeping its original letter case
+    # the cache key: the question lowercased, its type and class bytes with it, only those of the types no zone
+    # holds can have bytes in A-Z and they are all answered alike, the tuple only for the fake zones
+    cacheKey = question.lower() if adversaryMode is False else (question.lower(), 'fake')
+    if RATE_LIMITER is not None and adversaryMode is False and tcp is False:
+        action = RATE_LIMITER.check(addr[0], cacheKey[:-4])
+        if action != RateLimiter.ALLOW:     # neither answered nor logged, only counted
+            if METRICS is not None:
+                METRICS.countRateLimited(action == RateLimiter.TRUNCATE)
+            if action == RateLimiter.DROP:
+                return (0, False)
+            return (writeTruncated(view, output, questionEnd), True)
+
+    # ********************************** EDNS0 (RFC 6891), an OPT record after the question
+    edns = None
+    maxSize = UDP_PAYLOAD_SIZE
+    records = view[7] + view[9] + view[11] + ((view[6] + view[8] + view[10]) << 8)   # ANCOUNT + NSCOUNT + ARCOUNT
+    if records and EDNS_PAYLOAD_SIZE:
+        edns = DNSCodec.parseOpt(view, questionEnd, records)
+        if edns is not None:
+            payloadSize, version, flags = edns
+            if METRICS is not None:
+                METRICS.countEdns(payloadSize)
+            if version != DNSCodec.EDNS_VERSION and adversaryMode is False:
+                return (writeTruncated(view, output, questionEnd, OPT_BADVERS, BADVERS_HEADER_TAILS), True)
+            maxSize = min(max(payloadSize, UDP_PAYLOAD_SIZE), EDNS_PAYLOAD_SIZE)
+
+    labels, offset = DNSCodec.parseName(view, DNSCodec.HEADER_SIZE)
+    domain = '.'.join(labels)
+
+    # FLAGS + counts + answers, only built on a cache miss
+    if adversaryMode is True and SEARCH_SCHEDULER is not None:     # the resolver's own port and ID, for its distribution
+        SEARCH_SCHEDULER.observe(addr[0], addr[1], (view[0] << 8) | view[1])
+    cached = RESPONSE_CACHE.get(cacheKey)
+    if cached is None:
+        generation = RESPONSE_CACHE.generation  # before the zone lookup, see reloadZones
+        qname = question[:-4].lower()
+        cached = buildCachedResponse(view[:4], labels + [''], questionType.tobytes(), adversaryMode, qname=qname)
+        RESPONSE_CACHE.put(cacheKey, cached, generation)
 
-    # Name server nodeCount
-    NSCOUNT = (0).to_bytes(2, byteorder='big')
+    # ********************************** DNS Header
+    position = 0
+    if withoutRequestId is False:
+        output[0] = view[0]     # Transaction ID, byte by byte: no slice of the view
+        output[1] = view[1]
+        position = 2
+    # else: BUILD THE HEADER WITHOUT THE TRANSACTION ID/REQUEST ID, AFTER FORGE IT, WILL BE ADDED TO THE HEADER
+    output[position:position + 10] = cached.headerTail
+    position += 10
 
-    # Additional nodeCount
-    ARCOUNT = (0).to_bytes(2, byteorder='big')
+    counter = nextCounter()     # this query's number, COUNTER may already be moved on by the TCP thread
 
-    RealDNSHeader_Test = b' ' # for testing
-    if withoutRequestId is False:
-        DNSHeader = TransactionID_Byte + Flags + QDCOUNT + ANCOUNT + NSCOUNT + ARCOUNT
+    # TODO: implement a method that distinguishes sendRequests if they have been called from TORMAPPER
+    modifiedDomain = ''
+    if case_sensitive is True and 'check_' in domain.lower():  # need to be more dynamic
+        modifiedDomain = domain # without permutation
+        if 're_check_' not in domain.lower(): # re_check without permutation
+            name = domain.encode('latin-1')
+            flips = LetterCase.getFlips(name)   # one random mask for the zone name, applied to the logged and the sent name
+            modifiedDomain = LetterCase.swapCase(name, flips).decode('latin-1')
+            # the wire name (never compressed here), its letters five bytes (root label, type and class) after those of domain
+            question = LetterCase.swapCase(question, flips, 40)
+
+    opt = OPT_RECORD if edns is not None else b''
+    end = position + len(question) + len(cached.body) + len(opt)
+    if end > maxSize and tcp is False and adversaryMode is False:
+        end = writeTruncated(view, output, questionEnd, opt)
+        if METRICS is not None:
+            METRICS.countTruncated()
     else:
-        # BUILD THE HEADER WITHOUT THE TRANSACTION ID/REQUEST ID, AFTER FORGE IT, WILL BE ADDED TO THE HEADER
-        DNSHeader = Flags + QDCOUNT + ANCOUNT + NSCOUNT + ARCOUNT
-        RealDNSHeader_Test = TransactionID_Byte + Flags + QDCOUNT + ANCOUNT + NSCOUNT + ARCOUNT
+        if end > len(output):
+            raise DNSCodec.DNSCodecError('Response does not fit in the output buffer: %d bytes' % end)
+        if opt:
+            output[position - 2:position] = b'\x00\x01'    # ARCOUNT, the OPT record
+        output[position:position + len(question)] = question
+        position += len(question)
+        output[position:position + len(cached.body)] = cached.body
+        output[end - len(opt):end] = opt
+
+    transactionID = str((view[0] << 8) | view[1])
+    time = Helper.getTime(TIME_FORMAT.TIME)
+    if scheduleLogging is None:
+        logRequest(counter, cached.recStatus, cached.recordType, transactionID, addr[0], addr[1], domain, time, modifiedDomain)
+    else:   # the caller runs the logging off the packet path
+        scheduleLogging(logRequest, counter, cached.recStatus, cached.recordType, transactionID, addr[0], addr[1], domain, time, modifiedDomain)
 
     if DEBUG is True:
-        dnsH = ''
-        print('DNS HEADER: ' + str(DNSHeader))
-        print('DNS HEADER_test: ' + str(RealDNSHeader_Test))
+        print('DNS Response: ' + str(bytes(output[:end])))
 
-        for byte in DNSHeader:
-            dnsH += hex(byte)[2:]
-        print('DNSHeader:' + dnsH)
+    response = True
+    if forceNotResponseMode:
+        if FORCE_NOT_RESPONSE_MEG in domain:
+            response = False
 
-    # ********************************** DNS Question
+    if METRICS is not None:
+        if cached.negative is REFUSED:
+            METRICS.countRefused()
+        elif cached.negative is not None:
+            METRICS.countNegative(cached.negative is NXDOMAIN)
+        METRICS.countQuery(cached.recordType, Metrics.getQueryMode(domain, adversaryMode, FORCE_NOT_RESPONSE_MEG),
+                           response, cached.recStatus == 'ERROR', perf_counter_ns() - started)
 
-    #records, recordType, domainName = getRecs(data[12:])
+    return (end, response)
 
-    global COUNTER
-    COUNTER += 1
-    transactionID= str(int(TransactionID,16))
-    srcIP = addr[0]
-    srcPort = addr[1]
-    domain = '.'.join(map(str, domainName))[:-1]
-    status = 'Okay'
+#
+def writeTruncated(view, output, questionEnd, opt=b'', headerTails=TRUNCATED_HEADER_TAILS):
+    '''
+        Write the TC=1 stub (header + question, no answers) of the query in view into output, return its length.
+        opt: OPT record of an EDNS0 query, headerTails: the flags and counts by RD bit, e.g. of a BADVERS answer.
+    '''
 
-    time = Helper.getTime(TIME_FORMAT.TIME)
+    output[0:2] = view[0:2]
+    output[2:DNSCodec.HEADER_SIZE] = headerTails[view[2] & 0x01]
+    output[DNSCodec.HEADER_SIZE:questionEnd] = view[DNSCodec.HEADER_SIZE:questionEnd]
+    if opt:
+        output[10:12] = b'\x00\x01'  # ARCOUNT
+        output[questionEnd:questionEnd + len(opt)] = opt
 
-    # TODO: implement a method that distinguishes sendRequests if they have been called from TORMAPPER
-    if case_sensitive is True and 'check_' in domain.lower():  # need to be more dynamic
-        modifiedDomain = domain # without permutation
-        if 're_check_' not in domain.lower(): # re_check without permutation
-            domainName = getLetterCaseSwapped(domainName)
-            modifiedDomain = '.'.join(map(str, domainName))[:-1]
+    return questionEnd + len(opt)
 
-        printedRow,printStatus = logDNSRequest(counter=COUNTER,status=recStatus, recordType=recordType, requestId=transactionID, srcIP=srcIP, srcPort=srcPort, domain=domain, modifiedDomain=modifiedDomain, mode='none')
-        Helper.printOnScreenAlways(printedRow,printStatus)
+#
+def buildCachedResponse(data, domainName, questionType, adversaryMode=False, qname=None):
+    '''
+        Build the part of the response that only depends on (qname, qtype, zone), data holds the query header,
+        qname is the lowercase wire format name when the caller has it (the zone index key).
+    '''
 
-        if 'check_' in domain.lower():
-            storeDNSRequestJSON(status=status, time=time,recordType=recordType,transactionID=transactionID, srcIP=addr[0], srcPort=str(addr[1]), domain=domain, modifiedDomain=modifiedDomain,mode='check')
-        else:
-            storeDNSRequestJSON(status=status, time=time,recordType=recordType,transactionID=transactionID, srcIP=addr[0], srcPort=str(addr[1]), domain=domain, modifiedDomain=modifiedDomain)
+    # FLAGS
+    Flags = getFlags(data[2:4])
 
-    else:
+    # Question Count, how many questions in the zone file
+    QDCOUNT = RECORD_TYPES.A.value #b'\x00\x01'  # dns has one question
 
-        printedRow, printStatus = logDNSRequest(counter=COUNTER, status=recStatus, recordType=recordType,
-                                                requestId=transactionID, srcIP=srcIP, srcPort=srcPort, domain=domain,
-                                                 mode='none')
-        Helper.printOnScreenAlways(printedRow, printStatus)
+    if adversaryMode is True:   # load the fake zone
+        zone, node = lookupZone(FAKE_ZONE_INDEX, qname if qname is not None else domainName)
+    else: #load the real zone
+        zone, node = lookupZone(ZONE_INDEX, qname if qname is not None else domainName)
 
-        if 'check_' in domain.lower():
-            storeDNSRequestJSON(status=status, time=time,recordType=recordType,transactionID=transactionID, srcIP=addr[0], srcPort=str(addr[1]), domain=domain, mode='check')
-        else:
-            storeDNSRequestJSON(status=status, time=time, recordType=recordType, transactionID=transactionID,
-                                srcIP=addr[0], srcPort=str(addr[1]), domain=domain)
+    records, recordType, domainName, recStatus = getRecs(zone=node,domain=domainName, questionType=questionType)
 
-    DNSQuestion = buildQuestion(domainName, recordType)
-    if DEBUG is True:
-        print('DNSQuestion: ' + str(DNSQuestion))
+    # Out of the zones: REFUSED, this server is not authoritative for the name and does not recurse
+    if zone is None:
+        Flags = bytes([Flags[0] & ~DNSCodec.AA_FLAG, Flags[1] | DNSCodec.RCODE_REFUSED])
+        return CachedResponse(Flags + QDCOUNT + REFUSED_COUNTS, b'', recordType, recStatus, REFUSED)
 
-    response = True
-    if forceNotResponseMode:
-        if FORCE_NOT_RESPONSE_MEG in domain:
-            response = False
+    # Negative answer: NXDOMAIN / NODATA with the SOA of the zone in the authority section, cached by the resolvers
+    if recStatus == 'ERROR' and zone.negative is not None:
+        negative = NXDOMAIN if node is None else NODATA
+        if negative is NXDOMAIN:
+            Flags = Flags[:1] + bytes([Flags[1] | DNSCodec.RCODE_NXDOMAIN])
+        headerTail = Flags + QDCOUNT + NEGATIVE_COUNTS
+        return CachedResponse(headerTail, zone.negative, recordType, recStatus, negative)
 
+    # Answer Count
+    ANCOUNT = len(records).to_bytes(2, byteorder='big')
 
-    # ********************************** DNS Body
-    DNSBody = b''
-    for record in records:
-        DNSBody += recordToBytes(domainName, recordType, record['ttl'], record['value'])
+    # Name server nodeCount
+    NSCOUNT = (0).to_bytes(2, byteorder='big')
 
-    if DEBUG is True:
-        print('DNSBody: '+str(DNSBody))
-        print(str(DNSHeader) + '\n' + str(DNSQuestion)+'\n' + str(DNSBody ))
+    # Additional nodeCount
+    ARCOUNT = (0).to_bytes(2, byteorder='big')
 
-    return ((DNSHeader + DNSQuestion + DNSBody), response) #, (RealDNSHeader_Test + DNSQuestion + DNSBody)
+    # ********************************** DNS Body
+    if recordType != 'ANY':
+        records = [(recordType, record) for record in records]
+    DNSBody = b''.join(recordToBytes(domainName, rtype, record['ttl'], record['value']) for rtype, record in records)
 
+    return CachedResponse(Flags + QDCOUNT + ANCOUNT + NSCOUNT + ARCOUNT, DNSBody, recordType, recStatus)
 
 # </editor-fold>
 
@@ -727,8 +924,7 @@ def getForgedResponse(data, addr, case_sensitive=True):
 
     # records, recordType, domainName = getRecs(data[12:])
 
-    global COUNTER
-    COUNTER += 1
+    counter = nextCounter()
     transactionID = str(int(TransactionID, 16))
     domain = '.'.join(map(str, domainName))[:-1]
     srcIP = addr[0]
@@ -740,7 +936,7 @@ def getForgedResponse(data, addr, case_sensitive=True):
         domainName = getLetterCaseSwapped(domainName)
         modifiedDomain = '.'.join(map(str, domainName))[:-1]
 
-        printedRow, printStatus = logDNSRequest(counter=COUNTER, status=recStatus, recordType=recordType,
+        printedRow, printStatus = logDNSRequest(counter=counter, status=recStatus, recordType=recordType,
                                                 requestId=transactionID, srcIP=srcIP, srcPort=srcPort, domain=domain,
                                                 modifiedDomain=modifiedDomain, mode='none')
         Helper.printOnScreenAlways(printedRow, printStatus)
@@ -753,7 +949,7 @@ def getForgedResponse(data, addr, case_sensitive=True):
                             srcIP=addr[0], srcPort=str(addr[1]), domain=domain, modifiedDomain=modifiedDomain)
     else:
 
-        printedRow, printStatus = logDNSRequest(counter=COUNTER, status=recStatus, recordType=recordType,
+        printedRow, printStatus = logDNSRequest(counter=counter, status=recStatus, recordType=recordType,
                                                 requestId=transactionID, srcIP=srcIP, srcPort=srcPort, domain=domain,
                                                  mode='none')
         Helper.printOnScreenAlways(printedRow, printStatus)
@@ -782,53 +978,106 @@ def getForgedResponse(data, addr, case_sensitive=True):
     return DNSHeader + DNSQuestion + DNSBody
 
 #
-def generateResponseWithRequestId(response,sock,addr,times): #,expectedID=0,resp=''):
+def getRandomCandidates(times):
     '''
-        Generate the Request Id
+        Distinct random request IDs/port numbers to try (1-65535), generated one by one.
     '''
+
+    return CandidateSearch.getDistinct(times)
+
+#
+def setForgeRate(rate):
+    '''
+        Cap every forging run at rate packets/sec, 0: as fast as possible.
+    '''
+
+    global FORGE_RATE
+    FORGE_RATE = rate
+
+#
+def enablePortSweeper(portSweeper):
+    '''
+        Spray the port number mode over the whole port range with the sweep workers of portSweeper (PortSweep.PortSweeper).
+    '''
+
+    global PORT_SWEEPER
+    PORT_SWEEPER = portSweeper
+    PORT_SWEEPER.countForged = countForged
+
+#
+def enableJointSearch(searchScheduler):
+    '''
+        Search the request ID x port number space of every resolver with searchScheduler (CandidateSearch.SearchScheduler).
+    '''
+
+    global SEARCH_SCHEDULER
+    SEARCH_SCHEDULER = searchScheduler
+
+#
+def getJointCandidates(addr, times):
+    return SEARCH_SCHEDULER.getCandidates(addr[0], times)
+
+#
+def printJointCoverage(addr):
+    search = SEARCH_SCHEDULER.getSearch(addr[0])
+    space, mass = search.getCoverage()
+    Helper.printOnScreenAlways("Joint search %s: %d candidates tried, %.4f%% of the ID x port space, %.4f%% of the learned "
+                               "distribution (%d samples)" % (addr[0], search.tried, space, mass, search.distribution.samples),
+                               MSG_TYPES.RESULT)
+
+#
+def countForged(packets):
+    if METRICS is not None and packets:
+        METRICS.countForged(packets)
+
+#
+def generateResponseWithRequestId(response,sock,addr,times,batchIO=None):
+    '''
+        Send the response (without its transaction ID) once per request ID candidate, batchIO (BatchIO backend)
+        sends the packets in sendmmsg batches.
+    '''
+
     try:
-        round_ = 1
-        while round_ <= 1:
-            Helper.printOnScreenAlways("Round: " + str(round_),MSG_TYPES.RESULT)
-            requestIds = [random.randint(1, 65536) for i in range(times)]
-            requestIds.sort()
-            index = 0
-            hafltimes= times/2
-            for requestId in requestIds:  #range (1, 10000): # 1000 time should be enoght
-                index+=1
-                Helper.printOnScreenAlways("R: %d - %d- %d" % (round_ ,index,requestId) , MSG_TYPES.YELLOW)
-                TransactionID_Byte = (requestId).to_bytes(2, byteorder='big')
-                finalResponse = TransactionID_Byte + response
-                sock.sendto(finalResponse, addr)
-            round_ = round_ + 1
+        Helper.printOnScreenAlways("Round: 1 - %d request IDs to %s:%d" % (times, addr[0], addr[1]), MSG_TYPES.RESULT)
+        forger = Forger.Forger(response, addr, sock, Forger.MODE_REQUEST_ID, rate=FORGE_RATE, batchIO=batchIO, countForged=countForged)
+        forger.run(getRandomCandidates(times))
 
     except Exception as ex:
         logging.error('DNSFunctions - generateResponseWithRequestId:\n %s ' % traceback.format_exc())
 
 #
-def generateResponseWithPortNumber(response,sock,addr,times):
+def generateResponseWithPortNumber(response,sock,addr,times,batchIO=None):
     '''
-        Generate the Port Number.
+        Send the response once per port number candidate, batchIO (BatchIO backend) sends the packets in sendmmsg batches.
+        With the sweep workers, the whole port range is sprayed by them instead.
     '''
 
     try:
-        portNumbers = [random.randint(1, 65536) for i in range(times)]
-        portNumbers.sort()
-        round_ = 1
-        while round_ <= 1:
-            Helper.printOnScreenAlways("Round: " + str(round_), MSG_TYPES.RESULT)
-            index=0
-            for portNumber in portNumbers: # range (1, 10000): # 1000 time should be enoght
-                index += 1
-                Helper.printOnScreenAlways("R: %d - %d- %d" % (round_, index, portNumber), MSG_TYPES.YELLOW)
-
-                lst = list(addr)
-                lst[1] = portNumber
-                addr = tuple(lst)
-                sock.sendto(response, addr)
-        round_ = round_ + 1
+        if PORT_SWEEPER is not None:
+            sweepId = PORT_SWEEPER.sweep(response, sock, addr)
+            Helper.printOnScreenAlways("Sweep %d - all port numbers to %s" % (sweepId, addr[0]), MSG_TYPES.RESULT)
+            return
+        Helper.printOnScreenAlways("Round: 1 - %d port numbers to %s" % (times, addr[0]), MSG_TYPES.RESULT)
+        forger = Forger.Forger(response, addr, sock, Forger.MODE_PORT_NUMBER, rate=FORGE_RATE, batchIO=batchIO, countForged=countForged)
+        forger.run(getRandomCandidates(times))
 
     except Exception as ex:
         logging.error('DNSFunctions - generateResponseWithPortNumber: \n %s ' % traceback.format_exc())
 
+#
+def generateResponseWithBoth(response,sock,addr,times,batchIO=None):
+    '''
+        Send the response (without its transaction ID) to the next times (request ID, port number) candidates of the
+        resolver's joint search, the search resumes there at the next trigger.
+    '''
+
+    try:
+        Helper.printOnScreenAlways("Round: 1 - %d request ID x port numbers to %s" % (times, addr[0]), MSG_TYPES.RESULT)
+        forger = Forger.Forger(response, addr, sock, Forger.MODE_BOTH, rate=FORGE_RATE, batchIO=batchIO, countForged=countForged)
+        forger.run(getJointCandidates(addr, times))
+        printJointCoverage(addr)
+
+    except Exception as ex:
+        logging.error('DNSFunctions - generateResponseWithBoth: \n %s ' % traceback.format_exc())
+
 # </editor-fold>
\ No newline at end of file
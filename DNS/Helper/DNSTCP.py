@@ -0,0 +1,194 @@
+#! /usr/bin/env python3
+
+'''
+    DNS over TCP (RFC 7766) next to the UDP engines: every serving process runs an asyncio loop on a
+    thread that accepts the connections. Every message is prefixed with its 2-byte length, the pipelined
+    queries of a connection are answered in order, and a connection idle for IDLE_TIMEOUT is closed.
+    The answers are built by DNSFunctions.writeResponse like on UDP, without the UDP size limit and the
+    response-rate limiting (a TCP source can not be spoofed).
+'''
+
+import asyncio
+import logging
+import struct
+import threading
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from Helper import DNSFunctions
+from Helper import DNSCodec
+
+LENGTH = struct.Struct('!H')    # message length prefix
+IDLE_TIMEOUT = 10.0             # seconds without a query before the connection is closed
+MAX_CONNECTIONS = 1024          # open connections per serving process, the next ones are closed at once
+MAX_MESSAGE_SIZE = 65535
+WRITE_BUFFER_HIGH = 1 << 16     # stop reading the queries of a client that does not read its answers
+STOP_TIMEOUT = 5
+
+
+#
+def loggingDone(future):
+    if future.exception() is not None:
+        logging.error('DNSTCP - logging: %s ' % future.exception())
+
+
+class DNSTCPProtocol(asyncio.Protocol):
+    '''
+        One TCP connection.
+    '''
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.addr = None
+        self.buffer = bytearray()
+        self.lastActivity = 0.0
+        self.idleHandle = None
+
+    def connection_made(self, transport):
+        server = self.server
+        self.transport = transport
+        self.addr = transport.get_extra_info('peername')[:2]
+        server.accepted += 1
+        if len(server.connections) >= server.maxConnections:
+            server.rejected += 1
+            transport.close()
+            return
+        server.connections.add(self)
+        transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+        self.lastActivity = server.loop.time()
+        self.idleHandle = server.loop.call_later(server.idleTimeout, self.checkIdle)
+
+    def connection_lost(self, exc):
+        if self.idleHandle is not None:
+            self.idleHandle.cancel()
+        self.server.connections.discard(self)
+
+    def checkIdle(self):
+        idle = self.server.loop.time() - self.lastActivity
+        if idle >= self.server.idleTimeout:
+            self.server.idleClosed += 1
+            self.transport.close()
+        else:
+            self.idleHandle = self.server.loop.call_later(self.server.idleTimeout - idle, self.checkIdle)
+
+    def data_received(self, data):
+        self.lastActivity = self.server.loop.time()
+        buffer = self.buffer
+        buffer += data
+        position = 0
+        answers = []
+        while len(buffer) - position >= LENGTH.size:
+            end = position + LENGTH.size + LENGTH.unpack_from(buffer, position)[0]
+            if end > len(buffer):
+                break       # the rest of the message is still on its way
+            answer = self.server.answer(bytes(buffer[position + LENGTH.size:end]), self.addr)
+            if answer is not None:
+                answers.append(answer)
+            position = end
+        if position:
+            del buffer[:position]
+        if answers:
+            self.transport.writelines(answers)
+
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+
+class TCPServer():
+    '''
+        The TCP listener of one serving process, on its own thread and event loop.
+    '''
+
+    def __init__(self, argv, idleTimeout=IDLE_TIMEOUT, maxConnections=MAX_CONNECTIONS, scheduleLogging=None):
+        self.letterCaseRandomize = argv.rcase
+        self.forceNotResponseMode = argv.dont
+        self.idleTimeout = idleTimeout
+        self.maxConnections = maxConnections
+        self.output = bytearray(MAX_MESSAGE_SIZE + 1)   # one more byte, an answer that does not fit fails instead of being cut
+        self.executor = None
+        self.scheduleLogging = scheduleLogging
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.started = threading.Event()
+        self.connections = set()
+        self.accepted = 0
+        self.rejected = 0
+        self.idleClosed = 0
+        self.queries = 0
+        self.malformed = 0
+
+    def start(self, sock):
+        '''
+            Serve the bound TCP socket from a daemon thread.
+        '''
+
+        if self.scheduleLogging is None:    # one logging thread keeps the rows in the same order as the queries
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='DNSTCPLogging')
+            self.scheduleLogging = lambda function, *args: self.executor.submit(function, *args).add_done_callback(loggingDone)
+        self.thread = threading.Thread(target=self.run, args=(sock,), name='DNSTCP', daemon=True)
+        self.thread.start()
+        self.started.wait(STOP_TIMEOUT)
+
+    def run(self, sock):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(self.loop.create_server(lambda: DNSTCPProtocol(self), sock=sock))
+            self.started.set()
+            self.loop.run_forever()
+            self.server.close()
+            for connection in list(self.connections):
+                connection.transport.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+
+        except Exception as ex:
+            logging.error('DNSTCP - run: \n%s ' % traceback.format_exc())
+        finally:
+            self.started.set()
+            self.loop.close()
+
+    def answer(self, message, addr):
+        '''
+            The length-prefixed answer of one query, None when it is not answered.
+        '''
+
+        self.queries += 1
+        try:
+            length, allowResponse = DNSFunctions.writeResponse(memoryview(message), self.output, addr, case_sensitive=self.letterCaseRandomize,
+                                                               forceNotResponseMode=self.forceNotResponseMode,
+                                                               scheduleLogging=self.scheduleLogging, tcp=True)
+            if not allowResponse:
+                return None
+            if length > MAX_MESSAGE_SIZE:
+                raise DNSCodec.DNSCodecError('Answer too long for TCP: %d bytes' % length)
+
+            return LENGTH.pack(length) + self.output[:length]
+
+        except DNSCodec.DNSCodecError as ex:
+            self.malformed += 1
+            if DNSFunctions.METRICS is not None:
+                DNSFunctions.METRICS.countMalformed()
+            logging.error('DNSTCP - answer: malformed query: %s ' % ex)
+        except Exception as ex:
+            logging.error('DNSTCP - answer: \n%s ' % traceback.format_exc())
+
+        return None
+
+    def getStats(self):
+        return {'connections': len(self.connections), 'accepted': self.accepted, 'rejected': self.rejected,
+                'idleClosed': self.idleClosed, 'queries': self.queries, 'malformed': self.malformed}
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(STOP_TIMEOUT)
+        self.thread = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
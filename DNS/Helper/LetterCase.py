@@ -0,0 +1,85 @@
+#! /usr/bin/env python3
+
+'''
+    0x20 encoding: the letter case of a query name is randomised with one random bitmask per name,
+    drawn from os.urandom, turned into the case flips of its letters with translation tables and
+    applied with one integer XOR, without a Python loop over the characters.
+    Only the last SCOPE_LABELS labels (the domain and zone name, e.g. dnstestsuite.space) are randomised,
+    the '<id>_check_<ip>' labels before them keep the case they were sent with.
+    The letter case of a name is kept as a bitmask (one bit per letter, 1: uppercase), compact enough
+    to be stored with every transaction and compared in bulk, see BinaryLog.getCaseMatches.
+'''
+
+import os
+
+CASE_BIT = 0x20         # the bit that tells a lowercase ASCII letter from an uppercase one
+MAX_CASE_BITS = 64      # letters kept in a case bitmask: the last ones of the name (the zone name)
+CASE_MASK = (1 << MAX_CASE_BITS) - 1
+SCOPE_LABELS = 2        # labels randomised at the end of the name, None: the whole name
+
+LETTERS = bytes(range(ord('A'), ord('Z') + 1)) + bytes(range(ord('a'), ord('z') + 1))
+NON_LETTERS = bytes(byte for byte in range(256) if byte not in LETTERS)
+LETTER_FLIPS = bytes(CASE_BIT if byte in LETTERS else 0 for byte in range(256))     # letter -> CASE_BIT, other -> 0
+RANDOM_FLIPS = bytes(byte & CASE_BIT for byte in range(256))    # random byte -> CASE_BIT or 0, even odds
+CASE_DIGITS = bytes(ord('1') if ord('A') <= byte <= ord('Z') else ord('0') for byte in range(256))  # uppercase -> '1'
+
+
+#
+def getScopeSize(name, labels=SCOPE_LABELS):
+    '''
+        Bytes at the end of name (bytes, a trailing dot is the root) holding its last labels, all of them
+        if the name has no more labels or labels is None.
+    '''
+
+    if labels is None:
+        return len(name)
+    start = len(name) - 1 if name.endswith(b'.') else len(name)
+    for label in range(labels):     # rfind, no list of the labels
+        start = name.rfind(b'.', 0, start)
+        if start < 0:
+            return len(name)
+
+    return len(name) - start - 1
+
+#
+def getFlips(name, labels=SCOPE_LABELS):
+    '''
+        Random case flips of name (bytes) as an int to XOR with it: CASE_BIT on about half of the letters of
+        its last labels (getScopeSize).
+    '''
+
+    length = getScopeSize(name, labels)
+    flips = int.from_bytes(os.urandom(length).translate(RANDOM_FLIPS), 'big')
+
+    return flips & int.from_bytes(name.translate(LETTER_FLIPS), 'big') & ((1 << (length << 3)) - 1)
+
+#
+def swapCase(name, flips, shift=0):
+    '''
+        name (bytes) with the letters of flips swapped, shift: bits between the end of name and the end of
+        the name flips were drawn for, e.g. 8 to apply the flips of 'a.b' to its wire format b'\\x01a\\x01b\\x00'.
+    '''
+
+    return (int.from_bytes(name, 'big') ^ (flips << shift)).to_bytes(len(name), 'big')
+
+#
+def randomizeCase(name, labels=SCOPE_LABELS):
+    '''
+        (name with a random letter case on its last labels, the flips applied).
+    '''
+
+    flips = getFlips(name, labels)
+
+    return swapCase(name, flips), flips
+
+#
+def getCaseBits(name):
+    '''
+        Letter case of name (bytes or str): one bit per letter, 1: uppercase, the last MAX_CASE_BITS letters.
+    '''
+
+    if isinstance(name, str):
+        name = name.encode('latin-1')
+    digits = name.translate(CASE_DIGITS, NON_LETTERS)
+
+    return int(digits[-MAX_CASE_BITS:], 2) if digits else 0
@@ -0,0 +1,265 @@
+#! /usr/bin/env python3
+
+'''
+    Server metrics in the Prometheus text format, served over HTTP ('host:port') or a UNIX socket
+    ('unix:/path') at /metrics. The counters live in one shared multiprocessing.Array with a row per
+    worker, the endpoint thread of the parent process sums the rows. Several threads of a process update
+    its row (the serving loop, the DNSTCP thread, the logging thread, the port sweep collector), the
+    read-modify-write of a slot is done under the row lock of the process.
+'''
+
+import bisect
+import http.server
+import multiprocessing
+import os
+import socketserver
+import threading
+import time
+import logging
+
+QTYPES = ['A', 'AAAA', 'NS', 'CNAME', 'SOA', 'MX', 'TXT', 'ANY', 'OTHER']
+MODES = ['normal', 'check', 're_check', 'tor_dont_response', 'adversary']
+LATENCY_BUCKETS = [0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01]  # seconds
+LATENCY_BUCKETS_NS = [int(bucket * 1e9) for bucket in LATENCY_BUCKETS]
+EDNS_PAYLOADS = [512, 1232, 1452, 4096]  # advertised UDP payload size buckets of the EDNS0 queries
+SAMPLE_EVERY = 256      # logged requests between two reads of the log writers' drop counters
+
+# slots of one worker row
+QUERIES = 0
+SENT = QUERIES + len(QTYPES) * len(MODES)
+SUPPRESSED = SENT + 1
+ZONE_MISSES = SUPPRESSED + 1
+FORGED = ZONE_MISSES + 1
+MALFORMED = FORGED + 1
+RATE_LIMITED_DROPPED = MALFORMED + 1
+RATE_LIMITED_TRUNCATED = RATE_LIMITED_DROPPED + 1
+TRUNCATED = RATE_LIMITED_TRUNCATED + 1      # UDP answers too long, sent with TC=1
+NXDOMAIN = TRUNCATED + 1        # negative answers, see DNSFunctions.buildCachedResponse
+NODATA = NXDOMAIN + 1
+REFUSED = NODATA + 1            # queries for a name out of the zones
+EDNS = REFUSED + 1               # EDNS0 queries, one slot per advertised payload size bucket and +Inf
+LOG_SCHEDULED = EDNS + len(EDNS_PAYLOADS) + 1   # counted by the serving threads
+LOG_DONE = LOG_SCHEDULED + 1    # counted by the logging threads / logger process
+LOG_WRITER_DROPS = LOG_DONE + 1  # gauge, RequestLog + QueryStore drops of the process that logs
+LATENCY_SUM = LOG_WRITER_DROPS + 1
+LATENCY = LATENCY_SUM + 1       # one slot per bucket and +Inf, not cumulative
+ROW_SIZE = LATENCY + len(LATENCY_BUCKETS) + 1
+
+QTYPE_INDEX = dict((qtype, index) for index, qtype in enumerate(QTYPES))
+MODE_INDEX = dict((mode, index) for index, mode in enumerate(MODES))
+
+
+class Metrics():
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.values = multiprocessing.Array('Q', workers * ROW_SIZE, lock=False)
+        self.row = 0
+        self.lock = threading.Lock()    # the row of this process, the other processes write other slots
+        self.logged = 0
+        self.getLogWriterDrops = None   # callable set by DNSFunctions
+        self.getRingStats = None        # callable set by DNSServer when the logger process is used
+        self.lastScrape = None          # (time, total queries) for the queries/sec gauge
+        os.register_at_fork(after_in_child=self.resetLock)
+
+    def resetLock(self):
+        self.lock = threading.Lock()    # a thread of the parent may have held it when the process forked
+
+    def setWorker(self, index):
+        self.row = index * ROW_SIZE
+
+    #<editor-fold desc="******************* Recording *******************">
+
+    def countQuery(self, qtype, mode, sent, zoneMiss, latencyNs):
+        values = self.values
+        row = self.row
+        query = row + QUERIES + QTYPE_INDEX.get(qtype, QTYPE_INDEX['OTHER']) * len(MODES) + MODE_INDEX[mode]
+        latency = row + LATENCY + bisect.bisect_left(LATENCY_BUCKETS_NS, latencyNs)
+        with self.lock:
+            values[query] += 1
+            values[row + (SENT if sent else SUPPRESSED)] += 1
+            if zoneMiss:
+                values[row + ZONE_MISSES] += 1
+            values[row + LATENCY_SUM] += latencyNs
+            values[latency] += 1
+            values[row + LOG_SCHEDULED] += 1
+
+    def countLogged(self):
+        with self.lock:
+            self.values[self.row + LOG_DONE] += 1
+            self.logged += 1
+            sample = self.logged % SAMPLE_EVERY == 0
+        if sample and self.getLogWriterDrops is not None:
+            self.values[self.row + LOG_WRITER_DROPS] = self.getLogWriterDrops()     # a gauge, only set
+
+    def add(self, slot, count=1):
+        with self.lock:
+            self.values[self.row + slot] += count
+
+    def countForged(self, packets):
+        self.add(FORGED, packets)
+
+    def countMalformed(self):
+        self.add(MALFORMED)
+
+    def countRateLimited(self, truncated):
+        self.add(RATE_LIMITED_TRUNCATED if truncated else RATE_LIMITED_DROPPED)
+
+    def countTruncated(self):
+        self.add(TRUNCATED)
+
+    def countNegative(self, nxdomain):
+        self.add(NXDOMAIN if nxdomain else NODATA)
+
+    def countRefused(self):
+        self.add(REFUSED)
+
+    def countEdns(self, payloadSize):
+        self.add(EDNS + bisect.bisect_left(EDNS_PAYLOADS, payloadSize))
+
+    # </editor-fold>
+
+    #<editor-fold desc="******************* Exposition *******************">
+
+    def getTotal(self, slot):
+        values = self.values
+        return sum(values[row + slot] for row in range(0, self.workers * ROW_SIZE, ROW_SIZE))
+
+    def render(self):
+        '''
+            All the metrics in the Prometheus text format.
+        '''
+
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for labels, value in samples:
+                lines.append('%s%s %s' % (name, labels, value))
+
+        queries = []
+        total = 0
+        for qtypeIndex, qtype in enumerate(QTYPES):
+            for modeIndex, mode in enumerate(MODES):
+                value = self.getTotal(QUERIES + qtypeIndex * len(MODES) + modeIndex)
+                total += value
+                if value:
+                    queries.append(('{qtype="%s",mode="%s"}' % (qtype, mode), value))
+        metric('dns_queries_total', 'counter', 'Queries answered or suppressed, by qtype and mode.', queries)
+
+        now = time.monotonic()
+        rate = 0.0
+        if self.lastScrape is not None and now > self.lastScrape[0]:
+            rate = (total - self.lastScrape[1]) / (now - self.lastScrape[0])
+        self.lastScrape = (now, total)
+        metric('dns_queries_per_second', 'gauge', 'Queries/sec since the previous scrape.', [('', '%.2f' % rate)])
+
+        metric('dns_responses_total', 'counter', 'Responses sent and suppressed by the no response mode.',
+               [('{result="sent"}', self.getTotal(SENT)), ('{result="suppressed"}', self.getTotal(SUPPRESSED))])
+        metric('dns_zone_misses_total', 'counter', 'Queries for a name or type missing in the zone.', [('', self.getTotal(ZONE_MISSES))])
+        metric('dns_forged_packets_total', 'counter', 'Forged responses sent in adversary mode.', [('', self.getTotal(FORGED))])
+        metric('dns_malformed_queries_total', 'counter', 'Queries dropped because they could not be parsed.', [('', self.getTotal(MALFORMED))])
+        metric('dns_rate_limited_total', 'counter', 'Queries over the response-rate limit, dropped or answered with TC=1.',
+               [('{action="drop"}', self.getTotal(RATE_LIMITED_DROPPED)), ('{action="truncate"}', self.getTotal(RATE_LIMITED_TRUNCATED))])
+        metric('dns_truncated_total', 'counter', 'UDP answers over the size limit, sent with TC=1 for a retry over TCP.', [('', self.getTotal(TRUNCATED))])
+        metric('dns_negative_answers_total', 'counter', 'Answers without records, with the SOA of the zone for the negative caching.',
+               [('{rcode="nxdomain"}', self.getTotal(NXDOMAIN)), ('{rcode="nodata"}', self.getTotal(NODATA))])
+        metric('dns_refused_total', 'counter', 'Queries for a name in none of the zones, answered with REFUSED.', [('', self.getTotal(REFUSED))])
+        metric('dns_edns_queries_total', 'counter', 'Queries with an EDNS0 OPT record, by advertised UDP payload size (up to the bound).',
+               [('{payload="%s"}' % bound, self.getTotal(EDNS + index)) for index, bound in enumerate(EDNS_PAYLOADS + ['+Inf'])])
+
+        depth = self.getTotal(LOG_SCHEDULED) - self.getTotal(LOG_DONE)
+        drops = self.getTotal(LOG_WRITER_DROPS)
+        if self.getRingStats is not None:
+            ringDepth, ringDrops = self.getRingStats()
+            depth -= ringDrops      # dropped records are never logged
+            drops += ringDrops
+        metric('dns_log_queue_depth', 'gauge', 'Requests waiting to be logged.', [('', max(depth, 0))])
+        metric('dns_log_dropped_total', 'counter', 'Requests dropped by the full logging queues.', [('', drops)])
+
+        buckets = []
+        cumulative = 0
+        for index, bucket in enumerate(LATENCY_BUCKETS + ['+Inf']):
+            cumulative += self.getTotal(LATENCY + index)
+            buckets.append(('_bucket{le="%s"}' % bucket, cumulative))
+        buckets.append(('_sum', '%.9f' % (self.getTotal(LATENCY_SUM) / 1e9)))
+        buckets.append(('_count', cumulative))
+        metric('dns_query_latency_seconds', 'histogram', 'Time to build the response of one query.', buckets)
+
+        return '\n'.join(lines) + '\n'
+
+    # </editor-fold>
+
+#
+def getQueryMode(domain, adversaryMode=False, forceNotResponseMessage='tor_dont_response'):
+    if adversaryMode:
+        return 'adversary'
+    domain = domain.lower()
+    if forceNotResponseMessage in domain:
+        return 'tor_dont_response'
+    if 're_check_' in domain:
+        return 're_check'
+    if 'check_' in domain:
+        return 'check'
+
+    return 'normal'
+
+#<editor-fold desc="******************* Endpoint *******************">
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+
+    metrics = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        try:
+            body = self.metrics.render().encode('utf-8')
+        except Exception as ex:
+            logging.error('Metrics - render: %s ' % ex)
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixMetricsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, address = super().get_request()
+        return request, ('unix', 0)     # BaseHTTPRequestHandler expects a (host, port) address
+
+
+#
+def startServer(metrics, address):
+    '''
+        Serve /metrics on 'host:port' or 'unix:/path' from a daemon thread, return the server.
+    '''
+
+    handler = type('Handler', (MetricsHandler,), {'metrics': metrics})
+    if address.startswith('unix:'):
+        path = address[len('unix:'):]
+        if os.path.exists(path):
+            os.unlink(path)
+        server = UnixMetricsServer(path, handler)
+    else:
+        host, port = address.rsplit(':', 1)
+        server = http.server.ThreadingHTTPServer((host or '127.0.0.1', int(port)), handler)
+        server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='Metrics', daemon=True).start()
+
+    return server
+
+# </editor-fold>
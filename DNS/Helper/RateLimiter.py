@@ -0,0 +1,132 @@
+#! /usr/bin/env python3
+
+'''
+    Response-rate limiting: token buckets per source IP, per /24 and optionally per qname.
+    Every table is an LRU of at most MAX_ENTRIES buckets, so a flood of spoofed sources costs
+    bounded memory and every query costs a few O(1) dict operations.
+    Over-limit queries are dropped, every SLIP-th one is answered with a TC=1 stub instead
+    (a real resolver retries over TCP, a spoofed victim gets nothing bigger than the query).
+'''
+
+from collections import OrderedDict
+from time import monotonic
+
+MAX_ENTRIES = 65536     # buckets kept per table, the least recently seen source is evicted first
+BURST_SECONDS = 2.0     # a bucket holds rate * BURST_SECONDS tokens (at least 1)
+SLIP = 2                # every SLIP-th limited query gets the TC=1 stub, 0: drop them all
+
+ALLOW = 0
+DROP = 1
+TRUNCATE = 2
+
+
+class TokenBuckets():
+    '''
+        Token buckets by key, refilled at rate tokens/sec up to burst tokens.
+    '''
+
+    def __init__(self, rate, burst, maxEntries=MAX_ENTRIES):
+        self.rate = rate
+        self.burst = burst
+        self.maxEntries = maxEntries
+        self.buckets = OrderedDict()    # key -> [tokens, last refill]
+
+    def getBucket(self, key, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = [self.burst, now]
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.maxEntries:
+                self.buckets.popitem(last=False)
+            return bucket
+
+        self.buckets.move_to_end(key)
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+
+        return bucket
+
+    def __len__(self):
+        return len(self.buckets)
+
+
+class RateLimiter():
+    '''
+        One limiter per serving process, a query is allowed when every enabled bucket has a token.
+    '''
+
+    def __init__(self, ipRate=0, prefixRate=0, qnameRate=0, slip=SLIP, burstSeconds=BURST_SECONDS, maxEntries=MAX_ENTRIES):
+        self.ips = self.getTable(ipRate, burstSeconds, maxEntries)
+        self.prefixes = self.getTable(prefixRate, burstSeconds, maxEntries)
+        self.qnames = self.getTable(qnameRate, burstSeconds, maxEntries)
+        self.slip = slip
+        self.limited = 0
+        self.dropped = 0
+        self.truncated = 0
+
+    @staticmethod
+    def getTable(rate, burstSeconds, maxEntries):
+        if not rate:
+            return None
+        return TokenBuckets(rate, max(1.0, rate * burstSeconds), maxEntries)
+
+    def check(self, ip, qname):
+        '''
+            ALLOW, DROP or TRUNCATE for a query from ip (str) for qname (lowercase wire bytes).
+        '''
+
+        now = monotonic()
+        ipBucket = prefixBucket = qnameBucket = None
+        allowed = True
+        if self.ips is not None:
+            ipBucket = self.ips.getBucket(ip, now)
+            allowed = ipBucket[0] >= 1
+        if self.prefixes is not None:
+            prefixBucket = self.prefixes.getBucket(getPrefix(ip), now)
+            allowed = allowed and prefixBucket[0] >= 1
+        if self.qnames is not None:
+            qnameBucket = self.qnames.getBucket(qname, now)
+            allowed = allowed and qnameBucket[0] >= 1
+
+        if allowed:
+            if ipBucket is not None:
+                ipBucket[0] -= 1
+            if prefixBucket is not None:
+                prefixBucket[0] -= 1
+            if qnameBucket is not None:
+                qnameBucket[0] -= 1
+            return ALLOW
+
+        self.limited += 1
+        if self.slip and self.limited % self.slip == 0:
+            self.truncated += 1
+            return TRUNCATE
+        self.dropped += 1
+
+        return DROP
+
+    def getStats(self):
+        return {'dropped': self.dropped, 'truncated': self.truncated,
+                'buckets': sum(len(table) for table in (self.ips, self.prefixes, self.qnames) if table is not None)}
+
+#
+def getPrefix(ip):
+    '''
+        '192.0.2.1' -> '192.0.2' (the /24), other addresses are their own prefix.
+    '''
+
+    return ip.rpartition('.')[0] or ip
+
+#
+def fromSpec(spec, slip=SLIP, workers=1):
+    '''
+        RateLimiter from 'ip[,prefix[,qname]]' queries/sec (0 or missing: no limit), the rates are split
+        over the workers since SO_REUSEPORT spreads the source ports of one resolver over all of them.
+    '''
+
+    rates = [float(rate) / workers if rate.strip() else 0 for rate in spec.split(',')]
+    if len(rates) > 3 or not any(rates):
+        raise ValueError("Rate limit '%s': expected 'ip[,prefix[,qname]]' queries/sec" % spec)
+    rates += [0] * (3 - len(rates))
+
+    return RateLimiter(rates[0], rates[1], rates[2], slip=slip)
@@ -0,0 +1,145 @@
+#! /usr/bin/env python3
+
+'''
+    Append-only JSON-Lines request log. The serving path only enqueues the record, a background
+    thread appends it to '<path>_<date>.jsonl' and group-commits every FLUSH_RECORDS records or
+    FLUSH_INTERVAL seconds. convertToJSON rebuilds the old '<path>_<date>.json' dictionary shape.
+'''
+
+import atexit
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+import logging
+import traceback
+
+QUEUE_SIZE = 100000     # records waiting for the writer, the next ones are dropped
+FLUSH_RECORDS = 256     # group commit: flush after this many records...
+FLUSH_INTERVAL = 0.2    # ...or after this many seconds
+STOP = None             # queue sentinel
+
+
+class RequestLog():
+
+    def __init__(self, queueSize=QUEUE_SIZE, flushRecords=FLUSH_RECORDS, flushInterval=FLUSH_INTERVAL):
+        self.queueSize = queueSize
+        self.flushRecords = flushRecords
+        self.flushInterval = flushInterval
+        self.lock = threading.Lock()
+        self.pid = None
+        self.queue = None
+        self.thread = None
+        self.files = {}     # path -> open file of the current date
+        self.written = 0
+        self.drops = 0
+        atexit.register(self.stop)
+
+    def start(self):
+        '''
+            Start the writer thread, again in a forked worker (threads do not survive fork).
+        '''
+
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.queue = queue.Queue(maxsize=self.queueSize)
+            self.files = {}
+            self.thread = threading.Thread(target=self.run, name='RequestLog', daemon=True)
+            self.thread.start()
+
+    def append(self, path, record):
+        '''
+            Enqueue one record for '<path>_<date>.jsonl', never blocks.
+        '''
+
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait((path, record))
+        except queue.Full:
+            self.drops += 1
+
+    def getQueueDepth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def run(self):
+        pending = []
+        lastFlush = time.monotonic()
+        while 1:
+            timeout = max(0.0, self.flushInterval - (time.monotonic() - lastFlush))
+            try:
+                item = self.queue.get(timeout=timeout)
+                if item is STOP:
+                    self.write(pending)
+                    break
+                pending.append(item)
+            except queue.Empty:
+                pass
+
+            if len(pending) >= self.flushRecords or time.monotonic() - lastFlush >= self.flushInterval:
+                self.write(pending)
+                pending = []
+                lastFlush = time.monotonic()
+
+        for file in self.files.values():
+            file.close()
+
+    def write(self, pending):
+        if not pending:
+            return
+        try:
+            date = datetime.date.today().isoformat()
+            lines = {}
+            for path, record in pending:
+                lines.setdefault(path, []).append(json.dumps(record))
+            for path, rows in lines.items():
+                file = self.getFile(path, date)
+                file.write('\n'.join(rows) + '\n')
+                file.flush()
+            self.written += len(pending)
+
+        except Exception as ex:
+            logging.error('RequestLog - write: \n%s ' % traceback.format_exc())
+
+    def getFile(self, path, date):
+        fileName = '%s_%s.jsonl' % (path, date)
+        file = self.files.get(path)
+        if file is None or file.name != fileName:   # first record or a new day
+            if file is not None:
+                file.close()
+            file = open(fileName, 'a')
+            self.files[path] = file
+
+        return file
+
+    def stop(self):
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join()
+
+#
+def convertToJSON(jsonlFile, jsonFile):
+    '''
+        Write the records of a .jsonl file in the old {"1": {"Request": {"ID": "1", ...}}, ...} shape.
+    '''
+
+    jsons = {}
+    with open(jsonlFile) as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            requestId = str(len(jsons) + 1)
+            request = {'ID': requestId}
+            request.update(record)
+            jsons[requestId] = {'Request': request}
+
+    with open(jsonFile, 'w') as file:
+        json.dump(jsons, file)
+
+    return len(jsons)
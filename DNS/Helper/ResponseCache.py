@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+
+'''
+    LRU cache of the pre-serialized part of the DNS responses.
+'''
+
+import threading
+
+from collections import OrderedDict
+
+CACHE_SIZE = 4096   # number of questions (name, type and class, lowercased) kept in memory
+NXDOMAIN = 'NXDOMAIN'   # negative answers: the name does not exist
+NODATA = 'NODATA'       # the name exists, without records of the question type
+REFUSED = 'REFUSED'     # the name is in none of the zones, not answered
+
+
+class CachedResponse():
+    '''
+        Everything in a response that does not depend on the query bytes.
+    '''
+
+    __slots__ = ('headerTail', 'body', 'recordType', 'recStatus', 'negative')
+
+    def __init__(self, headerTail, body, recordType, recStatus, negative=None):
+        self.headerTail = headerTail    # FLAGS + QDCOUNT + ANCOUNT + NSCOUNT + ARCOUNT
+        self.body = body                # answer section, names are pointers to the question, or the SOA of a negative answer
+        self.recordType = recordType
+        self.recStatus = recStatus
+        self.negative = negative        # None, NXDOMAIN, NODATA or REFUSED
+
+
+class ResponseCache():
+
+    def __init__(self, maxSize=CACHE_SIZE):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0     # bumped by clear, an entry built from the zones of an older generation is not stored
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry, generation=None):
+        '''
+            generation: self.generation read before the zones the entry was built from, the entry is dropped
+            if the zones were swapped since then.
+        '''
+
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        '''
+            Invalidate all the entries, used when a zone is (re)loaded.
+        '''
+
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def getStats(self):
+        return {'size': len(self.entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,238 @@
+#! /usr/bin/env python3
+
+'''
+    Compiled index of the JSON zones: every owner name of every zone, and every name between an owner
+    and its zone apex, is a key of one dict in lowercase wire format (the question name as it is in the
+    packet), so a lookup is one hash on a hit and at most one hash per label of the query name on a miss.
+    The longest suffix that is in the index is the closest encloser: its zone is the longest-match zone
+    and its '*' child, if any, answers the name (RFC 4592). '@' is the apex of the zone.
+    The SOA of every zone is compiled once into the authority record of its negative answers (RFC 2308).
+'''
+
+import glob
+import json
+import os
+import time
+
+from Helper import DNSCodec
+
+ZONE_EXTENSION = '.zone'
+WILDCARD = b'\x01*'     # wire format of the '*' label
+SERIAL_TIME = '{time}'  # SOA serial replaced by the compile time, so every reload gets a new serial
+SOA_FIELDS = ('refresh', 'retry', 'expire', 'minimum')
+RECORD_TYPES = ('A', 'AAAA', 'NS', 'CNAME', 'MX', 'TXT')    # served from the zone files, the other types are skipped
+
+
+class ZoneError(Exception):
+    pass
+
+
+class Zone():
+    '''
+        Zone-wide data of one zone file.
+    '''
+
+    __slots__ = ('origin', 'ttl', 'soa', 'ns', 'path', 'negative')
+
+    def __init__(self, origin, ttl, soa, ns, path):
+        self.origin = origin
+        self.ttl = ttl
+        self.soa = soa
+        self.ns = ns
+        self.path = path
+        self.negative = None    # SOA record of the authority section of NXDOMAIN / NODATA, None without a SOA
+
+
+class ZoneNode():
+    '''
+        One name of the index: the deepest zone holding it and its records by type name ('A', 'AAAA'...),
+        empty for the names that only lead to deeper names (empty non-terminals).
+    '''
+
+    __slots__ = ('zone', 'records')
+
+    def __init__(self, zone):
+        self.zone = zone
+        self.records = {}
+
+
+#
+def getKey(name):
+    '''
+        Index key of a name given as 'a.b.c.' or a list of labels: lowercase wire format with the root label.
+    '''
+
+    return DNSCodec.encodeName(name).lower()
+
+#
+def getOwner(name, origin):
+    '''
+        Absolute owner name of a record name: '@' is the origin, names without a trailing dot are relative to it.
+    '''
+
+    if name in ('@', ''):
+        return origin
+    if name.endswith('.'):
+        return name
+
+    return name + '.' + origin
+
+#
+def getValue(recordType, value, origin):
+    '''
+        The record value with its target name absolute (NS, CNAME, MX), like the owner names.
+    '''
+
+    if recordType == 'NS' or recordType == 'CNAME':
+        return getOwner(value, origin)
+    if recordType == 'MX':
+        preference, exchange = value.split()
+        return '%d %s' % (int(preference), getOwner(exchange, origin))
+
+    return value
+
+#
+def getNegativeRecord(zone):
+    '''
+        The SOA record of the negative answers of zone, its TTL is the negative caching TTL: the lower of the
+        SOA MINIMUM and the zone TTL (RFC 2308). None if the zone has no SOA, raise ZoneError if it is not valid.
+    '''
+
+    soa = zone.soa
+    if not soa:
+        return None
+    try:
+        serial = soa.get('serial', 0)
+        serial = int(time.time()) if serial == SERIAL_TIME else int(serial)
+        fields = [int(soa[field]) for field in SOA_FIELDS]
+        rdata = DNSCodec.encodeSoa(soa['mname'], soa['rname'], serial & 0xffffffff, *fields)
+        ttl = min(zone.ttl, fields[-1]) if zone.ttl else fields[-1]
+        return DNSCodec.encodeRecord(zone.origin, DNSCodec.TYPE_SOA, ttl, rdata)
+    except (KeyError, TypeError, ValueError, AttributeError, DNSCodec.DNSCodecError) as ex:
+        raise ZoneError('%s: bad soa %s: %s' % (zone.path, soa, ex))
+
+
+class ZoneIndex():
+
+    def __init__(self):
+        self.names = {}     # key -> ZoneNode
+        self.zones = {}     # origin -> Zone
+        self.sizes = set()  # byte lengths of the keys, the suffixes of other lengths are not looked up
+        self.skipped = []   # 'path: type' of the records of a type that is not served
+
+    def addZone(self, data, path=''):
+        '''
+            Compile one parsed zone file into the index, raise ZoneError if it is not valid.
+        '''
+
+        try:
+            origin = data['$origin'].lower()
+            ttl = int(data.get('$ttl', 0))
+        except (KeyError, TypeError, ValueError, AttributeError) as ex:
+            raise ZoneError('%s: bad $origin / $ttl: %s' % (path, ex))
+        if not origin.endswith('.'):
+            origin += '.'
+        if origin in self.zones:
+            raise ZoneError('%s: zone %s is already loaded from %s' % (path, origin, self.zones[origin].path))
+        zone = Zone(origin, ttl, data.get('soa'), data.get('ns', []), path)
+        zone.negative = getNegativeRecord(zone)
+        self.zones[origin] = zone
+        apex = getKey(origin)
+        self.getNode(apex, zone)
+
+        for recordType, records in data.items():
+            if recordType not in DNSCodec.TYPE_CODES:    # $origin, $ttl, soa, ns
+                continue
+            if recordType not in RECORD_TYPES:          # e.g. 'SOA' records, the zone SOA is 'soa'
+                self.skipped.append('%s: %s' % (path, recordType))
+                continue
+            rtype = DNSCodec.TYPE_CODES[recordType]
+            for record in records:
+                try:
+                    owner = getOwner(record.get('name', '@').lower(), origin)
+                    compiled = {'ttl': int(record.get('ttl', ttl)), 'value': getValue(recordType, record['value'], origin)}
+                    DNSCodec.encodeRdata(rtype, compiled['value'])
+                    key = getKey(owner)
+                except (KeyError, TypeError, ValueError, AttributeError, OSError, DNSCodec.DNSCodecError) as ex:
+                    raise ZoneError('%s: bad %s record %s: %s' % (path, recordType, record, ex))
+                if not key.endswith(apex):
+                    raise ZoneError('%s: %s is not in the zone %s' % (path, owner, origin))
+                self.getNode(key, zone, len(apex)).records.setdefault(recordType, []).append(compiled)
+
+        return zone
+
+    def getNode(self, key, zone, apexSize=None):
+        '''
+            The node of key, created with the nodes of the names between key and the apex (apexSize bytes long).
+        '''
+
+        node = self.names.get(key)
+        if node is None:
+            node = self.names[key] = ZoneNode(zone)
+            self.sizes.add(len(key))
+        elif len(node.zone.origin) < len(zone.origin):    # a deeper zone takes over its apex and the names under it
+            node.zone = zone
+        position = 0
+        while apexSize is not None and len(key) - position > apexSize:
+            position += key[position] + 1
+            self.getNode(key[position:], zone)
+
+        return node
+
+    def lookup(self, qname):
+        '''
+            (zone, node) of a lowercase wire format name (with its root label): node is the exact or the wildcard
+            match, None if the name does not exist in the zone, zone is None if no zone holds the name.
+        '''
+
+        names = self.names
+        node = names.get(qname)
+        if node is not None:
+            return node.zone, node
+        sizes = self.sizes
+        length = len(qname)
+        position = 0
+        while position < length and qname[position]:  # the suffixes without the first 1, 2... labels, longest first
+            position += qname[position] + 1
+            if length - position in sizes:
+                suffix = qname[position:]
+                encloser = names.get(suffix)
+                if encloser is not None:
+                    return encloser.zone, names.get(WILDCARD + suffix)
+
+        return None, None
+
+    def getStats(self):
+        return {'zones': len(self.zones), 'names': len(self.names), 'skipped': len(self.skipped)}
+
+#
+def getZoneFiles(paths):
+    '''
+        The zone files of paths, a path is a zone file or a directory of *.zone files, missing paths are skipped.
+    '''
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*' + ZONE_EXTENSION))))
+        elif os.path.isfile(path):
+            files.append(path)
+
+    return files
+
+#
+def loadZones(paths):
+    '''
+        Compile the zone files of paths into a new ZoneIndex, raise ZoneError if one of them is not valid.
+    '''
+
+    index = ZoneIndex()
+    for path in getZoneFiles(paths):
+        try:
+            with open(path) as zoneFile:
+                data = json.load(zoneFile)
+        except (OSError, ValueError) as ex:
+            raise ZoneError('%s: %s' % (path, ex))
+        index.addZone(data, path)
+
+    return index
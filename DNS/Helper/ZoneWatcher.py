@@ -0,0 +1,73 @@
+#! /usr/bin/env python3
+
+'''
+    Zone hot reload: a thread polls the mtime and size of the zone files (and the file lists of the zone
+    directories) and calls back once they have stopped changing for one poll, so a file that is still being
+    written is not loaded. The callback compiles and swaps the zones, see DNSFunctions.reloadZones.
+'''
+
+import logging
+import os
+import threading
+import traceback
+
+from Helper import ZoneIndex
+
+POLL_INTERVAL = 1.0     # seconds between two polls of the zone files
+
+
+#
+def getSnapshot(paths):
+    '''
+        {zone file: (mtime ns, size)} of paths, a file that disappears between the listing and the stat is left out.
+    '''
+
+    snapshot = {}
+    for path in ZoneIndex.getZoneFiles(paths):
+        try:
+            stat = os.stat(path)
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+
+    return snapshot
+
+
+class ZoneWatcher():
+    '''
+        Started by every serving process, the thread does not survive a fork.
+    '''
+
+    def __init__(self, paths, onChange, interval=POLL_INTERVAL):
+        '''
+            paths: zone files and directories, onChange(): reload the zones, called from the watcher thread.
+        '''
+
+        self.paths = paths
+        self.onChange = onChange
+        self.interval = interval
+        self.loaded = getSnapshot(paths)    # what the running zones were compiled from
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='ZoneWatcher', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        previous = self.loaded
+        while not self.stopped.wait(self.interval):
+            try:
+                snapshot = getSnapshot(self.paths)
+                if snapshot == previous and snapshot != self.loaded:     # changed, and stable for one poll
+                    self.loaded = snapshot
+                    self.onChange()
+                previous = snapshot
+            except Exception as ex:
+                logging.error('ZoneWatcher - run: \n%s ' % traceback.format_exc())
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(self.interval + 1)
+            self.thread = None
@@ -3,6 +3,9 @@
 import argparse
 import dnsServer
 from Helper.Helper import ADVERSARY_TASK_MODE
+from Helper import RateLimiter
+from Helper import ZoneWatcher
+from Helper import ConsoleRenderer
 import traceback
 
 def parserArgs():
@@ -16,14 +19,45 @@ def parserArgs():
     group.add_argument('-l', action='store_true', help='Run on the local IP')
     parser.add_argument('-lc','--rcase', action = 'store_true', help='For randomizing lettercase in the dns reply')
     parser.add_argument('-v','--adversary', action = 'store_true', help="Activate ADVERSARY mode, you can specify '-t' option")
-    parser.add_argument('-t','--task',nargs='?', choices=set_Adv_Required, default='rboth', const='rboth',
+    parser.add_argument('-t','--task',nargs='?', choices=set_Adv_Required, default='both', const='both',
                         help='ADVERSARY mode task: rport: randomize Port Number || ' +
-                             'rid: randomize Request Id || rboth: randomise both' +
-                             ', default: rboth')
+                             'rid: randomize Request Id || both: randomise both (joint request ID x port number search)' +
+                             ', default: both')
     parser.add_argument('-p', '--port', type=int, default=defaultPort, help=('Which port the DNS is going to use, default: %d' % defaultPort))
     parser.add_argument('-dont', action='store_true', help='Activate  the DNS to not respond to particular requests if they contain specific words, '
                                                          'this is used to see how many queries the DNS resolver will issue per domain name when '
                                                          'there is no response.')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Number of worker processes sharing the port with SO_REUSEPORT, default: 1')
+    parser.add_argument('-e', '--engine', choices=dnsServer.ENGINES, default=dnsServer.ENGINE_ASYNCIO,
+                        help='Serving engine: asyncio || zerocopy: recvfrom_into with a buffer pool || mmsg: recvmmsg/sendmmsg batches, default: asyncio')
+    parser.add_argument('-db', '--database', default=None,
+                        help='Also store every request in this SQLite database (WAL mode, indexed by SrcIP/SrcPort/RequestId), e.g. DB/Requests.db')
+    parser.add_argument('-bl', '--binaryLog', default=None,
+                        help='Also write every request as a fixed-width record into <binaryLog>_<date>_<pid>.qlog, e.g. Logs/queries')
+    parser.add_argument('-m', '--metrics', default=None,
+                        help="Serve Prometheus metrics at /metrics on 'host:port' (e.g. 127.0.0.1:9153) or 'unix:/path/to/socket'")
+    parser.add_argument('-lp', '--loggerProcess', action='store_true',
+                        help='Push the requests into shared-memory rings, a separate logger process formats, writes and prints them')
+    parser.add_argument('-rl', '--rateLimit', default=None,
+                        help="Response-rate limit in queries/sec per source IP, per /24 and per qname: 'ip[,prefix[,qname]]' "
+                             "(0 or missing: no limit), e.g. 20,100 or 20,100,50. Over-limit queries are dropped, not logged")
+    parser.add_argument('-rs', '--rateLimitSlip', type=int, default=RateLimiter.SLIP,
+                        help='Answer every N-th rate limited query with a TC=1 stub instead of dropping it, 0: drop them all, default: %d' % RateLimiter.SLIP)
+    parser.add_argument('-fr', '--forgeRate', type=int, default=0,
+                        help='ADVERSARY mode: cap every forging run at this many packets/sec, default: 0 (as fast as possible)')
+    parser.add_argument('-sw', '--sweepWorkers', type=int, default=0,
+                        help="ADVERSARY mode 'rport': sweep the whole 1-65535 port range with this many worker processes, "
+                             "each one on a disjoint range, default: 0 (one forging run of random ports)")
+    parser.add_argument('-zw', '--zoneWatch', type=float, default=ZoneWatcher.POLL_INTERVAL,
+                        help='Reload the zones without a restart when their files change, polled every N seconds, '
+                             '0: never, default: %.0f' % ZoneWatcher.POLL_INTERVAL)
+    parser.add_argument('-tcp', '--tcp', action='store_true',
+                        help='Also serve DNS over TCP on the same port (not in ADVERSARY mode), open TCP/<port> in the firewall too')
+    parser.add_argument('-ep', '--ednsPayload', type=int, default=1232,
+                        help='Largest UDP answer to an EDNS0 query (capped by the size it advertises), 0: ignore EDNS0, default: 1232')
+    parser.add_argument('-cl', '--consoleLines', type=int, default=ConsoleRenderer.LINES_PER_SECOND,
+                        help='Query rows printed per second next to a once-per-second summary, -1: print every row as it is logged, default: %d'
+                             % ConsoleRenderer.LINES_PER_SECOND)
     return parser.parse_args()
 
 
@@ -36,5 +70,5 @@ if __name__ == '__main__':
         print(" ........... Testing .........")
         print(ex)
         print('runDns - MAIN: \n%s ' % traceback.format_exc())
-        setArgs = argparse.Namespace(l=True, adversary=False, port=53, rcase=False, s=False, task='rboth', dont=True)
+        setArgs = argparse.Namespace(l=True, adversary=False, port=53, rcase=False, s=False, task='both', dont=True, workers=1, engine='asyncio', database=None, binaryLog=None, loggerProcess=False, metrics=None, rateLimit=None, rateLimitSlip=2, forgeRate=0, sweepWorkers=0, zoneWatch=1.0, tcp=False, ednsPayload=1232, consoleLines=ConsoleRenderer.LINES_PER_SECOND)
         dnsServer.run(setArgs)
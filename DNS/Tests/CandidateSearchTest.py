@@ -0,0 +1,63 @@
+#! /usr/bin/env python3
+
+'''
+    Adversary candidates: the keyed Feistel permutation is a bijection of [0, size) for any size, the random
+    request IDs / ports never repeat, and the joint ID x port search never returns a candidate twice, most
+    likely blocks first.
+    Run from the DNS folder: python -m unittest Tests/CandidateSearchTest.py
+'''
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import CandidateSearch
+
+CANDIDATES = 20000
+
+
+class CandidateSearchTest(unittest.TestCase):
+
+    def testPermutation(self):
+        for size in (1, 2, 3, 1000, 1024, 4097, 65535):
+            permutation = CandidateSearch.Permutation(size, key=size)
+            self.assertEqual(sorted(permutation.get(index) for index in range(size)), list(range(size)))
+
+    def testKeys(self):
+        first = [CandidateSearch.Permutation(65535, key=1).get(index) for index in range(100)]
+        self.assertEqual(first, [CandidateSearch.Permutation(65535, key=1).get(index) for index in range(100)])
+        self.assertNotEqual(first, [CandidateSearch.Permutation(65535, key=2).get(index) for index in range(100)])
+
+    def testDistinct(self):
+        values = list(CandidateSearch.getDistinct(70000))
+        self.assertEqual(len(values), 65535)
+        self.assertEqual(sorted(values), list(range(1, 65536)))
+        self.assertEqual(sorted(CandidateSearch.getDistinct(10, 100, 109)), list(range(100, 110)))
+
+    def testJointSearch(self):
+        distribution = CandidateSearch.Distribution()
+        for requestId in range(100):
+            distribution.add(33000 + requestId, 5000 + requestId)  # one port bucket and one ID bucket
+        search = CandidateSearch.JointSearch(distribution, key=1)
+        candidates = []
+        for run in range(3):    # resumed where the previous trigger stopped
+            candidates.extend(search.getCandidates(CANDIDATES))
+        self.assertEqual(len(set(candidates)), len(candidates))
+        self.assertEqual(set((candidate & 0xffff) >> CandidateSearch.BUCKET_BITS for candidate in candidates), {33000 >> CandidateSearch.BUCKET_BITS})
+        self.assertEqual(set((candidate >> 16) >> CandidateSearch.BUCKET_BITS for candidate in candidates), {5000 >> CandidateSearch.BUCKET_BITS})
+        tried, mass = search.getCoverage()
+        self.assertAlmostEqual(tried, 100.0 * len(candidates) / CandidateSearch.SPACE_SIZE)
+        self.assertGreater(mass, 0)
+
+    def testPortZero(self):
+        search = CandidateSearch.JointSearch(CandidateSearch.Distribution(), key=1)
+        search.block = 0    # port bucket 0 holds port 0, never a candidate
+        candidates = list(search.getCandidates(CANDIDATES))
+        self.assertEqual(len(set(candidates)), len(candidates))
+        self.assertNotIn(0, set(candidate & 0xffff for candidate in candidates))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+'''
+    Queries whose question name ends with a compression pointer are answered like the same name
+    uncompressed, and the zone index returns no zone for a key it can not walk.
+    Run from the DNS folder: python -m unittest Tests/CompressedNameTest.py
+'''
+
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import ZoneIndex
+
+ADDR = ('127.0.0.1', 5353)
+ZONE_NAME = b'\x0cdnstestsuite\x05space\x00'
+# 'www' + a pointer to the zone name written after the question (offset 22)
+QUERY_COMPRESSED = DNSCodec.packHeader(0x1234, 0x0100) + b'\x03www\xc0\x16' + DNSCodec.QUESTION_TAIL.pack(DNSCodec.TYPE_A, DNSCodec.CLASS_IN) + ZONE_NAME
+QUERY_PLAIN = DNSCodec.buildQuery('www.dnstestsuite.space', DNSCodec.TYPE_A, 0x1234)
+
+
+def noLogging(function, *args):
+    pass
+
+
+class CompressedNameTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        try:
+            DNSFunctions.loadRealZone(['Zones/RealZone.zone'])
+        finally:
+            os.chdir(cwd)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def testAnsweredLikeUncompressed(self):
+        compressed, allowResponse = DNSFunctions.getResponse(QUERY_COMPRESSED, ADDR, scheduleLogging=noLogging)
+        plain = DNSFunctions.getResponse(QUERY_PLAIN, ADDR, scheduleLogging=noLogging)[0]
+        self.assertTrue(allowResponse)
+        self.assertEqual(compressed, plain)
+        self.assertEqual(len(DNSCodec.parseMessage(compressed).answers), 1)
+
+    def testPointerPastTheEnd(self):
+        query = DNSCodec.packHeader(0x1234, 0x0100) + b'\x03www\xc0\x7f' + DNSCodec.QUESTION_TAIL.pack(DNSCodec.TYPE_A, DNSCodec.CLASS_IN)
+        with self.assertRaises(DNSCodec.DNSCodecError):
+            DNSFunctions.getResponse(query, ADDR, scheduleLogging=noLogging)
+
+    def testLookupOfBadKey(self):
+        self.assertEqual(DNSFunctions.ZONE_INDEX.lookup(b'\x03www\xc0\x16'), (None, None))
+        self.assertEqual(ZoneIndex.ZoneIndex().lookup(b'\x05abc'), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+'''
+    Console renderer: the queries added by several serving threads while the printing thread renders are
+    all counted once in the summaries, and the rows printed stay within the per-second budget.
+    Run from the DNS folder: python -m unittest Tests/ConsoleRendererTest.py
+'''
+
+import io
+import os
+import re
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import ConsoleRenderer
+from Helper.Helper import MSG_TYPES
+
+THREADS = 3
+QUERIES = 20000
+LINES_PER_SECOND = 5
+
+
+class ConsoleRendererTest(unittest.TestCase):
+
+    def testConcurrentAdd(self):
+        stream = io.StringIO()
+        renderer = ConsoleRenderer.ConsoleRenderer(LINES_PER_SECOND, interval=3600, stream=stream)
+        renderer.add('first', MSG_TYPES.RESULT, '10.0.0.1', 'first')     # starts the printing thread of the process
+        done = threading.Event()
+
+        def serve(index):
+            for query in range(QUERIES):
+                renderer.add('row', MSG_TYPES.RESULT, '10.0.0.%d' % (index + 1), 'check_%d.Example.Space' % query)
+
+        def render():
+            while not done.is_set():
+                renderer.render()
+
+        renderThread = threading.Thread(target=render)
+        renderThread.start()
+        threads = [threading.Thread(target=serve, args=(index,)) for index in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        renderThread.join()
+        renderer.render()
+        renderer.stopped.set()
+
+        output = stream.getvalue()
+        summaries = [line for line in output.splitlines() if 'queries/sec' in line]
+        counted = sum(int(count) for line in summaries for count in re.findall(r'10\.0\.0\.\d+ (\d+)', line))
+        checks = sum(int(count) for line in summaries for count in re.findall(r'\| check: (\d+)', line))
+        self.assertEqual(counted, THREADS * QUERIES + 1)
+        self.assertEqual(checks, THREADS * QUERIES)
+        rows = len(output.splitlines()) - len(summaries)
+        self.assertLessEqual(rows, LINES_PER_SECOND * len(summaries))
+
+
+if __name__ == '__main__':
+    unittest.main()
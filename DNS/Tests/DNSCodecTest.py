@@ -0,0 +1,81 @@
+#! /usr/bin/env python3
+
+'''
+    Wire format codec: messages, names and addresses survive an encode / decode round trip, the compressed
+    names are followed, and the packets that would make the decoder loop or read past the end are rejected.
+    Run from the DNS folder: python -m unittest Tests/DNSCodecTest.py
+'''
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+
+QUESTION_TAIL = DNSCodec.QUESTION_TAIL.pack(DNSCodec.TYPE_A, DNSCodec.CLASS_IN)
+
+
+class DNSCodecTest(unittest.TestCase):
+
+    def testMessageRoundTrip(self):
+        message = DNSCodec.DNSMessage(0xbeef, 0x8400)
+        message.questions.append(DNSCodec.DNSQuestion(['www', 'example', 'test'], DNSCodec.TYPE_A, DNSCodec.CLASS_IN))
+        message.answers.append(DNSCodec.DNSRecord(['www', 'example', 'test'], DNSCodec.TYPE_A, DNSCodec.CLASS_IN, 300,
+                                                  DNSCodec.encodeAddress(DNSCodec.TYPE_A, '192.0.2.1')))
+        message.authority.append(DNSCodec.DNSRecord(['example', 'test'], DNSCodec.TYPE_NS, DNSCodec.CLASS_IN, 3600,
+                                                    DNSCodec.encodeName('ns.example.test')))
+        message.additional.append(DNSCodec.DNSRecord(['ns', 'example', 'test'], DNSCodec.TYPE_AAAA, DNSCodec.CLASS_IN, 60,
+                                                     DNSCodec.encodeAddress(DNSCodec.TYPE_AAAA, '2001:db8::1')))
+        packet = DNSCodec.encodeMessage(message)
+        parsed = DNSCodec.parseMessage(packet)
+
+        self.assertEqual((parsed.id, parsed.flags), (0xbeef, 0x8400))
+        self.assertEqual(parsed.questions[0].labels, ['www', 'example', 'test'])
+        self.assertEqual(DNSCodec.decodeAddress(DNSCodec.TYPE_A, bytes(parsed.answers[0].rdata)), '192.0.2.1')
+        self.assertEqual(DNSCodec.decodeAddress(DNSCodec.TYPE_AAAA, bytes(parsed.additional[0].rdata)), '2001:db8::1')
+        self.assertEqual(DNSCodec.parseName(bytes(parsed.authority[0].rdata), 0)[0], ['ns', 'example', 'test'])
+        self.assertEqual(DNSCodec.encodeMessage(parsed), packet)
+
+    def testQuery(self):
+        query = DNSCodec.buildQuery('www.example.test', DNSCodec.TYPE_AAAA, 7, payloadSize=1232)
+        parsed = DNSCodec.parseMessage(query)
+        self.assertEqual((parsed.id, parsed.questions[0].qtype), (7, DNSCodec.TYPE_AAAA))
+        questionEnd = DNSCodec.skipQuestion(query, DNSCodec.HEADER_SIZE)
+        self.assertEqual(DNSCodec.parseOpt(query, questionEnd, 1), (1232, DNSCodec.EDNS_VERSION, 0))
+
+    def testCompressedName(self):
+        packet = DNSCodec.packHeader(1, 0) + b'\x07example\x04test\x00' + QUESTION_TAIL + b'\x03www\xc0\x0c'
+        offset = DNSCodec.HEADER_SIZE + len(DNSCodec.encodeName('example.test')) + len(QUESTION_TAIL)
+        self.assertEqual(DNSCodec.parseName(packet, offset), (['www', 'example', 'test'], len(packet)))
+        self.assertEqual(DNSCodec.skipName(packet, offset), len(packet))
+
+    def testCompressionLoop(self):
+        for name in (b'\xc0\x0c', b'\x01a\xc0\x0c', b'\x01a\xc0\x0e\x01b\xc0\x0c'):    # a pointer to itself, to its own label...
+            packet = DNSCodec.packHeader(1, 0) + name + QUESTION_TAIL
+            with self.assertRaises(DNSCodec.DNSCodecError):
+                DNSCodec.parseMessage(packet)
+
+    def testTooManyPointers(self):
+        # a chain of MAX_POINTERS + 1 distinct pointers, each to the next one
+        chain = b''.join(bytes([0xc0, DNSCodec.HEADER_SIZE + 2 * (index + 1)]) for index in range(DNSCodec.MAX_POINTERS + 1))
+        packet = DNSCodec.packHeader(1, 0) + chain + b'\x00'
+        with self.assertRaises(DNSCodec.DNSCodecError):
+            DNSCodec.parseName(packet, DNSCodec.HEADER_SIZE)
+
+    def testTruncatedPackets(self):
+        packet = DNSCodec.buildQuery('www.example.test', DNSCodec.TYPE_A, 1)
+        for size in (DNSCodec.HEADER_SIZE - 1, DNSCodec.HEADER_SIZE + 3, len(packet) - 1):
+            with self.assertRaises(DNSCodec.DNSCodecError):
+                DNSCodec.parseMessage(packet[:size])
+        with self.assertRaises(DNSCodec.DNSCodecError):
+            DNSCodec.parseName(DNSCodec.packHeader(1, 0) + b'\x40abc', DNSCodec.HEADER_SIZE)   # reserved label type
+
+    def testLabelTooLong(self):
+        with self.assertRaises(DNSCodec.DNSCodecError):
+            DNSCodec.encodeName('a' * 64 + '.test')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#! /usr/bin/env python3
+
+'''
+    DNS over TCP: length-prefixed messages, split over several segments or pipelined in one, are answered
+    in order on the same connection, without the UDP size limit; a malformed query is skipped and an idle
+    connection is closed.
+    Run from the DNS folder: python -m unittest Tests/DNSTCPTest.py
+'''
+
+import argparse
+import logging
+import os
+import socket
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import DNSTCP
+from Helper import DNSWorkers
+from Helper import ZoneIndex
+
+TIMEOUT = 5
+IDLE_TIMEOUT = 0.5
+LONG_TEXT = 'x' * 1000      # a TXT answer over the UDP size limit
+ZONE = {'$origin': 'example.test.', '$ttl': 30,
+        'A': [{'name': 'www', 'value': '192.0.2.1'}],
+        'TXT': [{'name': 'long', 'value': LONG_TEXT}]}
+
+
+def noLogging(function, *args):
+    pass
+
+
+class DNSTCPTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.zoneIndex = DNSFunctions.ZONE_INDEX
+        DNSFunctions.ZONE_INDEX = ZoneIndex.ZoneIndex()
+        DNSFunctions.ZONE_INDEX.addZone(ZONE, 'example.zone')
+        DNSFunctions.RESPONSE_CACHE.clear()
+        argv = argparse.Namespace(rcase=False, dont=False)
+        self.server = DNSTCP.TCPServer(argv, idleTimeout=IDLE_TIMEOUT, scheduleLogging=noLogging)
+        sock = DNSWorkers.bindTCPSocket('127.0.0.1', 0)
+        self.address = sock.getsockname()
+        self.server.start(sock)
+        self.client = socket.create_connection(self.address, TIMEOUT)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        DNSFunctions.ZONE_INDEX = self.zoneIndex
+        DNSFunctions.RESPONSE_CACHE.clear()
+        logging.disable(logging.NOTSET)
+
+    def receive(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.client.recv(size - len(data))
+            if not chunk:
+                raise EOFError('Connection closed after %d bytes' % len(data))
+            data += chunk
+
+        return data
+
+    def receiveMessage(self):
+        return DNSCodec.parseMessage(self.receive(DNSTCP.LENGTH.unpack(self.receive(DNSTCP.LENGTH.size))[0]))
+
+    def testPipelined(self):
+        queries = [DNSCodec.buildQuery(name, qtype, transactionId) for transactionId, (name, qtype) in
+                   enumerate([('www.example.test', DNSCodec.TYPE_A), ('long.example.test', DNSCodec.TYPE_TXT),
+                              ('nope.example.test', DNSCodec.TYPE_A)] * 3)]
+        self.client.sendall(b''.join(DNSTCP.LENGTH.pack(len(query)) + query for query in queries))
+        answers = [self.receiveMessage() for query in queries]
+
+        self.assertEqual([answer.id for answer in answers], list(range(len(queries))))
+        self.assertEqual([len(answer.answers) for answer in answers[:3]], [1, 1, 0])
+        self.assertFalse(answers[1].flags & 0x0200)     # not truncated over TCP
+        self.assertEqual(len(answers[1].answers[0].rdata), len(LONG_TEXT) + 4)   # four character-strings
+        self.assertEqual(self.server.getStats()['queries'], len(queries))
+
+    def testSplitMessage(self):
+        query = DNSCodec.buildQuery('www.example.test', DNSCodec.TYPE_A, 7)
+        message = DNSTCP.LENGTH.pack(len(query)) + query
+        for piece in (message[:1], message[1:5], message[5:]):
+            self.client.sendall(piece)
+            time.sleep(0.05)
+        answer = self.receiveMessage()
+        self.assertEqual((answer.id, len(answer.answers)), (7, 1))
+
+    def testMalformed(self):
+        bad = DNSCodec.packHeader(1, 0x0100) + b'\x03www\xc0'  # the question runs past the end
+        query = DNSCodec.buildQuery('www.example.test', DNSCodec.TYPE_A, 2)
+        self.client.sendall(DNSTCP.LENGTH.pack(len(bad)) + bad + DNSTCP.LENGTH.pack(len(query)) + query)
+        self.assertEqual(self.receiveMessage().id, 2)
+        self.assertEqual(self.server.getStats()['malformed'], 1)
+
+    def testIdleClose(self):
+        self.client.settimeout(IDLE_TIMEOUT * 10)
+        self.assertEqual(self.client.recv(1), b'')
+        self.assertEqual(self.server.getStats()['idleClosed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
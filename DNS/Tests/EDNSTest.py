@@ -0,0 +1,94 @@
+#! /usr/bin/env python3
+
+'''
+    EDNS0 (RFC 6891): an EDNS0 query gets the OPT record back and answers up to its payload size (capped by
+    EDNS_PAYLOAD_SIZE), a longer answer is truncated (TC=1) and keeps the OPT record, and an unknown EDNS
+    version is answered BADVERS.
+    Run from the DNS folder: python -m unittest Tests/EDNSTest.py
+'''
+
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import ZoneIndex
+
+ADDR = ('127.0.0.1', 5353)
+TC = 0x0200
+ZONE = {'$origin': 'example.test.', '$ttl': 30,
+        'TXT': [{'name': 'medium', 'value': 'm' * 700},     # over 512 bytes, under 1232
+                {'name': 'long', 'value': 'l' * 700}, {'name': 'long', 'value': 'L' * 700}]}     # over 1232 bytes
+
+
+def noLogging(function, *args):
+    pass
+
+
+class EDNSTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.zoneIndex, self.payloadSize = DNSFunctions.ZONE_INDEX, DNSFunctions.EDNS_PAYLOAD_SIZE
+        DNSFunctions.ZONE_INDEX = ZoneIndex.ZoneIndex()
+        DNSFunctions.ZONE_INDEX.addZone(ZONE, 'example.zone')
+        DNSFunctions.RESPONSE_CACHE.clear()
+
+    def tearDown(self):
+        DNSFunctions.setEdnsPayloadSize(self.payloadSize)
+        DNSFunctions.ZONE_INDEX = self.zoneIndex
+        DNSFunctions.RESPONSE_CACHE.clear()
+        logging.disable(logging.NOTSET)
+
+    def ask(self, query):
+        response, allowResponse = DNSFunctions.getResponse(query, ADDR, scheduleLogging=noLogging)
+        self.assertTrue(allowResponse)
+
+        return response, DNSCodec.parseMessage(response)
+
+    def checkOpt(self, message, payloadSize=1232, extendedRcode=0):
+        opt, = message.additional
+        self.assertEqual((opt.labels, opt.rtype, opt.rclass, opt.ttl >> 24), ([], DNSCodec.TYPE_OPT, payloadSize, extendedRcode))
+
+    def testOptEchoed(self):
+        response, message = self.ask(DNSCodec.buildQuery('medium.example.test', DNSCodec.TYPE_TXT, 1, payloadSize=4096))
+        self.assertFalse(message.flags & TC)
+        self.assertEqual(len(message.answers), 1)
+        self.checkOpt(message)      # the payload size of the server, not the query's
+
+    def testWithoutEdns(self):
+        response, message = self.ask(DNSCodec.buildQuery('medium.example.test', DNSCodec.TYPE_TXT, 1))
+        self.assertTrue(message.flags & TC)
+        self.assertEqual((len(message.answers), len(message.additional)), (0, 0))
+        self.assertLessEqual(len(response), DNSFunctions.UDP_PAYLOAD_SIZE)
+
+    def testTruncatedWithOpt(self):
+        for payloadSize in (512, 4096):     # the answer is over the query's size, then over the server's cap
+            name = 'medium.example.test' if payloadSize == 512 else 'long.example.test'
+            response, message = self.ask(DNSCodec.buildQuery(name, DNSCodec.TYPE_TXT, 1, payloadSize=payloadSize))
+            self.assertTrue(message.flags & TC)
+            self.assertEqual(len(message.answers), 0)
+            self.assertEqual(message.questions[0].labels, name.split('.'))
+            self.checkOpt(message)
+
+    def testBadVersion(self):
+        query = (DNSCodec.packHeader(1, 0x0100, arcount=1) + DNSCodec.encodeQuestion('medium.example.test', DNSCodec.TYPE_TXT) +
+                 DNSCodec.encodeOpt(1232, version=1))
+        response, message = self.ask(query)
+        self.assertEqual(message.flags & 0xf, 0)
+        self.assertEqual(len(message.answers), 0)
+        self.checkOpt(message, extendedRcode=DNSCodec.RCODE_BADVERS >> 4)
+
+    def testEdnsDisabled(self):
+        DNSFunctions.setEdnsPayloadSize(0)
+        response, message = self.ask(DNSCodec.buildQuery('medium.example.test', DNSCodec.TYPE_TXT, 1, payloadSize=4096))
+        self.assertTrue(message.flags & TC)
+        self.assertEqual(len(message.additional), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
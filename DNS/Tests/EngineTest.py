@@ -0,0 +1,117 @@
+#! /usr/bin/env python3
+
+'''
+    Serving engines: a worker of every engine (asyncio, zerocopy, mmsg) answers a burst of queries with the
+    transaction IDs and the records of the zone, refuses the names of no zone and keeps serving after a
+    malformed datagram.
+    Run from the DNS folder: python -m unittest Tests/EngineTest.py
+'''
+
+import argparse
+import logging
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DNSServer
+from Helper import ConsoleRenderer
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import DNSWorkers
+
+DNS_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BURST = 200
+TIMEOUT = 2
+ZONE_ADDRESS = '52.20.33.59'    # the wildcard of Zones/RealZone.zone
+
+
+#
+def getArgv(engine):
+    return argparse.Namespace(l=True, adversary=False, port=0, rcase=False, s=False, task='rport', dont=False, workers=1, engine=engine,
+                              database=None, binaryLog=None, loggerProcess=False, metrics=None, rateLimit=None, rateLimitSlip=2,
+                              forgeRate=0, sweepWorkers=0, zoneWatch=0, tcp=False, ednsPayload=1232, consoleLines=0)
+
+
+class EngineTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp(prefix='dns-engine-')
+        os.chdir(self.folder)
+        DNSFunctions.makeDirectories()
+        DNSFunctions.loadRealZone([os.path.join(DNS_FOLDER, 'Zones', 'RealZone.zone')])
+        DNSFunctions.enableConsoleRenderer(ConsoleRenderer.ConsoleRenderer(0, stream=open(os.devnull, 'w')))
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.client.settimeout(TIMEOUT)
+        self.supervisor = None
+
+    def tearDown(self):
+        self.client.close()
+        if self.supervisor is not None:
+            self.supervisor.stop()
+        DNSFunctions.CONSOLE_RENDERER = None
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder, ignore_errors=True)
+        logging.disable(logging.NOTSET)
+
+    def startWorker(self, engine):
+        '''
+            The address of one worker of engine, once it answers.
+        '''
+
+        sock = DNSWorkers.bindSocket('127.0.0.1', 0)
+        port = sock.getsockname()[1]
+        sock.close()
+        self.supervisor = DNSWorkers.WorkerSupervisor(1, '127.0.0.1', port)
+        self.supervisor.startWorker(0, DNSServer.serve, getArgv(engine))
+        address = ('127.0.0.1', port)
+        query = DNSCodec.buildQuery('www.dnstestsuite.space', DNSCodec.TYPE_A, 0)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            self.client.sendto(query, address)
+            try:
+                self.client.settimeout(0.2)
+                self.client.recvfrom(DNSFunctions.OUTPUT_BUFFER_SIZE)
+                self.client.settimeout(TIMEOUT)
+                return address
+            except socket.timeout:
+                pass
+        self.fail('The %s worker does not answer' % engine)
+
+    def checkEngine(self, engine):
+        address = self.startWorker(engine)
+        for transactionId in range(1, BURST + 1):    # sent before any answer is read, the batching engines take several per call
+            self.client.sendto(DNSCodec.buildQuery('%d.dnstestsuite.space' % transactionId, DNSCodec.TYPE_A, transactionId), address)
+        answers = {}
+        for transactionId in range(BURST):
+            message = DNSCodec.parseMessage(self.client.recvfrom(DNSFunctions.OUTPUT_BUFFER_SIZE)[0])
+            answers[message.id] = message
+        self.assertEqual(sorted(answers), list(range(1, BURST + 1)))
+        for transactionId, message in answers.items():
+            self.assertEqual(message.questions[0].labels, [str(transactionId), 'dnstestsuite', 'space'])
+            self.assertEqual(DNSCodec.decodeAddress(DNSCodec.TYPE_A, bytes(message.answers[0].rdata)), ZONE_ADDRESS)
+
+        self.client.sendto(b'\x12\x34garbage', address)
+        self.client.sendto(DNSCodec.buildQuery('nope.example.com', DNSCodec.TYPE_A, 0x4321), address)
+        message = DNSCodec.parseMessage(self.client.recvfrom(DNSFunctions.OUTPUT_BUFFER_SIZE)[0])
+        self.assertEqual((message.id, message.flags & 0xf), (0x4321, DNSCodec.RCODE_REFUSED))
+
+    def testAsyncio(self):
+        self.checkEngine(DNSServer.ENGINE_ASYNCIO)
+
+    def testZeroCopy(self):
+        self.checkEngine(DNSServer.ENGINE_ZERO_COPY)
+
+    def testBatched(self):
+        self.checkEngine(DNSServer.ENGINE_BATCHED)
+
+
+if __name__ == '__main__':
+    unittest.main()
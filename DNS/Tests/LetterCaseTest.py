@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+
+'''
+    0x20 encoding: only the domain and zone name are randomised, the '<id>_check_<ip>' labels keep their case,
+    and the name sent in the answer is the logged ModifiedDomain.
+    Run from the DNS folder: python -m unittest Tests/LetterCaseTest.py
+'''
+
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import LetterCase
+
+ADDR = ('127.0.0.1', 5353)
+CHECK_NAME = '8213_check_abc.dnstestsuite.space'
+DRAWS = 64
+
+
+class LetterCaseTest(unittest.TestCase):
+
+    def testScope(self):
+        self.assertEqual(LetterCase.getScopeSize(b'8213_check_abc.dnstestsuite.space'), len('dnstestsuite.space'))
+        self.assertEqual(LetterCase.getScopeSize(b'8213_check_abc.dnstestsuite.space.'), len('dnstestsuite.space.'))
+        self.assertEqual(LetterCase.getScopeSize(b'space'), len('space'))
+        self.assertEqual(LetterCase.getScopeSize(b'a.b.c', None), len('a.b.c'))
+
+    def testOnlyTheZoneName(self):
+        name = CHECK_NAME.encode('latin-1')
+        swapped = set()
+        for draw in range(DRAWS):
+            randomized, flips = LetterCase.randomizeCase(name)
+            self.assertEqual(randomized[:len('8213_check_abc.')], b'8213_check_abc.')
+            self.assertEqual(randomized.lower(), name)
+            swapped.add(randomized)
+        self.assertGreater(len(swapped), 1)
+
+    def testWholeName(self):
+        name = CHECK_NAME.encode('latin-1')
+        prefixes = set(LetterCase.randomizeCase(name, None)[0][:len('8213_check_abc')] for draw in range(DRAWS))
+        self.assertGreater(len(prefixes), 1)
+
+    def testDomainParts(self):
+        for draw in range(DRAWS):
+            parts = DNSFunctions.getLetterCaseSwapped(['8213_check_abc', 'dnstestsuite', 'space', ''])
+            self.assertEqual(parts[0], '8213_check_abc')
+            self.assertEqual([part.lower() for part in parts], ['8213_check_abc', 'dnstestsuite', 'space', ''])
+
+    def testSentAsLogged(self):
+        logged = []
+        logging.disable(logging.CRITICAL)
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        try:
+            DNSFunctions.loadRealZone(['Zones/RealZone.zone'])
+        finally:
+            os.chdir(cwd)
+            logging.disable(logging.NOTSET)
+        for draw in range(DRAWS):
+            query = DNSCodec.buildQuery(CHECK_NAME, DNSCodec.TYPE_A, draw)
+            response = DNSFunctions.getResponse(query, ADDR, case_sensitive=True,
+                                                scheduleLogging=lambda function, *args: logged.append(args[-1]))[0]
+            sent = '.'.join(DNSCodec.parseMessage(response).questions[0].labels)
+            self.assertEqual(sent, logged[-1])
+            self.assertTrue(sent.startswith('8213_check_abc.'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#! /usr/bin/env python3
+
+'''
+    The threads of one process (serving loop, DNSTCP, logging, port sweep collector) update the same
+    Metrics row without losing counts.
+    Run from the DNS folder: python -m unittest Tests/MetricsTest.py
+'''
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import Metrics
+
+THREADS = 4
+COUNTS = 20000
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.switchInterval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)     # switch threads as often as possible, between the read and the write of a slot
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switchInterval)
+
+    def testConcurrentCounts(self):
+        metrics = Metrics.Metrics(workers=2)
+        metrics.setWorker(1)
+
+        def count():
+            for index in range(COUNTS):
+                metrics.countQuery('A', 'normal', True, False, 1000)
+                metrics.countForged(2)
+                metrics.countLogged()
+
+        threads = [threading.Thread(target=count) for index in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(metrics.getTotal(Metrics.SENT), THREADS * COUNTS)
+        self.assertEqual(metrics.getTotal(Metrics.LOG_SCHEDULED), THREADS * COUNTS)
+        self.assertEqual(metrics.getTotal(Metrics.LOG_DONE), THREADS * COUNTS)
+        self.assertEqual(metrics.getTotal(Metrics.FORGED), 2 * THREADS * COUNTS)
+        self.assertEqual(metrics.getTotal(Metrics.LATENCY_SUM), 1000 * THREADS * COUNTS)
+        self.assertEqual(metrics.values[Metrics.SENT], 0)    # worker 0's row is untouched
+
+    def testRenderTotals(self):
+        metrics = Metrics.Metrics(workers=2)
+        for index in range(2):
+            metrics.setWorker(index)
+            metrics.countQuery('AAAA', 'check', True, True, 5000)
+            metrics.countNegative(True)
+        text = metrics.render()
+        self.assertIn('dns_queries_total{qtype="AAAA",mode="check"} 2', text)
+        self.assertIn('dns_zone_misses_total 2', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
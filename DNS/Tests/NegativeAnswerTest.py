@@ -0,0 +1,97 @@
+#! /usr/bin/env python3
+
+'''
+    Answers without the records of the question: NXDOMAIN and NODATA carry the SOA of the zone in the authority
+    section (RFC 2308), a name in none of the zones is REFUSED, and ANY returns every record of the name.
+    Run from the DNS folder: python -m unittest Tests/NegativeAnswerTest.py
+'''
+
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import Metrics
+from Helper import ZoneIndex
+
+ADDR = ('127.0.0.1', 5353)
+ZONE = {'$origin': 'example.test.', '$ttl': 30,
+        'soa': {'mname': 'ns.example.test.', 'rname': 'admin.example.test.', 'serial': 1,
+                'refresh': 30, 'retry': 600, 'expire': 60480, 'minimum': 60},
+        'A': [{'name': '@', 'value': '192.0.2.1'}, {'name': 'a.b', 'value': '192.0.2.3'}],
+        'AAAA': [{'name': '@', 'value': '2001:db8::1'}, {'name': 'v6', 'value': '2001:db8::6'}],
+        'MX': [{'name': '@', 'value': '10 mail'}],
+        'TXT': [{'name': '@', 'value': 'hello'}]}
+
+
+def noLogging(function, *args):
+    pass
+
+
+class NegativeAnswerTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.zoneIndex, self.metrics = DNSFunctions.ZONE_INDEX, DNSFunctions.METRICS
+        DNSFunctions.ZONE_INDEX = ZoneIndex.ZoneIndex()
+        DNSFunctions.ZONE_INDEX.addZone(ZONE, 'example.zone')
+        DNSFunctions.RESPONSE_CACHE.clear()
+        DNSFunctions.enableMetrics(Metrics.Metrics())
+
+    def tearDown(self):
+        DNSFunctions.ZONE_INDEX, DNSFunctions.METRICS = self.zoneIndex, self.metrics
+        DNSFunctions.RESPONSE_CACHE.clear()
+        logging.disable(logging.NOTSET)
+
+    def ask(self, name, qtype):
+        query = DNSCodec.buildQuery(name, qtype, 0x1234)
+        response, allowResponse = DNSFunctions.getResponse(query, ADDR, scheduleLogging=noLogging)
+        self.assertTrue(allowResponse)
+
+        return DNSCodec.parseMessage(response)
+
+    def checkSoa(self, message):
+        self.assertEqual(len(message.answers), 0)
+        self.assertEqual(len(message.authority), 1)
+        soa = message.authority[0]
+        self.assertEqual((soa.labels, soa.rtype, soa.ttl), (['example', 'test'], DNSCodec.TYPE_SOA, 30))
+
+    def testNxdomain(self):
+        message = self.ask('nope.example.test', DNSCodec.TYPE_A)
+        self.assertEqual(message.flags & 0xf, DNSCodec.RCODE_NXDOMAIN)
+        self.checkSoa(message)
+        self.assertEqual(DNSFunctions.METRICS.getTotal(Metrics.NXDOMAIN), 1)
+
+    def testNodata(self):
+        for name in ('v6.example.test', 'b.example.test'):     # a name with other types, an empty non-terminal
+            message = self.ask(name, DNSCodec.TYPE_A)
+            self.assertEqual(message.flags & 0xf, 0)
+            self.checkSoa(message)
+        self.assertEqual(DNSFunctions.METRICS.getTotal(Metrics.NODATA), 2)
+
+    def testRefused(self):
+        message = self.ask('nope.example.com', DNSCodec.TYPE_A)
+        self.assertEqual(message.flags & 0xf, DNSCodec.RCODE_REFUSED)
+        self.assertFalse(message.flags >> 8 & DNSCodec.AA_FLAG)
+        self.assertEqual((len(message.answers), len(message.authority), len(message.additional)), (0, 0, 0))
+        self.assertEqual(DNSFunctions.METRICS.getTotal(Metrics.REFUSED), 1)
+
+    def testAny(self):
+        message = self.ask('example.test', DNSCodec.TYPE_ANY)
+        self.assertEqual(message.flags & 0xf, 0)
+        self.assertEqual(sorted(answer.rtype for answer in message.answers),
+                         [DNSCodec.TYPE_A, DNSCodec.TYPE_MX, DNSCodec.TYPE_TXT, DNSCodec.TYPE_AAAA])
+
+    def testAnyWithoutRecords(self):
+        self.checkSoa(self.ask('b.example.test', DNSCodec.TYPE_ANY))
+        message = self.ask('nope.example.test', DNSCodec.TYPE_ANY)
+        self.assertEqual(message.flags & 0xf, DNSCodec.RCODE_NXDOMAIN)
+        self.checkSoa(message)
+
+
+if __name__ == '__main__':
+    unittest.main()
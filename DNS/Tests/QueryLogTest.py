@@ -0,0 +1,115 @@
+#! /usr/bin/env python3
+
+'''
+    Query logs off the packet path: the JSON-Lines request log (and its conversion to the old JSON shape),
+    the SQLite query store and the binary query log write every appended query, and their readers return them.
+    Run from the DNS folder: python -m unittest Tests/QueryLogTest.py
+'''
+
+import datetime
+import glob
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import BinaryLog
+from Helper import QueryStore
+from Helper import RequestLog
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+QUERIES = 1000
+
+
+class QueryLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='dns-querylog-')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def testRequestLog(self):
+        path = os.path.join(self.folder, 'requests')
+        log = RequestLog.RequestLog(flushRecords=100)
+        for index in range(QUERIES):
+            log.append(path, {'TransactionID': str(index), 'Domain': 'www.example.test', 'SrcPort': str(1024 + index)})
+        log.stop()
+
+        jsonlFile = '%s_%s.jsonl' % (path, datetime.date.today().isoformat())
+        with open(jsonlFile) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual([record['TransactionID'] for record in records], [str(index) for index in range(QUERIES)])
+        self.assertEqual((log.written, log.drops), (QUERIES, 0))
+
+        jsonFile = os.path.join(self.folder, 'requests.json')
+        self.assertEqual(RequestLog.convertToJSON(jsonlFile, jsonFile), QUERIES)
+        with open(jsonFile) as file:
+            converted = json.load(file)
+        self.assertEqual(converted['1']['Request'], {'ID': '1', 'TransactionID': '0', 'Domain': 'www.example.test', 'SrcPort': '1024'})
+
+    def testQueryStore(self):
+        path = os.path.join(self.folder, 'queries.db')
+        store = QueryStore.QueryStore(path, batchSize=100)
+        for index in range(QUERIES):
+            store.append(index, 'A', index % 10, '192.0.2.%d' % (index % 2), 1024 + index, 'check_%d.example.test' % index,
+                         mode='check')
+        store.stop()
+
+        self.assertEqual(store.written, QUERIES)
+        rows = QueryStore.getRequests(path, '192.0.2.1')
+        self.assertEqual(len(rows), QUERIES // 2)
+        self.assertEqual([row['Counter'] for row in rows[:3]], [1, 3, 5])
+        self.assertEqual(len(QueryStore.getRequests(path, '192.0.2.1', requestId=3)), QUERIES // 10)
+        row, = QueryStore.getRequests(path, '192.0.2.0', srcPort=1024)
+        self.assertEqual((row['Domain'], row['Mode'], row['RecordType']), ('check_0.example.test', 'check', 'A'))
+
+    @unittest.skipIf(numpy is None, 'numpy is required to read the binary query log')
+    def testBinaryLog(self):
+        path = os.path.join(self.folder, 'queries')
+        log = BinaryLog.BinaryLog(path, bufferSize=BinaryLog.RECORD_SIZE * 100)
+        for index in range(QUERIES):
+            log.append('ERROR' if index % 4 == 0 else 'OKAY', 'AAAA', index, '192.0.2.7', 1024 + index,
+                       'check_%d.DnsTestSuite.space' % (index % 3), mode='check', modifiedDomain='check_%d.dNStestSUITE.space' % (index % 3))
+        log.close()
+
+        recordFile, = glob.glob(path + '_*.qlog')
+        records, names = BinaryLog.loadLog(recordFile)
+        try:
+            self.assertEqual(len(records), QUERIES)
+            self.assertEqual(records['requestId'].tolist(), list(range(QUERIES)))
+            self.assertEqual(records['srcPort'][-1], 1024 + QUERIES - 1)
+            self.assertTrue((records['qtype'] == BinaryLog.TYPE_CODES['AAAA']).all())
+            self.assertEqual(BinaryLog.ipToString(records['srcIP'][0]), '192.0.2.7')
+            self.assertEqual(int((records['flags'] & BinaryLog.FLAG_ERROR != 0).sum()), QUERIES // 4)
+            self.assertTrue((records['flags'] & BinaryLog.FLAG_MODIFIED != 0).all())
+            self.assertEqual(names.getName(int(records['nameOffset'][4])), 'check_1.DnsTestSuite.space')
+            self.assertTrue(BinaryLog.getCaseMismatches(records).all())
+            observed = ['check_%d.dNStestSUITE.space' % (index % 3) for index in range(QUERIES)]
+            observed[0] = observed[0].lower()   # a resolver that did not keep the case
+            matches = BinaryLog.getCaseMatches(records, observed)
+            self.assertEqual((bool(matches[0]), int(matches.sum())), (False, QUERIES - 1))
+        finally:
+            names.close()
+
+    @unittest.skipIf(numpy is None, 'numpy is required to read the binary query log')
+    def testBinaryLogVersion1(self):
+        recordFile = os.path.join(self.folder, 'old_2020-01-01_1.qlog')
+        with open(recordFile, 'wb') as file:
+            file.write(BinaryLog.FILE_HEADER.pack(BinaryLog.MAGIC, 1, BinaryLog.RECORD_SIZE_V1))
+            file.write(struct.pack('<QIHHHHI', 1, BinaryLog.ipToInt('192.0.2.1'), 53, 7, 1, 0, 0))
+        records = BinaryLog.loadRecords(recordFile)
+        self.assertEqual((len(records), int(records['requestId'][0]), int(records['answerCase'][0])), (1, 7, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
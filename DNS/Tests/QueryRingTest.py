@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+
+'''
+    The logger process rings: records come out as they went in, a full ring drops and counts, and the
+    UDP and TCP threads of one serving process can share its scheduler.
+    Run from the DNS folder: python -m unittest Tests/QueryRingTest.py
+'''
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import QueryRing
+
+THREADS = 2
+RECORDS = 5000
+
+
+#
+def noLogging(*args):
+    pass
+
+
+class QueryRingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.switchInterval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.logger = QueryRing.RingLogger(rings=1, capacity=THREADS * RECORDS)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switchInterval)
+        for ring in self.logger.rings:
+            ring.close(unlink=True)
+
+    def testRoundTrip(self):
+        ring = self.logger.rings[0]
+        self.assertTrue(ring.push(7, 'OKAY', 'AAAA', '4660', '10.1.2.3', 5353, 'www.dnstestsuite.space', 'wWw.DnStestsuite.space'))
+        counter, status, recordType, transactionID, srcIP, srcPort, domain, timestamp, modified = ring.drain()[0]
+        self.assertEqual((counter, status, recordType, transactionID, srcIP, srcPort, domain, modified),
+                         (7, 'OKAY', 'AAAA', '4660', '10.1.2.3', 5353, 'www.dnstestsuite.space', 'wWw.DnStestsuite.space'))
+        self.assertEqual(ring.drain(), [])
+
+    def testFullRingDrops(self):
+        ring = QueryRing.QueryRing(capacity=2)
+        try:
+            results = [ring.push(index, 'OKAY', 'A', '1', '127.0.0.1', 53, 'a.b') for index in range(3)]
+            self.assertEqual(results, [True, True, False])
+            self.assertEqual(ring.getStats()['dropped'], 1)
+            self.assertEqual([record[0] for record in ring.drain()], [0, 1])
+        finally:
+            ring.close(unlink=True)
+
+    def testSharedScheduler(self):
+        scheduleLogging = self.logger.getScheduler(0)
+
+        def produce(first):
+            for counter in range(first, first + RECORDS):
+                scheduleLogging(noLogging, counter, 'OKAY', 'A', '1', '127.0.0.1', 53, 'www.dnstestsuite.space', '00:00:00')
+
+        threads = [threading.Thread(target=produce, args=(index * RECORDS,)) for index in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        ring = self.logger.rings[0]
+        counters = [record[0] for record in ring.drain(limit=THREADS * RECORDS)]
+        self.assertEqual(sorted(counters), list(range(THREADS * RECORDS)))
+        self.assertEqual(ring.getStats()['dropped'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
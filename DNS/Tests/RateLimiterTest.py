@@ -0,0 +1,82 @@
+#! /usr/bin/env python3
+
+'''
+    Response-rate limiting: a source over its rate is dropped, every SLIP-th limited query is answered with a
+    TC=1 stub (the question only), slip 0 drops them all, and the other sources are not limited.
+    Run from the DNS folder: python -m unittest Tests/RateLimiterTest.py
+'''
+
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import RateLimiter
+
+QNAME = b'\x03www\x07example\x04test\x00'
+LIMITED = 10
+
+
+def noLogging(function, *args):
+    pass
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def testSlip(self):
+        limiter = RateLimiter.RateLimiter(ipRate=1, slip=2, burstSeconds=1)
+        self.assertEqual(limiter.check('192.0.2.1', QNAME), RateLimiter.ALLOW)     # the burst: one token
+        actions = [limiter.check('192.0.2.1', QNAME) for index in range(LIMITED)]
+        self.assertEqual(actions, [RateLimiter.DROP, RateLimiter.TRUNCATE] * (LIMITED // 2))
+        self.assertEqual(limiter.check('192.0.2.2', QNAME), RateLimiter.ALLOW)     # another source has its own bucket
+        self.assertEqual(limiter.getStats(), {'dropped': LIMITED // 2, 'truncated': LIMITED // 2, 'buckets': 2})
+
+    def testNoSlip(self):
+        limiter = RateLimiter.RateLimiter(ipRate=1, slip=0, burstSeconds=1)
+        limiter.check('192.0.2.1', QNAME)
+        self.assertEqual(set(limiter.check('192.0.2.1', QNAME) for index in range(LIMITED)), {RateLimiter.DROP})
+
+    def testPrefixAndQname(self):
+        limiter = RateLimiter.RateLimiter(prefixRate=1, slip=0, burstSeconds=1)
+        self.assertEqual(limiter.check('192.0.2.1', QNAME), RateLimiter.ALLOW)
+        self.assertEqual(limiter.check('192.0.2.200', QNAME), RateLimiter.DROP)    # the same /24
+        self.assertEqual(limiter.check('198.51.100.1', QNAME), RateLimiter.ALLOW)
+        limiter = RateLimiter.RateLimiter(qnameRate=1, slip=0, burstSeconds=1)
+        limiter.check('192.0.2.1', QNAME)
+        self.assertEqual(limiter.check('198.51.100.1', QNAME), RateLimiter.DROP)
+        self.assertEqual(limiter.check('198.51.100.1', b'\x04mail' + QNAME[4:]), RateLimiter.ALLOW)
+
+    def testFromSpec(self):
+        limiter = RateLimiter.fromSpec('100,,50', slip=3, workers=2)
+        self.assertEqual((limiter.ips.rate, limiter.prefixes, limiter.qnames.rate, limiter.slip), (50, None, 25, 3))
+        for spec in ('0', '1,2,3,4', 'x'):
+            with self.assertRaises(ValueError):
+                RateLimiter.fromSpec(spec)
+
+    def testTruncatedAnswers(self):
+        logging.disable(logging.CRITICAL)
+        DNSFunctions.enableRateLimiter(RateLimiter.RateLimiter(ipRate=1, slip=2, burstSeconds=1))
+        try:
+            query = DNSCodec.buildQuery('www.example.test', DNSCodec.TYPE_A, 0x1234)
+            answers = [DNSFunctions.getResponse(query, ('192.0.2.1', 5353), scheduleLogging=noLogging) for index in range(5)]
+        finally:
+            DNSFunctions.enableRateLimiter(None)
+            logging.disable(logging.NOTSET)
+
+        self.assertEqual(answers[1], (b'', False))      # dropped
+        response, allowResponse = answers[2]
+        message = DNSCodec.parseMessage(response)
+        self.assertTrue(allowResponse)
+        self.assertEqual((message.id, message.flags & 0x8200), (0x1234, 0x8200))    # QR, TC
+        self.assertEqual(message.questions[0].labels, ['www', 'example', 'test'])
+        self.assertEqual(len(message.answers), 0)
+        self.assertEqual(len(response), len(query))
+        self.assertEqual([allowResponse for response, allowResponse in answers[3:]], [False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
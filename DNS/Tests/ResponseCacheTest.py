@@ -0,0 +1,162 @@
+#! /usr/bin/env python3
+
+'''
+    Response cache: LRU entries by question (lowercased name, type and class), invalidated by clear with a new
+    generation, and an answer built from the zones that a reload has just replaced is never cached.
+    Run from the DNS folder: python -m unittest Tests/ResponseCacheTest.py
+'''
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import ZoneIndex
+from Helper.ResponseCache import ResponseCache
+
+ADDR = ('127.0.0.1', 5353)
+QUERIES = 2000
+
+
+#
+def getZone(address):
+    return {'$origin': 'example.test.', '$ttl': 30, 'A': [{'name': 'www', 'value': address}]}
+
+#
+def getAddress(response):
+    return DNSCodec.decodeAddress(DNSCodec.TYPE_A, bytes(DNSCodec.parseMessage(response).answers[0].rdata))
+
+
+def noLogging(function, *args):
+    pass
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def testLru(self):
+        cache = ResponseCache(maxSize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)     # 'b' is now the least recently used
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.getStats(), {'size': 2, 'hits': 3, 'misses': 1})
+
+    def testGeneration(self):
+        cache = ResponseCache()
+        generation = cache.generation
+        cache.put('a', 1, generation)
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.generation, generation + 1)
+        cache.put('a', 1, generation)   # built before the clear: dropped
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 2, cache.generation)
+        self.assertEqual(cache.get('a'), 2)
+
+
+class ZoneReloadTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.folder = tempfile.mkdtemp(prefix='dns-reload-')
+        self.path = os.path.join(self.folder, 'example.zone')
+        self.writeZone('192.0.2.1')
+        self.paths, self.zoneIndex = DNSFunctions.REAL_ZONE_PATHS, DNSFunctions.ZONE_INDEX
+        DNSFunctions.REAL_ZONE_PATHS = [self.path]
+        DNSFunctions.ZONE_INDEX = ZoneIndex.loadZones([self.path])
+        DNSFunctions.RESPONSE_CACHE.clear()
+
+    def tearDown(self):
+        DNSFunctions.REAL_ZONE_PATHS, DNSFunctions.ZONE_INDEX = self.paths, self.zoneIndex
+        DNSFunctions.RESPONSE_CACHE.clear()
+        shutil.rmtree(self.folder, ignore_errors=True)
+        logging.disable(logging.NOTSET)
+
+    def writeZone(self, address):
+        with open(self.path, 'w') as zoneFile:
+            json.dump(getZone(address), zoneFile)
+
+    def ask(self):
+        query = DNSCodec.buildQuery('www.example.test', DNSCodec.TYPE_A, 1)
+        return getAddress(DNSFunctions.getResponse(query, ADDR, scheduleLogging=noLogging)[0])
+
+    def testQuestionKey(self):
+        self.ask()
+        hits = DNSFunctions.RESPONSE_CACHE.hits
+        query = DNSCodec.buildQuery('WwW.ExAmple.TEST', DNSCodec.TYPE_A, 2)
+        message = DNSCodec.parseMessage(DNSFunctions.getResponse(query, ADDR, scheduleLogging=noLogging)[0])
+        self.assertEqual(message.questions[0].labels, ['WwW', 'ExAmple', 'TEST'])   # sent back as asked
+        self.assertEqual((len(DNSFunctions.RESPONSE_CACHE.entries), DNSFunctions.RESPONSE_CACHE.hits), (1, hits + 1))
+        DNSFunctions.getResponse(DNSCodec.buildQuery('www.example.test', DNSCodec.TYPE_AAAA, 3), ADDR, scheduleLogging=noLogging)
+        self.assertEqual(DNSFunctions.RESPONSE_CACHE.getStats()['size'], 2)
+
+    def testReloadClearsTheCache(self):
+        self.assertEqual(self.ask(), '192.0.2.1')
+        self.assertEqual(self.ask(), '192.0.2.1')   # cached
+        self.writeZone('192.0.2.2')
+        DNSFunctions.reloadZones()
+        self.assertEqual(self.ask(), '192.0.2.2')
+
+    def testBadZoneKeepsTheRunningOne(self):
+        self.assertEqual(self.ask(), '192.0.2.1')
+        with open(self.path, 'w') as zoneFile:
+            json.dump(getZone('not an address'), zoneFile)
+        self.assertFalse(DNSFunctions.reloadZones())
+        self.assertEqual(self.ask(), '192.0.2.1')
+
+    def testReloadDuringBuild(self):
+        '''
+            The zones are swapped after a query looked them up and before its answer is cached.
+        '''
+
+        buildCachedResponse = DNSFunctions.buildCachedResponse
+
+        def reloadingBuild(*args, **kwargs):
+            cached = buildCachedResponse(*args, **kwargs)
+            self.writeZone('192.0.2.2')
+            DNSFunctions.reloadZones()
+            return cached
+
+        DNSFunctions.buildCachedResponse = reloadingBuild
+        try:
+            self.assertEqual(self.ask(), '192.0.2.1')   # answered from the zones it looked up
+        finally:
+            DNSFunctions.buildCachedResponse = buildCachedResponse
+        self.assertEqual(self.ask(), '192.0.2.2')       # the old answer was not cached
+
+    def testConcurrentReloads(self):
+        addresses = ['192.0.2.%d' % index for index in range(1, 5)]
+        stopped = threading.Event()
+
+        def reload():
+            index = 0
+            while not stopped.is_set():
+                index += 1
+                self.writeZone(addresses[index % len(addresses)])
+                DNSFunctions.reloadZones()
+
+        thread = threading.Thread(target=reload)
+        thread.start()
+        try:
+            for query in range(QUERIES):
+                self.assertIn(self.ask(), addresses)
+        finally:
+            stopped.set()
+            thread.join()
+        DNSFunctions.reloadZones()
+        with open(self.path) as zoneFile:
+            self.assertEqual(self.ask(), json.load(zoneFile)['A'][0]['value'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#! /usr/bin/env python3
+
+'''
+    A worker stopped by its supervisor (SIGTERM) flushes the records it still buffers or queues:
+    the text log, the JSON-Lines log, the query store and the binary log hold every answered query.
+    Run from the DNS folder: python -m unittest Tests/WorkerShutdownTest.py
+'''
+
+import argparse
+import glob
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DNSServer
+from Helper import BinaryLog
+from Helper import ConsoleRenderer
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import DNSWorkers
+
+DNS_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERIES = 50
+TIMEOUT = 2
+
+
+#
+def getFreePort():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    return port
+
+#
+def getArgv(engine):
+    return argparse.Namespace(l=True, adversary=False, port=0, rcase=False, s=False, task='rport', dont=False, workers=1, engine=engine,
+                              database=None, binaryLog=None, loggerProcess=False, metrics=None, rateLimit=None, rateLimitSlip=2,
+                              forgeRate=0, sweepWorkers=0, zoneWatch=0, tcp=False, ednsPayload=1232, consoleLines=0)
+
+
+class WorkerShutdownTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp(prefix='dns-worker-')
+        os.chdir(self.folder)
+        DNSFunctions.makeDirectories()
+        DNSFunctions.loadRealZone([os.path.join(DNS_FOLDER, 'Zones', 'RealZone.zone')])
+        DNSFunctions.enableQueryStore(os.path.join(self.folder, 'queries.db'))
+        DNSFunctions.enableBinaryLog(os.path.join(self.folder, 'queries'))
+        DNSFunctions.enableConsoleRenderer(ConsoleRenderer.ConsoleRenderer(0, stream=open(os.devnull, 'w')))
+
+    def tearDown(self):
+        DNSFunctions.QUERY_STORE = None
+        DNSFunctions.BINARY_LOG = None
+        DNSFunctions.CONSOLE_RENDERER = None
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder, ignore_errors=True)
+        logging.disable(logging.NOTSET)
+
+    def serveAndStop(self, engine):
+        '''
+            Answers received from one worker of engine, stopped right after the last one.
+        '''
+
+        port = getFreePort()
+        supervisor = DNSWorkers.WorkerSupervisor(1, '127.0.0.1', port)
+        supervisor.startWorker(0, DNSServer.serve, getArgv(engine))
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        client.settimeout(TIMEOUT)
+        answers = 0
+        try:
+            for transactionId in range(QUERIES):
+                query = DNSCodec.buildQuery('www.dnstestsuite.space', DNSCodec.TYPE_A, transactionId)
+                for attempt in range(5):     # the first ones may arrive before the worker is bound
+                    client.sendto(query, ('127.0.0.1', port))
+                    try:
+                        client.recvfrom(DNSFunctions.OUTPUT_BUFFER_SIZE)
+                        answers += 1
+                        break
+                    except socket.timeout:
+                        pass
+        finally:
+            client.close()
+            supervisor.stop()
+
+        self.assertEqual(supervisor.processes[0].exitcode, 0)
+        return answers
+
+    def checkRecords(self, answers):
+        with open(glob.glob('Logs/incoming_request_*_counter+.txt')[0]) as file:
+            rows = [line for line in file if 'RecordType: A' in line]
+        self.assertEqual(len(rows), answers)
+
+        records = 0
+        for jsonl in glob.glob('JSON/NormalRequests/NormalDNSRequestNodes_*.jsonl'):
+            with open(jsonl) as file:
+                records += sum(1 for line in file if line.strip())
+        self.assertEqual(records, answers)
+
+        connection = sqlite3.connect(os.path.join(self.folder, 'queries.db'))
+        try:
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM Requests').fetchone()[0], answers)
+        finally:
+            connection.close()
+
+        qlog = glob.glob(os.path.join(self.folder, 'queries_*.qlog'))[0]
+        self.assertEqual((os.path.getsize(qlog) - BinaryLog.HEADER_SIZE) // BinaryLog.RECORD_SIZE, answers)
+
+    def testZeroCopyWorker(self):
+        answers = self.serveAndStop(DNSServer.ENGINE_ZERO_COPY)
+        self.assertEqual(answers, QUERIES)
+        self.checkRecords(answers)
+
+    def testAsyncioWorker(self):
+        answers = self.serveAndStop(DNSServer.ENGINE_ASYNCIO)
+        self.assertEqual(answers, QUERIES)
+        self.checkRecords(answers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#! /usr/bin/env python3
+
+'''
+    Zone index: every served record type is compiled with its own RDATA encoder, the other types are skipped and
+    reported, and the lookups find the exact, the wildcard and the closest encloser names.
+    Run from the DNS folder: python -m unittest Tests/ZoneIndexTest.py
+'''
+
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+from Helper import DNSFunctions
+from Helper import ZoneIndex
+
+LONG_TEXT = 'v=spf1 ' + 'x' * 300
+
+
+#
+def getZone(**records):
+    zone = {'$origin': 'example.test.', '$ttl': 30,
+            'soa': {'mname': 'ns.example.test.', 'rname': 'admin.example.test.', 'serial': 1,
+                    'refresh': 30, 'retry': 600, 'expire': 60480, 'minimum': 60}}
+    zone.update(records)
+
+    return zone
+
+#
+def getMixedZone():
+    return getZone(A=[{'name': '@', 'value': '192.0.2.1'}, {'name': '*.wild', 'value': '192.0.2.2'},
+                      {'name': 'a.b', 'value': '192.0.2.3'}],
+                   AAAA=[{'name': '@', 'value': '2001:db8::1'}],
+                   MX=[{'name': '@', 'ttl': 300, 'value': '10 mail'}, {'name': '@', 'value': '20 mx.other.test.'}],
+                   TXT=[{'name': '@', 'value': LONG_TEXT}],
+                   CNAME=[{'name': 'www', 'value': '@'}],
+                   NS=[{'name': 'sub', 'value': 'ns1.other.test.'}],
+                   SOA=[{'name': '@', 'value': 'ns.example.test. admin.example.test.'}])
+
+
+class ZoneIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ZoneIndex.ZoneIndex()
+        self.index.addZone(getMixedZone(), 'mixed.zone')
+
+    def lookup(self, name):
+        return self.index.lookup(ZoneIndex.getKey(name))
+
+    def testMixedTypes(self):
+        zone, node = self.lookup('example.test.')
+        self.assertEqual(zone.origin, 'example.test.')
+        self.assertEqual(sorted(node.records), ['A', 'AAAA', 'MX', 'TXT'])
+        self.assertEqual([record['value'] for record in node.records['MX']], ['10 mail.example.test.', '20 mx.other.test.'])
+        self.assertEqual(node.records['MX'][0]['ttl'], 300)
+        self.assertEqual(self.lookup('www.example.test.')[1].records['CNAME'][0]['value'], 'example.test.')
+        self.assertEqual(self.lookup('sub.example.test.')[1].records['NS'][0]['value'], 'ns1.other.test.')
+
+    def testSkippedTypes(self):
+        self.assertEqual(self.index.skipped, ['mixed.zone: SOA'])
+        self.assertEqual(self.index.getStats()['skipped'], 1)
+
+    def testBadRecords(self):
+        for records in ({'A': [{'value': 'mail.example.test.'}]}, {'AAAA': [{'value': '192.0.2.1'}]},
+                        {'MX': [{'value': 'mail'}]}, {'CNAME': [{'value': 'a' * 64}]}):
+            with self.assertRaises(ZoneIndex.ZoneError):
+                ZoneIndex.ZoneIndex().addZone(getZone(**records), 'bad.zone')
+
+    def testRdata(self):
+        self.assertEqual(DNSCodec.encodeRdata(DNSCodec.TYPE_MX, '10 mail.example.test.'),
+                         struct.pack('!H', 10) + DNSCodec.encodeName('mail.example.test.'))
+        rdata = DNSCodec.encodeRdata(DNSCodec.TYPE_TXT, LONG_TEXT)
+        self.assertEqual(rdata[0], DNSCodec.MAX_STRING)
+        self.assertEqual(rdata[DNSCodec.MAX_STRING + 1], len(LONG_TEXT) - DNSCodec.MAX_STRING)
+        self.assertEqual(len(rdata), len(LONG_TEXT) + 2)
+        with self.assertRaises(DNSCodec.DNSCodecError):
+            DNSCodec.encodeRdata(DNSCodec.TYPE_SOA, 'ns.example.test.')
+
+    def testWildcard(self):
+        zone, node = self.lookup('anything.wild.example.test.')
+        self.assertEqual(node.records['A'][0]['value'], '192.0.2.2')
+        zone, node = self.lookup('deeper.anything.wild.example.test.')   # closest encloser wild, its '*' answers
+        self.assertEqual(node.records['A'][0]['value'], '192.0.2.2')
+
+    def testClosestEncloser(self):
+        zone, node = self.lookup('b.example.test.')         # empty non-terminal: the name exists, without records
+        self.assertEqual(node.records, {})
+        zone, node = self.lookup('c.b.example.test.')       # closest encloser b.example.test. has no '*'
+        self.assertEqual(zone.origin, 'example.test.')
+        self.assertIsNone(node)
+        self.assertEqual(self.lookup('example.other.'), (None, None))
+
+    def testMxAnswer(self):
+        zoneIndex, DNSFunctions.ZONE_INDEX = DNSFunctions.ZONE_INDEX, self.index
+        try:
+            query = DNSCodec.buildQuery('example.test', DNSCodec.TYPE_MX, 1)
+            cached = DNSFunctions.buildCachedResponse(query, ['example', 'test'], DNSFunctions.RECORD_TYPES.MX.value,
+                                                      qname=ZoneIndex.getKey('example.test.'))
+        finally:
+            DNSFunctions.ZONE_INDEX = zoneIndex
+        self.assertEqual(cached.recStatus, 'OKAY')
+        self.assertEqual(cached.headerTail[4:6], b'\x00\x02')    # ANCOUNT
+        self.assertIn(DNSCodec.encodeName('mail.example.test.'), cached.body)
+
+
+if __name__ == '__main__':
+    unittest.main()
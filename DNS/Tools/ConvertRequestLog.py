@@ -0,0 +1,24 @@
+#! /usr/bin/env python3
+
+'''
+    Convert the JSON-Lines request logs into the old NormalDNSRequestNodes_<date>.json /
+    CheckingDNSRequestNodes_<date>.json shape for the existing consumers.
+    Run from the DNS folder: python Tools/ConvertRequestLog.py [files.jsonl ...]
+    Without arguments every JSON/*/*.jsonl file is converted next to itself.
+'''
+
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper.RequestLog import convertToJSON
+
+
+if __name__ == '__main__':
+    files = sys.argv[1:] or glob.glob('JSON/*/*.jsonl')
+    for jsonlFile in files:
+        jsonFile = os.path.splitext(jsonlFile)[0] + '.json'
+        count = convertToJSON(jsonlFile, jsonFile)
+        print('%s -> %s : %d requests' % (jsonlFile, jsonFile, count))
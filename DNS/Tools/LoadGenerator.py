@@ -0,0 +1,238 @@
+#! /usr/bin/env python3
+
+'''
+    Replay a query mix against a DNS server and report the achieved QPS, the loss and the
+    p50/p99/p999 latency. The mix comes from the logged requests (JSON/*/*.jsonl, the old
+    NormalDNSRequestNodes_<date>.json files or Logs/incoming_request_<date>_counter+.txt) or from
+    synthetic '<rand>_check_<ip>.dnstestsuite.space' names.
+    Every client process keeps its queries in flight by transaction ID, either at a target rate
+    (open loop, -r) or as fast as the server answers with a window of queries in flight (-w).
+    Run from the DNS folder, e.g. against 'python RunDns.py -l -p 15353 -e mmsg':
+        python Tools/LoadGenerator.py -p 15353 -n 100000
+        python Tools/LoadGenerator.py -p 15353 -r 5000,10000,20000 -f JSON/NormalRequests/*.jsonl
+'''
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import re
+import select
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import DNSCodec
+
+ZONE = 'dnstestsuite.space'
+CHECK_RATIO = 0.8       # synthetic mix: share of the '<rand>_check_<ip>' names, the rest are plain zone names
+BURST = 64              # queries sent before looking at the answers
+EXPIRE_INTERVAL = 0.1   # seconds between two scans for timed out queries
+SOCKET_BUFFER = 1 << 22
+TEXT_LINE = re.compile(r'RecordType: (\S+) .*Domain: (\S+)')
+
+#<editor-fold desc="******************* Query mix *******************">
+
+#
+def loadMix(files):
+    '''
+        [(domain, record type)] of the logged requests, the format is taken from the file extension.
+    '''
+
+    mix = []
+    for file in files:
+        with open(file) as f:
+            if file.endswith('.jsonl'):
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        mix.append((record['Domain'], record['RecordType']))
+            elif file.endswith('.json'):
+                for node in json.load(f).values():
+                    mix.append((node['Request']['Domain'], node['Request']['RecordType']))
+            else:
+                for line in f:
+                    match = TEXT_LINE.search(line)
+                    if match:
+                        mix.append((match.group(2), match.group(1)))
+
+    return mix
+
+#
+def getSyntheticMix(count, checkRatio=CHECK_RATIO):
+    mix = []
+    plain = [ZONE, 'www.' + ZONE, 'ns.' + ZONE]
+    for i in range(count):
+        if random.random() < checkRatio:
+            ip = '.'.join(str(random.randint(1, 254)) for j in range(4))
+            mix.append(('%d_check_%s.%s' % (random.randint(1, 99999), ip, ZONE), 'A'))
+        else:
+            mix.append((random.choice(plain), random.choice(['A', 'A', 'A', 'AAAA', 'NS'])))
+
+    return mix
+
+#
+def buildQueries(mix):
+    '''
+        Encode every query of the mix once, the client only patches the transaction ID.
+    '''
+
+    queries = []
+    for domain, recordType in mix:
+        try:
+            queries.append(bytearray(DNSCodec.buildQuery(domain, DNSCodec.TYPE_CODES.get(recordType, DNSCodec.TYPE_A))))
+        except DNSCodec.DNSCodecError:
+            pass
+
+    return queries
+
+# </editor-fold>
+
+#<editor-fold desc="******************* Client *******************">
+
+#
+def runClient(target, queries, number, rate=0, window=256, timeout=1.0):
+    '''
+        Send number queries, return (sent, answered, seconds, latencies in ns).
+        rate > 0: open loop at rate queries/sec, otherwise keep window queries in flight.
+    '''
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    sock.connect(target)
+    sock.setblocking(False)
+    buffer = bytearray(4096)
+    inFlight = {}   # transaction ID -> send time (ns)
+    latencies = []
+    sent = answered = 0
+    nextId = random.randint(0, 0xffff)
+    start = time.perf_counter()
+    lastSend = lastExpire = start
+    while sent < number or (inFlight and time.perf_counter() - lastSend < timeout):
+        now = time.perf_counter()
+        wait = 0.01
+        if sent < number:
+            if rate:
+                due = int((now - start) * rate) - sent
+                wait = max(0.0, (sent + 1) / rate - (now - start))
+            else:
+                due = window - len(inFlight)
+            for i in range(min(due, BURST, number - sent)):
+                if nextId in inFlight:      # the ID wrapped around, the old query is lost
+                    del inFlight[nextId]
+                query = queries[sent % len(queries)]
+                DNSCodec.HEADER.pack_into(query, 0, nextId, 0x0100, 1, 0, 0, 0)
+                try:
+                    sock.send(query)
+                except BlockingIOError:
+                    break
+                inFlight[nextId] = time.perf_counter_ns()
+                nextId = (nextId + 1) & 0xffff
+                sent += 1
+                lastSend = time.perf_counter()
+            if due > 0 and not rate:
+                wait = 0.0 if len(inFlight) < window else 0.01
+
+        select.select([sock], [], [], wait)
+        while 1:
+            try:
+                nbytes = sock.recv_into(buffer)
+            except (BlockingIOError, ConnectionRefusedError):
+                break
+            sentAt = inFlight.pop((buffer[0] << 8) | buffer[1], None) if nbytes >= 2 else None
+            if sentAt is not None:
+                latencies.append(time.perf_counter_ns() - sentAt)
+                answered += 1
+
+        if now - lastExpire >= EXPIRE_INTERVAL:
+            lastExpire = now
+            expired = time.perf_counter_ns() - int(timeout * 1e9)
+            for transactionID in [transactionID for transactionID, sentAt in inFlight.items() if sentAt < expired]:
+                del inFlight[transactionID]     # timed out, counted as lost
+
+    return sent, answered, lastSend - start, latencies
+
+#
+def clientMain(target, queries, number, rate, window, timeout, results):
+    results.put(runClient(target, queries, number, rate, window, timeout))
+
+#
+def getPercentile(values, percentile):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * percentile / 100.0))]
+
+#
+def runLoad(target, queries, number, rate=0, window=256, timeout=1.0, clients=1):
+    '''
+        Split the load over clients processes, return a dict with sent, answered, lost, loss, qps and the latency percentiles (ms).
+    '''
+
+    if clients == 1:
+        outcomes = [runClient(target, queries, number, rate, window, timeout)]
+    else:
+        results = multiprocessing.Queue()
+        processes = []
+        for i in range(clients):
+            share = number // clients + (1 if i < number % clients else 0)
+            process = multiprocessing.Process(target=clientMain, daemon=True,
+                                              args=(target, queries, share, rate / clients, window, timeout, results))
+            process.start()
+            processes.append(process)
+        outcomes = [results.get() for process in processes]
+        for process in processes:
+            process.join()
+
+    sent = sum(outcome[0] for outcome in outcomes)
+    answered = sum(outcome[1] for outcome in outcomes)
+    seconds = max(outcome[2] for outcome in outcomes) or 1e-9
+    latencies = sorted(latency for outcome in outcomes for latency in outcome[3])
+
+    return {'sent': sent, 'answered': answered, 'lost': sent - answered, 'loss': 100.0 * (sent - answered) / max(sent, 1),
+            'qps': answered / seconds, 'p50': getPercentile(latencies, 50) / 1e6,
+            'p99': getPercentile(latencies, 99) / 1e6, 'p999': getPercentile(latencies, 99.9) / 1e6}
+
+# </editor-fold>
+
+#
+def printHeader():
+    print('%-10s %10s %10s %8s %8s %10s %9s %9s %9s' % ('Target', 'sent', 'answered', 'lost', 'loss %', 'qps', 'p50 ms', 'p99 ms', 'p999 ms'))
+
+#
+def printResult(label, result):
+    print('%-10s %10d %10d %8d %8.2f %10.0f %9.3f %9.3f %9.3f' % (label, result['sent'], result['answered'], result['lost'],
+                                                               result['loss'], result['qps'], result['p50'], result['p99'], result['p999']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a query mix against a DNS server, report QPS, loss and latency')
+    parser.add_argument('-s', '--server', default='127.0.0.1', help='DNS server IP, default: 127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=53, help='DNS server port, default: 53')
+    parser.add_argument('-f', '--files', nargs='*', default=[],
+                        help='Logged requests to replay: *.jsonl, NormalDNSRequestNodes_*.json or incoming_request_*.txt (glob patterns are expanded)')
+    parser.add_argument('--synthetic', type=int, default=10000, help='Synthetic names when no file is given, default: 10000')
+    parser.add_argument('-n', type=int, default=100000, help='Queries per run, default: 100000')
+    parser.add_argument('-r', '--rate', default='0',
+                        help='Target rates in queries/sec, comma separated (one run each), 0: as fast as possible, default: 0')
+    parser.add_argument('-w', '--window', type=int, default=256, help='Queries in flight per client when not rate limited, default: 256')
+    parser.add_argument('-t', '--timeout', type=float, default=1.0, help='Seconds before a query is counted as lost, default: 1')
+    parser.add_argument('-c', '--clients', type=int, default=1, help='Client processes, default: 1')
+    args = parser.parse_args()
+
+    files = [file for pattern in args.files for file in (glob.glob(pattern) or [pattern])]
+    mix = loadMix(files) if files else getSyntheticMix(args.synthetic)
+    queries = buildQueries(mix)
+    if not queries:
+        sys.exit('No queries to replay')
+    random.shuffle(queries)
+    print('%d queries in the mix (%s), %d client(s) -> %s:%d' % (len(queries), ', '.join(files) or 'synthetic',
+                                                             args.clients, args.server, args.port))
+
+    printHeader()
+    for rate in [float(rate) for rate in args.rate.split(',')]:
+        result = runLoad((args.server, args.port), queries, args.n, rate, args.window, args.timeout, args.clients)
+        printResult('%.0f/s' % rate if rate else 'max', result)
@@ -1,8 +1,13 @@
 #! /usr/bin/env python3
 
 import queue
+import random
+import socket
 import threading
-import dns.resolver
+
+from DNS.Helper import DNSCodec
+
+DNS_PORT = 53
 
 class BirhtdayAttak2(threading.Thread):
     def __init__(self,q,dnsIP,domain,numberOfTries, loop_time = 1.0/60):
@@ -10,9 +15,7 @@ class BirhtdayAttak2(threading.Thread):
         self.timeout = loop_time
         self.dnsIP = dnsIP
         self.domain = domain
-        self.res = dns.resolver.Resolver()
-        self.res.nameservers = [self.dnsIP]  # ['149.20.48.31','34.198.193.29','8.8.8.8']
-        self.res.lifetime = 20
+        self.lifetime = 20
         self.numberOfTries = numberOfTries
         super(BirhtdayAttak2, self).__init__()
 
@@ -32,19 +35,34 @@ class BirhtdayAttak2(threading.Thread):
         pass
         # put the code you would have put in the `run` loop here
 
+    def query(self, sock):
+        '''
+            Send one A query to the resolver and return the answered addresses.
+        '''
+        requestId = random.randint(0, 65535)
+        sock.sendto(DNSCodec.buildQuery(self.domain, DNSCodec.TYPE_A, requestId), (self.dnsIP, DNS_PORT))
+        while True:
+            data, addr = sock.recvfrom(4096)
+            message = DNSCodec.parseMessage(data)
+            if message.id == requestId:
+                return [DNSCodec.decodeAddress(record.rtype, record.rdata) for record in message.answers
+                        if record.rtype == DNSCodec.TYPE_A]
+
     def mountAttackAsycn(self):
         try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.settimeout(self.lifetime)
             for i in range(1,self.numberOfTries):
-                answers = self.res.query(self.domain, 'a')
-                for rdata in answers:
-                    print(rdata.address)
+                for address in self.query(sock):
+                    print(address)
+            sock.close()
         except Exception as ex:
             print(ex)
 
 
 if __name__ == '__main__':
 
-    birhtdayAttak = BirhtdayAttak2(dnsIP='8.8.8.8',domain='google.com',numberOfTries=10)
+    birhtdayAttak = BirhtdayAttak2(q=queue.Queue(),dnsIP='8.8.8.8',domain='google.com',numberOfTries=10)
     birhtdayAttak.start()
     birhtdayAttak.onThread(birhtdayAttak.mountAttackAsycn())
     birhtdayAttak.onThread(birhtdayAttak.mountAttackAsycn())
@@ -10,6 +10,8 @@ import logging
 import datetime
 import  sys, traceback
 
+from DNS.Helper.Helper import getLogWriter
+
 ERRORS_LOG_PATH = 'Logs/Errors/'
 
 DEBUG = False
@@ -27,23 +29,12 @@ def ProcesskillForWindows(process_name):
 
 class LogData():
     def __init__(self, filename, mode='none'):
-        date = getTime(2)
         self.mode = mode
-        # TODO: need refactoring - make it more abstract
-        self.file = 'Logs/' + filename + '_' + date + '_counter+.txt'
-        if (os.path.exists(self.file)) != True:
-            with open(self.file, 'w+') as file:
-                file.write('Start - ' + date + '\n')
+        self.writer = getLogWriter(filename)
 
     def wirteIntoFile(self, raw):
         if self.mode == 'out':
-            data = ''
-            raw = str(getTime(3)) + ': ' + raw
-            with open(self.file, 'r') as file:
-                data = file.read()
-            with open(self.file, 'w+') as file:
-                file.write(data)
-                file.write(raw + '\n')
+            self.writer.write(str(getTime(3)) + ': ' + raw)
 
     def counter(self):
         pass
@@ -80,8 +71,7 @@ def getTime(opt = 1):
         return (((str(date)).split('.')[0]).split(' ')[1])
 
 def loggingData(value):
-    file = LogData(filename='incoming_request', mode='out')
-    file.wirteIntoFile(value)
+    LogData(filename='incoming_request', mode='out').wirteIntoFile(value)
 
 
 # </editor-fold>
@@ -18,6 +18,8 @@ from multiprocessing import Pool
 from TOR.Helper.Helper import Helper
 from TOR.Helper.Helper import MSG_TYPES
 from TOR.Helper.Helper import MODE_TYPES
+from DNS.Helper import QueryStore
+from DNS.Helper import BinaryLog
 
 from subprocess import DEVNULL, STDOUT, check_call, check_output
 
@@ -31,6 +33,8 @@ MINNUMBER_DrawGraph = 3000 #000 #2000  ## -1 means parse all the files
 # TODO: Need to be Dynamic
 #FILE_PATH ='C:\\DNS9_back_new_logo_6/*.txt'
 FILE_PATH ="C:/Users/Amer Jod/Desktop/UCL/Term 2/DS/DNS_Project/TOR/GatheredFiles/Logs/*.txt"
+DATABASE_PATH = None    # SQLite query store of the DNS server (RunDns.py -db), used instead of FILE_PATH when set
+BINARY_LOG_PATH = None  # binary query logs of the DNS server (RunDns.py -bl), e.g. 'GatheredFiles/Logs/queries_*.qlog'
 
 #
 class GRAPHS(Enum):
@@ -138,6 +142,26 @@ def getInfoFormTextFiles(PATH=FILE_PATH):
 
     return totalLines, temp_Requests,AllLINE
 
+#
+def getInfoFromBinaryLog(PATH=None):
+    '''
+        Memory-map the binary query logs, return (total, records) where records is a NumPy structured
+        array with the timestamp, srcIP, srcPort, requestId, qtype, flags and nameOffset fields.
+    '''
+
+    records = BinaryLog.loadAll(PATH or BINARY_LOG_PATH)
+
+    return len(records), records
+
+#
+def getRequestsFromBinaryLog(records):
+    '''
+        RequestInfo objects of the binary records, for the graph functions.
+    '''
+
+    return [RequestInfo(str(requestId), BinaryLog.ipToString(srcIP), str(srcPort))
+            for requestId, srcIP, srcPort in zip(records['requestId'].tolist(), records['srcIP'].tolist(), records['srcPort'].tolist())]
+
 #
 def dumper(obj):
     try:
@@ -554,14 +578,36 @@ def getAllDNSIPs(requests):
 
         print('writing all DNS IPs into a text file is done')
 
+#
+def getInfoFromQueryStore(IP, ID=None, PORT=None, database=None):
+    '''
+        Requests of one resolver from the query store, an indexed lookup instead of scanning the text files.
+    '''
+
+    rows = QueryStore.getRequests(database or DATABASE_PATH, IP, requestId=ID, srcPort=PORT)
+
+    return [RequestInfo(str(row['RequestId']), row['SrcIP'], str(row['SrcPort'])) for row in rows]
+
 #   write the Requests into json file - for espicall port/Ip - for debugging purposes
 #   unfortunately this method is not accurate, because we check if ID/PORT are in the text but we can't tell which one is the PORT or which one is ID
-def writeInfoForSpicalIP(IP,requests,ID=None,PORT=None,DRAW=False,index=0):
+#   with a query store (database or DATABASE_PATH) the exact matches are read from the indexes instead
+def writeInfoForSpicalIP(IP,requests,ID=None,PORT=None,DRAW=False,index=0,database=None):
     list = []
     temp_Requests = []
 
-    txtFiles = glob.glob(FILE_PATH)
-    if ID is not None and  PORT is not None:
+    if database or DATABASE_PATH:
+        list = getInfoFromQueryStore(IP, ID, PORT, database)
+        temp_Requests = list
+        if ID is not None and PORT is not None:
+            filename = ('JSON/ByIP/IP_%s_ID_%s_PORT_%s.json' % (IP, ID, PORT))
+        elif ID is not None:
+            filename = ('JSON/ByID/IP_%s_ID_%s.json' % (IP, ID))
+        elif PORT is not None:
+            filename = ('JSON/ByPort/IP_%s_PORT_%s.json' % (IP, PORT))
+        else:
+            filename = ('JSON/ByIP/IP_%s.json' % IP)
+
+    elif ID is not None and  PORT is not None:
 
         filename = ('JSON/ByIP/IP_%s_ID_%s_PORT_%s.json' % (IP, ID, PORT))
         for line in requests: